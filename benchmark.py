@@ -0,0 +1,402 @@
+import io
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import datetime
+import tempfile
+
+from fishdex_db import Database, CATCH_LOG_SORT_KEYS, MONTH_NAMES, SPECIES_SORT_KEYS, store_photo, wall_clock_seconds
+from fishdex_images import open_image, encode_catch_photo
+from jsonToTable import import_reference_species, peak_memory_bytes
+
+
+# Default data set; pass --species 35000 --catches 1000000 for a large one
+DEFAULT_SPECIES = 35000
+DEFAULT_CATCHES = 100000
+DEFAULT_LOCATIONS = 1000
+DEFAULT_CAUGHT_SPECIES = 1000
+DEFAULT_REPEAT = 50
+
+INSERT_BATCH_SIZE = 10000
+
+# Building blocks for made-up but realistic looking names
+SYLLABLES = ("ba", "co", "di", "fu", "ga", "he", "ki", "lo", "ma", "ne", "pi", "ra", "so", "ta", "vu", "xe", "za", "th", "ph", "ch")
+COMMON_WORDS = ("Red", "Blue", "Spotted", "Striped", "Giant", "Dwarf", "Golden", "Silver", "Northern", "Southern", "Lake", "River", "Sea", "Reef")
+COMMON_FISH = ("Bass", "Trout", "Perch", "Pike", "Carp", "Snapper", "Grouper", "Goby", "Wrasse", "Cod", "Salmon", "Catfish", "Minnow", "Darter")
+PLACE_WORDS = ("Lake", "River", "Creek", "Bay", "Pond", "Reservoir", "Harbour", "Point", "Reef", "Beach")
+
+# Generated spots lie within this many degrees of the centre, a few hundred km across
+SPOTS_CENTRE = (47.6, -122.3)
+SPOTS_SPREAD = 2.0
+
+FIRST_CATCH = datetime.datetime(2015, 1, 1)
+CATCH_SPAN_MINUTES = 10 * 365 * 24 * 60
+
+# Side of the synthetic photos, about what a phone camera produces
+PHOTO_SIZE = (2000, 1500)
+
+
+def made_up_word(rng, syllables):
+    return "".join(rng.choice(SYLLABLES) for _ in range(syllables))
+
+
+def generate_reference_species(rng, count):
+    """Yield FishBase-style records with unique scientific names."""
+    for species_id in range(1, count + 1):
+        genus = made_up_word(rng, rng.randint(2, 4)).capitalize()
+        epithet = made_up_word(rng, rng.randint(2, 4)) + f"{species_id:x}"  # Suffix keeps the name unique
+        common_name = None
+        if rng.random() < 0.8:  # Not every species has a common name
+            common_name = f"{rng.choice(COMMON_WORDS)} {made_up_word(rng, 2).capitalize()} {rng.choice(COMMON_FISH)}"
+        yield {
+            "ID": species_id,
+            "scientificName": f"{genus} {epithet}",
+            "commonName": common_name,
+            "imageLink": f"https://example.org/images/{species_id}.jpg",
+            "fishLink": f"https://example.org/species/{species_id}",
+        }
+
+
+def write_reference_json(path, rng, count):
+    """Write a FishBase-style JSON array, one record at a time."""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[\n")
+        for index, fish in enumerate(generate_reference_species(rng, count)):
+            if index:
+                file.write(",\n")
+            json.dump(fish, file)
+        file.write("\n]\n")
+
+
+def synthetic_photo(rng):
+    """JPEG bytes of a noisy camera-sized photo (Pillow required)."""
+    from PIL import Image
+
+    image = Image.effect_noise(PHOTO_SIZE, rng.randint(20, 80)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def have_pillow():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def populate(db, rng, species, catches, locations, caught_species, photos):
+    """Fill Locations, Species and CatchLog, plus Photos when ``photos`` is set.
+
+    Returns a dict of generation timings.
+    """
+    timings = {}
+    start = time.perf_counter()
+    location_names = [
+        f"{made_up_word(rng, 3).capitalize()} {rng.choice(PLACE_WORDS)} {index}" for index in range(1, locations + 1)
+    ]
+    caught = rng.sample(range(1, species + 1), min(caught_species, species))
+    # A few species make up most catches, like in a real log
+    weights = [1 / (rank + 1) for rank in range(len(caught))]
+
+    photo_ids = []
+    with db.transaction() as cursor:
+        cursor.executemany("INSERT INTO Locations (locationName, latitude, longitude) VALUES (?, ?, ?)", (
+            (name, SPOTS_CENTRE[0] + rng.uniform(-SPOTS_SPREAD, SPOTS_SPREAD),
+             SPOTS_CENTRE[1] + rng.uniform(-SPOTS_SPREAD, SPOTS_SPREAD))
+            for name in location_names
+        ))
+
+        if photos:
+            encode = have_pillow()
+            for _ in range(photos):
+                if encode:
+                    data, renditions = encode_catch_photo(io.BytesIO(synthetic_photo(rng)))
+                else:
+                    # Without Pillow store incompressible bytes of a typical stored photo's size
+                    data, renditions = rng.randbytes(150 * 1024), None
+                photo_ids.append(store_photo(cursor, data, renditions))
+
+        remaining = catches
+        while remaining:
+            batch = min(remaining, INSERT_BATCH_SIZE)
+            rows = []
+            for _ in range(batch):
+                caught_at = FIRST_CATCH + datetime.timedelta(minutes=rng.randrange(CATCH_SPAN_MINUTES))
+                photo_id = rng.choice(photo_ids) if photo_ids and rng.random() < 0.5 else None
+                rows.append((
+                    rng.choices(caught, weights)[0],
+                    wall_clock_seconds(caught_at),  # Logged in UTC, so caughtAt and localAt agree
+                    rng.randint(1, locations),
+                    photo_id,
+                ))
+            cursor.executemany(
+                "INSERT INTO CatchLog (speciesID, caughtAt, utcOffset, locationID, photoID) VALUES (?, ?, 0, ?, ?)", rows
+            )
+            remaining -= batch
+
+        # Species counters and discovery order, as add_catch would have left them
+        cursor.execute('''
+            INSERT INTO Species (speciesID, quantityCaught, orderDiscovered)
+            SELECT speciesID, COUNT(*), ROW_NUMBER() OVER (ORDER BY MIN(caughtAt), speciesID)
+            FROM CatchLog GROUP BY speciesID
+        ''')
+    timings["populate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with db.transaction() as cursor:
+        cursor.execute("ANALYZE")  # Planner statistics, as a long-used database would have
+    timings["analyze"] = time.perf_counter() - start
+    return timings
+
+
+def time_calls(fn, args_list):
+    """Call ``fn(*args)`` for each argument tuple and return the latencies in seconds."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def search_terms(db, rng, count):
+    """Search strings taken from the generated names, dates and locations."""
+    names = [row[0] for row in db.reader().execute(
+        "SELECT commonName FROM ReferenceSpecies WHERE commonName IS NOT NULL ORDER BY ID"
+    )]
+    names = rng.sample(names, min(count, len(names)))
+    terms = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.6 and names:
+            name = rng.choice(names)
+            start = rng.randrange(max(1, len(name) - 4))
+            terms.append(name[start:start + rng.randint(3, 6)])
+        elif kind < 0.8:
+            terms.append(f"{rng.randint(2015, 2024)}-{rng.randint(1, 12):02d}")
+        else:
+            terms.append(rng.choice(PLACE_WORDS).lower()[:rng.randint(1, 2)])  # Short input uses the LIKE fallback
+    return terms
+
+
+def catch_log_scroll(db, sort_column, descending, pages):
+    """Fetch the first page and keep paging down, like scrolling the Catch Log."""
+    after = None
+    for _ in range(pages):
+        rows = db.catch_log_page(sort_column, descending, after=after)
+        if not rows:
+            break
+        after = rows[-1][0]
+
+
+def run_benchmarks(db, rng, repeat, photos):
+    """Time the hot paths. Returns {name: latency summary}."""
+    results = {}
+
+    def record(name, samples):
+        results[name] = summarize(samples)
+        results[name]["peak_memory_mb"] = peak_memory_bytes() / (1024 * 1024)
+
+    # refresh_catch_log: first page in every sort order, then a deeper scroll
+    for sort_column in CATCH_LOG_SORT_KEYS:
+        record(f"catch_log first page ({sort_column})", time_calls(
+            db.catch_log_page, [(sort_column, rng.random() < 0.5) for _ in range(repeat)]
+        ))
+    # Every header sorts on an indexed column, so scrolling costs the same in each order
+    for sort_column in CATCH_LOG_SORT_KEYS:
+        record(f"catch_log scroll 20 pages ({sort_column})", time_calls(
+            catch_log_scroll, [(db, sort_column, rng.random() < 0.5, 20) for _ in range(max(1, repeat // 5))]
+        ))
+
+    terms = search_terms(db, rng, repeat)
+    record("catch_log search", time_calls(
+        lambda term: db.catch_log_page(filter_text=term), [(term,) for term in terms]
+    ))
+    record("catch_log month search", time_calls(
+        lambda term: db.catch_log_page(filter_text=term), [(rng.choice(MONTH_NAMES),) for _ in range(repeat)]
+    ))
+    ranges = []
+    for _ in range(repeat):
+        start = wall_clock_seconds(FIRST_CATCH) + rng.randrange(CATCH_SPAN_MINUTES) * 60
+        ranges.append((start, start + 30 * 86400))
+    record("catch_log 30 day range", time_calls(
+        lambda date_range: db.catch_log_page("Datetime Caught", False, date_range=date_range), [(r,) for r in ranges]
+    ))
+
+    # refresh_species
+    for sort_column in SPECIES_SORT_KEYS:
+        record(f"species rows ({sort_column})", time_calls(
+            db.species_rows, [("", sort_column, True) for _ in range(max(1, repeat // 5))]
+        ))
+    record("species search", time_calls(db.species_rows, [(term,) for term in terms]))
+
+    # Autocomplete in the New Entry form, one lookup per keystroke
+    prefixes = []
+    for term in terms:
+        prefixes.extend((term[:length],) for length in range(1, len(term) + 1))
+    record("species autocomplete (common name)", time_calls(
+        lambda value: db.species_suggestions("commonName", value), prefixes
+    ))
+    record("species autocomplete (scientific name)", time_calls(
+        lambda value: db.species_suggestions("scientificName", value), prefixes
+    ))
+    record("location autocomplete", time_calls(db.location_suggestions, prefixes))
+    record("location autocomplete (nearest first)", time_calls(
+        lambda value: db.location_suggestions(value, SPOTS_CENTRE), prefixes
+    ))
+
+    # Nearby spots, through the LocationsGeo R*Tree
+    positions = [
+        (SPOTS_CENTRE[0] + rng.uniform(-SPOTS_SPREAD, SPOTS_SPREAD), SPOTS_CENTRE[1] + rng.uniform(-SPOTS_SPREAD, SPOTS_SPREAD))
+        for _ in range(repeat)
+    ]
+    record("nearby locations (10 km)", time_calls(db.nearby_locations, [(*position, 10) for position in positions]))
+    record("catches near (10 km)", time_calls(db.catches_near, [(*position, 10) for position in positions]))
+    located = [row[0] for row in db.reader().execute("SELECT locationName FROM Locations WHERE latitude IS NOT NULL LIMIT 100")]
+    record("species near (10 km)", time_calls(db.species_near, [(rng.choice(located), 10) for _ in range(repeat)]))
+
+    # submit_entry
+    species_ids = [row[0] for row in db.reader().execute("SELECT speciesID FROM Species")]
+    locations = [row[0] for row in db.reader().execute("SELECT locationName FROM Locations LIMIT 100")]
+    record("add_catch", time_calls(db.add_catch, [
+        (rng.choice(species_ids), rng.choice(locations), "2025-06-01 12:00") for _ in range(repeat)
+    ]))
+    batch = [
+        {"species_id": rng.choice(species_ids), "location_name": rng.choice(locations), "datetime": "2025-06-02 12:00"}
+        for _ in range(100)
+    ]
+    record("add_catches (100 per transaction)", time_calls(db.add_catches, [(batch,) for _ in range(max(1, repeat // 5))]))
+
+    # Photo decode, as the viewer and the preview pane do it
+    if photos and have_pillow():
+        photo_ids = [row[0] for row in db.reader().execute("SELECT photoID FROM Photos")]
+
+        def decode(photo_file):
+            with photo_file:
+                open_image(photo_file).load()
+
+        for kind in ("thumbnail", "preview"):
+            record(f"photo decode ({kind})", time_calls(
+                lambda photo_id: decode(db.open_rendition(photo_id, kind)),
+                [(rng.choice(photo_ids),) for _ in range(repeat)],
+            ))
+        record("photo decode (full size)", time_calls(
+            lambda photo_id: decode(db.open_photo(photo_id)), [(rng.choice(photo_ids),) for _ in range(repeat)]
+        ))
+        record("photo encode (upload)", time_calls(
+            lambda data: encode_catch_photo(io.BytesIO(data)),
+            [(synthetic_photo(rng),) for _ in range(max(1, repeat // 5))],
+        ))
+
+    return results
+
+
+def print_results(setup, results, baseline=None):
+    for name, seconds in setup.items():
+        print(f"{name:<48} {seconds:10.2f} s")
+    print()
+    header = f"{'benchmark':<48} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'peak MiB':>9}"
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    for name, summary in results.items():
+        line = (
+            f"{name:<48} {summary['n']:>6} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+            f"{summary['p99_ms']:>9.2f} {summary['max_ms']:>9.2f} {summary['peak_memory_mb']:>9.1f}"
+        )
+        if baseline and name in baseline and baseline[name]["p50_ms"] > 0:
+            line += f" {summary['p50_ms'] / baseline[name]['p50_ms']:>11.2f}x"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FishDex queries and writes on a generated data set.")
+    parser.add_argument("--species", type=int, default=DEFAULT_SPECIES, help=f"ReferenceSpecies rows (default: {DEFAULT_SPECIES})")
+    parser.add_argument("--catches", type=int, default=DEFAULT_CATCHES, help=f"CatchLog rows (default: {DEFAULT_CATCHES})")
+    parser.add_argument("--locations", type=int, default=DEFAULT_LOCATIONS, help=f"Locations rows (default: {DEFAULT_LOCATIONS})")
+    parser.add_argument("--caught-species", type=int, default=DEFAULT_CAUGHT_SPECIES, help=f"Distinct species in the Catch Log (default: {DEFAULT_CAUGHT_SPECIES})")
+    parser.add_argument("--photos", type=int, default=0, help="Distinct photos attached to half the catches (default: 0)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"Samples per benchmark (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed; the same seed generates the same data")
+    parser.add_argument("--workdir", help="Directory for the generated database (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated database")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results file from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="fishdex-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    db_path = os.path.join(workdir, "fishdex.db")
+    json_path = os.path.join(workdir, "fishBase.json")
+    for path in (db_path, db_path + "-wal", db_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+    if args.photos and not have_pillow():
+        print("Pillow is not installed: photos are stored as random bytes and photo decode is skipped.")
+
+    rng = random.Random(args.seed)
+    setup = {}
+    try:
+        start = time.perf_counter()
+        write_reference_json(json_path, rng, args.species)
+        setup["generate reference JSON"] = time.perf_counter() - start
+
+        stats = import_reference_species(json_path, db_path)
+        setup["reference import"] = stats["seconds"]
+
+        start = time.perf_counter()
+        db = Database(db_path)
+        setup["open database"] = time.perf_counter() - start
+        try:
+            for name, seconds in populate(db, rng, args.species, args.catches, args.locations, args.caught_species, args.photos).items():
+                setup[name] = seconds
+            results = run_benchmarks(db, rng, args.repeat, args.photos)
+        finally:
+            db.close()
+        results["reference import"] = {
+            **summarize([stats["seconds"]]),
+            "rows_per_second": stats["rows_per_second"],
+            "peak_memory_mb": stats["peak_memory"] / (1024 * 1024),
+        }
+    finally:
+        if args.keep or args.workdir:
+            print(f"Generated database kept in {db_path}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+    print_results(setup, results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"arguments": vars(args), "setup": setup, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
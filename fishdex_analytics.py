@@ -0,0 +1,196 @@
+import threading
+import time
+
+
+# Rows converted to arrays per fetchmany() call
+FETCH_BATCH_SIZE = 50000
+
+# Seconds per day and hour, catch times are seconds since the epoch of their wall clock
+DAY = 86400
+HOUR = 3600
+
+# Catch columns pulled in bulk. localAt is the catch time on the angler's wall
+# clock, so hours and days come out as they were written down.
+CATCH_COLUMNS_QUERY = '''
+    SELECT catchID, speciesID, locationID, localAt
+    FROM CatchLog
+    WHERE catchID > ?
+    ORDER BY catchID
+'''
+
+# When each species was first caught, in the order it was discovered
+DISCOVERY_QUERY = '''
+    SELECT s.orderDiscovered, fc.localAt
+    FROM Species s
+    JOIN SpeciesSummary ss ON ss.speciesID = s.speciesID
+    JOIN CatchLog fc ON fc.catchID = ss.firstCatchID
+    ORDER BY s.orderDiscovered
+'''
+
+# Names to label the dashboard with
+LOCATION_NAMES_QUERY = "SELECT locationID, locationName FROM Locations"
+SPECIES_NAMES_QUERY = '''
+    SELECT s.speciesID, COALESCE(r.commonName, r.scientificName)
+    FROM Species s
+    JOIN ReferenceSpecies r ON r.ID = s.speciesID
+'''
+
+# Largest (location, day) grid marked densely when counting fishing days
+MAX_DENSE_CELLS = 1 << 26
+
+# Identifies the state of the log: (row count, last catch ID, catch edits, name
+# edits). Appends change the first two, the LogRevision counters go up for
+# every edit or delete of a catch and every species or location change.
+CATCH_LOG_VERSION_QUERY = '''
+    SELECT COUNT(*), COALESCE(MAX(catchID), 0),
+           (SELECT catchEdits FROM LogRevision), (SELECT nameEdits FROM LogRevision)
+    FROM CatchLog
+'''
+
+
+def _numpy():
+    import numpy  # Optional dependency, only needed for the Analytics tab
+
+    return numpy
+
+
+class CatchStats:
+    """Catch statistics computed with NumPy over the whole Catch Log.
+
+    ``stats()`` returns compute_stats() plus ``discovery``, an array of
+    (orderDiscovered, first catch time) rows, the location and species names
+    by ID, and the number of catches.
+
+    The log's catch, species and location IDs and catch times are kept as
+    arrays. When catches are added only the new rows are fetched and appended;
+    edited or deleted catches reload the arrays, and renamed species or
+    locations only recompute the results. Results are cached per log version
+    (see CATCH_LOG_VERSION_QUERY). SQLite's data_version tells whether anything
+    was committed since the last call, so an unchanged log costs one PRAGMA.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._version = None
+        self._results = None
+        self._columns = None  # (catch IDs, species IDs, location IDs, times)
+        self._seen = None  # (reader connection, its data_version) when the results were made
+
+    def _fetch(self, after_id):
+        np = _numpy()
+        cursor = self.db.reader().execute(CATCH_COLUMNS_QUERY, (after_id,))
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.int64))
+        if not chunks:
+            return np.empty((0, 4), dtype=np.int64)
+        return np.concatenate(chunks)
+
+    def _load(self, version):
+        """Bring the arrays up to ``version``, fetching only new catches when possible."""
+        np = _numpy()
+        count, last_id, catch_edits, _ = version
+        if self._columns is not None and self._version is not None:
+            old_count, old_last_id, old_catch_edits, _ = self._version
+            if catch_edits == old_catch_edits and last_id >= old_last_id and count >= old_count:
+                new = self._fetch(old_last_id)
+                if old_count + len(new) == count:
+                    # Only appends since the last load
+                    self._columns = tuple(
+                        np.concatenate((column, new[:, index])) for index, column in enumerate(self._columns)
+                    )
+                    return len(new)
+
+        rows = self._fetch(0)
+        self._columns = tuple(rows[:, index].copy() for index in range(4))
+        return len(rows)
+
+    def stats(self):
+        """Return the analytics for the current Catch Log, computing them only if it changed."""
+        with self._lock:
+            start = time.perf_counter()
+            conn = self.db.reader()
+            # data_version only changes when another connection commits
+            seen = (conn, conn.execute("PRAGMA data_version").fetchone()[0])
+            if seen == self._seen and self._results is not None:
+                return self._results
+            version = tuple(conn.execute(CATCH_LOG_VERSION_QUERY).fetchone())
+            if version == self._version and self._results is not None:
+                self._seen = seen
+                return self._results
+
+            fetched = self._load(version)
+            self._version = version
+            results = compute_stats(*self._columns[1:])
+            np = _numpy()
+            discovery = conn.execute(DISCOVERY_QUERY).fetchall()
+            results["discovery"] = np.array(discovery, dtype=np.int64).reshape(-1, 2)
+            results["location_names"] = dict(conn.execute(LOCATION_NAMES_QUERY).fetchall())
+            results["species_names"] = dict(conn.execute(SPECIES_NAMES_QUERY).fetchall())
+            results["catches"] = len(self._columns[0])
+            results["fetched"] = fetched
+            results["seconds"] = time.perf_counter() - start
+            self._results = results
+            self._seen = seen
+            return results
+
+
+def _dense_index(ids):
+    """Return the distinct IDs in order and each row's position among them, without sorting."""
+    np = _numpy()
+    present = np.zeros(int(ids.max()) + 1, dtype=bool)
+    present[ids] = True
+    return np.flatnonzero(present), (np.cumsum(present) - 1)[ids]
+
+
+def compute_stats(species, locations, times):
+    """Aggregate catch columns into the dashboard statistics.
+
+    Returns a dict with:
+    - ``months``: first month of the log as (year, month) and number of months
+    - ``species_months``: species ID -> catches per month, an array over ``months``
+    - ``locations``: location ID -> (catches, fishing days, catches per day, last catch time)
+    - ``hours``: catches per hour of the day, 24 counts
+    """
+    np = _numpy()
+    results = {"months": None, "species_months": {}, "locations": {}, "hours": np.zeros(24, dtype=np.int64)}
+    if not len(times):
+        return results
+
+    # Catches per species per month, as one bincount over (species, month) cells
+    months = times.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+    first_month = months.min()
+    month_count = int(months.max() - first_month + 1)
+    species_ids, species_index = _dense_index(species)
+    cells = np.bincount(species_index * month_count + (months - first_month), minlength=len(species_ids) * month_count)
+    per_month = cells.reshape(len(species_ids), month_count)
+    results["months"] = ((int(first_month) // 12 + 1970, int(first_month) % 12 + 1), month_count)
+    results["species_months"] = dict(zip(species_ids.tolist(), per_month))
+
+    # Per location: catches, distinct days fished, and catches per fishing day
+    location_ids, location_index = _dense_index(locations)
+    location_counts = np.bincount(location_index, minlength=len(location_ids))
+    days = times // DAY
+    days -= days.min()
+    span = int(days.max()) + 1
+    cells = location_index * span + days
+    if len(location_ids) * span <= MAX_DENSE_CELLS:
+        fished = np.zeros(len(location_ids) * span, dtype=bool)
+        fished[cells] = True
+        fishing_days = fished.reshape(len(location_ids), span).sum(axis=1)
+    else:
+        fishing_days = np.bincount(np.unique(cells) // span, minlength=len(location_ids))
+    last_catch = np.full(len(location_ids), np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(last_catch, location_index, times)
+    results["locations"] = {
+        int(location_id): (int(count), int(days_fished), count / days_fished, int(last))
+        for location_id, count, days_fished, last in zip(location_ids, location_counts, fishing_days, last_catch)
+    }
+
+    # Time of day
+    results["hours"] = np.bincount((times % DAY) // HOUR, minlength=24)
+    return results
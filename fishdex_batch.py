@@ -0,0 +1,140 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fishdex_images import prepare_catch_photo
+
+
+# Files picked up from an import folder, the same types the Upload Photo dialog offers
+PHOTO_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def find_photos(folder):
+    """List the photos directly inside ``folder``, sorted by file name."""
+    return sorted(
+        entry.path for entry in os.scandir(folder)
+        if entry.is_file() and entry.name.lower().endswith(PHOTO_EXTENSIONS)
+    )
+
+
+def format_gps(gps):
+    """Location name prefilled for a photo with GPS data."""
+    return f"{gps[0]:.5f}, {gps[1]:.5f}"
+
+
+def prepare_photos(paths, max_workers=None, progress=None, cancelled=None):
+    """Read EXIF data and resize/encode every photo across a process pool.
+
+    ``progress(done, total)`` is called as photos finish and ``cancelled()`` is
+    checked between them; once it returns True the remaining photos are skipped.
+    Returns ``(prepared, failed, stats)``: the prepare_catch_photo() results in
+    path order, a list of ``(path, error message)`` and a stats dict.
+    """
+    start = time.perf_counter()
+    prepared = []
+    failed = []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(prepare_catch_photo, path): path for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                prepared.append(future.result())
+            except Exception as e:
+                failed.append((futures[future], str(e)))
+            if progress:
+                progress(done, len(futures))
+            if cancelled and cancelled():
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+
+    prepared.sort(key=lambda photo: photo["path"])
+    stats = {
+        "photos": len(prepared),
+        "failed": len(failed),
+        "source_bytes": sum(photo["source_bytes"] for photo in prepared),
+        "stored_bytes": sum(len(photo["data"]) for photo in prepared),
+        "prepare_seconds": time.perf_counter() - start,
+    }
+    return prepared, failed, stats
+
+
+def commit_photos(db, catches, stats):
+    """Store reviewed catches in one transaction and add the commit time to ``stats``.
+
+    ``catches`` are the dicts Database.add_catches() takes. Returns the new catch IDs.
+    """
+    start = time.perf_counter()
+    catch_ids = db.add_catches(catches)
+    stats["committed"] = len(catch_ids)
+    stats["commit_seconds"] = time.perf_counter() - start
+    return catch_ids
+
+
+def throughput_report(stats):
+    """Summarise a batch import as a few lines of text."""
+    seconds = stats["prepare_seconds"]
+    megabytes = stats["source_bytes"] / (1024 * 1024)
+    lines = [
+        f"Prepared {stats['photos']} photos ({stats['failed']} failed) in {seconds:.2f}s: "
+        f"{stats['photos'] / seconds if seconds > 0 else 0.0:.1f} photos/sec, "
+        f"{megabytes / seconds if seconds > 0 else 0.0:.1f} MiB/s read.",
+        f"Stored {stats['stored_bytes'] / (1024 * 1024):.1f} MiB from {megabytes:.1f} MiB of originals.",
+    ]
+    if "commit_seconds" in stats:
+        lines.append(f"Committed {stats['committed']} catches in one transaction in {stats['commit_seconds'] * 1000:.0f} ms.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import a folder of catch photos, dated from their EXIF data.")
+    parser.add_argument("folder", help="Folder of photos to import")
+    parser.add_argument("--db", default="fishdex.db", help="SQLite database file (default: fishdex.db)")
+    parser.add_argument("--species", type=int, help="Species ID to log every photo as; without it nothing is committed")
+    parser.add_argument("--location", help="Location name for photos without GPS data")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    paths = find_photos(args.folder)
+    if not paths:
+        parser.error(f"No photos found in {args.folder}")
+
+    prepared, failed, stats = prepare_photos(
+        paths, args.workers, lambda done, total: print(f"\rPrepared {done}/{total}", end="", flush=True)
+    )
+    print()
+    for path, error in failed:
+        print(f"Skipped {path}: {error}")
+
+    for photo in prepared:
+        location = format_gps(photo["gps"]) if photo["gps"] else args.location
+        print(f"{os.path.basename(photo['path'])}\t{photo['datetime']}\t{location or '(no location)'}")
+
+    if args.species is not None:
+        catches = []
+        for photo in prepared:
+            location = format_gps(photo["gps"]) if photo["gps"] else args.location
+            if not location:
+                parser.error(f"{photo['path']} has no GPS data, pass --location")
+            catches.append({
+                "species_id": args.species,
+                "location_name": location,
+                "datetime": photo["datetime"],
+                "photo_data": photo["data"],
+                "photo_renditions": photo["renditions"],
+                "coordinates": photo["gps"],
+            })
+
+        from fishdex_db import Database
+
+        db = Database(args.db)
+        try:
+            commit_photos(db, catches, stats)
+        finally:
+            db.close()
+
+    print(throughput_report(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1798 @@
+import math
+import time
+import sqlite3
+import threading
+import re
+import io
+import json
+import hashlib
+import logging
+import datetime
+from contextlib import contextmanager
+from functools import lru_cache
+
+from fishdex_fuzzy import MIN_FUZZY_QUERY, index_path_for, open_fuzzy_index, reference_signature
+from fishdex_metrics import TimedConnection
+
+
+DB_PATH = "fishdex.db"
+
+logger = logging.getLogger(__name__)
+
+# Tuned for a single-user desktop database: WAL lets readers run alongside the
+# writer, NORMAL sync is durable across application crashes in WAL mode.
+PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -32000",       # 32 MiB page cache
+    "PRAGMA mmap_size = 268435456",     # 256 MiB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Size of each connection's prepared statement cache. Queries below are module
+# constants so repeated calls reuse the compiled statement.
+STATEMENT_CACHE_SIZE = 256
+
+
+# --- Schema ---
+CREATE_LOCATIONS = '''
+CREATE TABLE IF NOT EXISTS Locations (
+    locationID INTEGER PRIMARY KEY AUTOINCREMENT,
+    locationName TEXT UNIQUE NOT NULL
+);
+'''
+
+CREATE_CATCH_LOG = '''
+CREATE TABLE IF NOT EXISTS CatchLog (
+    catchID INTEGER PRIMARY KEY AUTOINCREMENT,
+    speciesID INTEGER NOT NULL,
+    datetimeCaught TEXT NOT NULL,
+    locationID INTEGER NOT NULL,
+    photoID INTEGER,
+    FOREIGN KEY (speciesID) REFERENCES ReferenceSpecies(ID) ON DELETE CASCADE,
+    FOREIGN KEY (locationID) REFERENCES Locations(locationID) ON DELETE CASCADE,
+    FOREIGN KEY (photoID) REFERENCES Photos(photoID)
+);
+'''
+
+# Photo bytes live outside CatchLog so scans of the log never page through image data.
+# Photos are addressed by the SHA-256 of their bytes, identical uploads are stored once.
+CREATE_PHOTOS = '''
+CREATE TABLE IF NOT EXISTS Photos (
+    photoID INTEGER PRIMARY KEY,
+    sha256 TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+'''
+
+# Downscaled copies of each photo (thumbnail, preview) made at upload time
+CREATE_PHOTO_RENDITIONS = '''
+CREATE TABLE IF NOT EXISTS PhotoRenditions (
+    renditionID INTEGER PRIMARY KEY,
+    photoID INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    UNIQUE (photoID, kind),
+    FOREIGN KEY (photoID) REFERENCES Photos(photoID) ON DELETE CASCADE
+);
+'''
+
+CREATE_SPECIES = '''
+CREATE TABLE IF NOT EXISTS Species (
+    speciesID INTEGER PRIMARY KEY,
+    quantityCaught INTEGER DEFAULT 0,
+    orderDiscovered INTEGER UNIQUE,
+    FOREIGN KEY (speciesID) REFERENCES ReferenceSpecies(ID) ON DELETE CASCADE
+);
+'''
+
+CREATE_REFERENCE_SPECIES = '''
+CREATE TABLE IF NOT EXISTS ReferenceSpecies (
+    ID INTEGER PRIMARY KEY,
+    scientificName TEXT NOT NULL,
+    commonName TEXT,
+    imageLink TEXT,
+    fishLink TEXT
+);
+'''
+
+
+def create_reference_table(conn):
+    """Create the ReferenceSpecies table if it doesn't exist."""
+    conn.execute(CREATE_REFERENCE_SPECIES)
+
+
+def reference_hash(scientific_name, common_name, image_link, fish_link):
+    """64-bit content hash of a ReferenceSpecies row, stored in contentHash to spot changed rows."""
+    content = json.dumps([scientific_name, common_name, image_link, fish_link], ensure_ascii=False)
+    digest = hashlib.blake2b(content.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)  # Fits an SQLite INTEGER
+
+
+def create_reference_search_index(conn):
+    """Create the trigram FTS5 index over species names and the triggers that keep it in sync.
+
+    Returns True if the index was newly created (and therefore already rebuilt).
+    """
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'ReferenceSpeciesSearch'"
+    ).fetchone() is None
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS ReferenceSpeciesSearch USING fts5(
+            commonName,
+            scientificName,
+            content='ReferenceSpecies',
+            content_rowid='ID',
+            tokenize='trigram'
+        )
+    """)
+
+    # Keep the external-content index in sync with ReferenceSpecies
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS ReferenceSpecies_search_insert AFTER INSERT ON ReferenceSpecies BEGIN
+            INSERT INTO ReferenceSpeciesSearch (rowid, commonName, scientificName)
+            VALUES (new.ID, new.commonName, new.scientificName);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS ReferenceSpecies_search_delete AFTER DELETE ON ReferenceSpecies BEGIN
+            INSERT INTO ReferenceSpeciesSearch (ReferenceSpeciesSearch, rowid, commonName, scientificName)
+            VALUES ('delete', old.ID, old.commonName, old.scientificName);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS ReferenceSpecies_search_update
+        AFTER UPDATE OF scientificName, commonName ON ReferenceSpecies BEGIN
+            INSERT INTO ReferenceSpeciesSearch (ReferenceSpeciesSearch, rowid, commonName, scientificName)
+            VALUES ('delete', old.ID, old.commonName, old.scientificName);
+            INSERT INTO ReferenceSpeciesSearch (rowid, commonName, scientificName)
+            VALUES (new.ID, new.commonName, new.scientificName);
+        END
+    """)
+
+    # Index any rows that were added before the index existed
+    if created:
+        rebuild_reference_search_index(conn)
+    return created
+
+
+def drop_reference_search_triggers(conn):
+    """Drop the sync triggers so a bulk load doesn't update the index row by row."""
+    for name in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS ReferenceSpecies_search_{name}")
+
+
+def rebuild_reference_search_index(conn):
+    """Rebuild the species name index from the ReferenceSpecies table."""
+    conn.execute("INSERT INTO ReferenceSpeciesSearch (ReferenceSpeciesSearch) VALUES ('rebuild')")
+
+
+def create_location_search_index(conn):
+    """Create the trigram FTS5 index over location names and its sync triggers."""
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'LocationsSearch'"
+    ).fetchone() is None
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS LocationsSearch USING fts5(
+            locationName,
+            content='Locations',
+            content_rowid='locationID',
+            tokenize='trigram'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Locations_search_insert AFTER INSERT ON Locations BEGIN
+            INSERT INTO LocationsSearch (rowid, locationName) VALUES (new.locationID, new.locationName);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Locations_search_delete AFTER DELETE ON Locations BEGIN
+            INSERT INTO LocationsSearch (LocationsSearch, rowid, locationName)
+            VALUES ('delete', old.locationID, old.locationName);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Locations_search_update AFTER UPDATE OF locationName ON Locations BEGIN
+            INSERT INTO LocationsSearch (LocationsSearch, rowid, locationName)
+            VALUES ('delete', old.locationID, old.locationName);
+            INSERT INTO LocationsSearch (rowid, locationName) VALUES (new.locationID, new.locationName);
+        END
+    """)
+
+    if created:
+        conn.execute("INSERT INTO LocationsSearch (LocationsSearch) VALUES ('rebuild')")
+    return created
+
+
+# Recompute one species' summary row from its catches (uses idx_CatchLog_species_caughtAt)
+REFRESH_SPECIES_SUMMARY = '''
+    DELETE FROM SpeciesSummary WHERE speciesID = {species};
+    INSERT INTO SpeciesSummary (speciesID, catchCount, firstCaughtAt, firstCatchID, firstLocationID, lastCaughtAt)
+    SELECT
+        speciesID,
+        COUNT(*),
+        MIN(caughtAt),
+        (SELECT catchID FROM CatchLog
+         WHERE speciesID = {species}
+         ORDER BY caughtAt, catchID
+         LIMIT 1),
+        (SELECT locationID FROM CatchLog
+         WHERE speciesID = {species}
+         ORDER BY caughtAt, catchID
+         LIMIT 1),
+        MAX(caughtAt)
+    FROM CatchLog
+    WHERE speciesID = {species}
+    GROUP BY speciesID;
+'''
+
+
+def create_species_summary(conn):
+    """Create the per-species catch summary, its maintenance triggers and the CatchLog indexes they rely on.
+
+    First and last catches are found by caughtAt, so catches logged in
+    different time zones still compare in the order they happened.
+    Returns True if the summary table was newly created (and therefore backfilled).
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_CatchLog_species_caughtAt ON CatchLog(speciesID, caughtAt)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_CatchLog_locationID ON CatchLog(locationID)")
+
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'SpeciesSummary'"
+    ).fetchone() is None
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS SpeciesSummary (
+            speciesID INTEGER PRIMARY KEY,
+            catchCount INTEGER NOT NULL,
+            firstCaughtAt INTEGER,
+            firstCatchID INTEGER,
+            firstLocationID INTEGER,
+            lastCaughtAt INTEGER
+        )
+    ''')
+
+    # Inserts are the common case and only need the new row
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS CatchLog_summary_insert AFTER INSERT ON CatchLog BEGIN
+            INSERT INTO SpeciesSummary (speciesID, catchCount, firstCaughtAt, firstCatchID, firstLocationID, lastCaughtAt)
+            VALUES (new.speciesID, 1, new.caughtAt, new.catchID, new.locationID, new.caughtAt)
+            ON CONFLICT (speciesID) DO UPDATE SET
+                catchCount = catchCount + 1,
+                firstCatchID = CASE WHEN excluded.firstCaughtAt < firstCaughtAt
+                                    THEN excluded.firstCatchID ELSE firstCatchID END,
+                firstLocationID = CASE WHEN excluded.firstCaughtAt < firstCaughtAt
+                                       THEN excluded.firstLocationID ELSE firstLocationID END,
+                firstCaughtAt = MIN(firstCaughtAt, excluded.firstCaughtAt),
+                lastCaughtAt = MAX(lastCaughtAt, excluded.lastCaughtAt);
+        END
+    ''')
+
+    # Deletes and edits may remove the first or last catch, so recompute the species from its index
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS CatchLog_summary_delete AFTER DELETE ON CatchLog BEGIN
+            {REFRESH_SPECIES_SUMMARY.format(species="old.speciesID")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS CatchLog_summary_update
+        AFTER UPDATE OF speciesID, caughtAt, utcOffset, locationID ON CatchLog BEGIN
+            {REFRESH_SPECIES_SUMMARY.format(species="old.speciesID")}
+            {REFRESH_SPECIES_SUMMARY.format(species="new.speciesID")}
+        END
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_SpeciesSummary_firstCaughtAt ON SpeciesSummary(firstCaughtAt)")
+
+    # Backfill databases that already have catches
+    if created:
+        rebuild_species_summary(conn)
+    return created
+
+
+def rebuild_species_summary(conn):
+    """Recompute SpeciesSummary from the whole CatchLog."""
+    conn.execute("DELETE FROM SpeciesSummary")
+    conn.execute('''
+        INSERT INTO SpeciesSummary (speciesID, catchCount, firstCaughtAt, firstCatchID, firstLocationID, lastCaughtAt)
+        SELECT
+            c.speciesID,
+            COUNT(*),
+            MIN(c.caughtAt),
+            (SELECT c2.catchID FROM CatchLog c2
+             WHERE c2.speciesID = c.speciesID
+             ORDER BY c2.caughtAt, c2.catchID
+             LIMIT 1),
+            (SELECT c2.locationID FROM CatchLog c2
+             WHERE c2.speciesID = c.speciesID
+             ORDER BY c2.caughtAt, c2.catchID
+             LIMIT 1),
+            MAX(c.caughtAt)
+        FROM CatchLog c
+        GROUP BY c.speciesID
+    ''')
+
+
+def create_photo_store(conn):
+    """Create the Photos tables and link them to CatchLog, adding CatchLog.photoID to older databases."""
+    conn.execute(CREATE_PHOTOS)
+    conn.execute(CREATE_PHOTO_RENDITIONS)
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(CatchLog)")}
+    if "photoID" not in columns:
+        conn.execute("ALTER TABLE CatchLog ADD COLUMN photoID INTEGER REFERENCES Photos(photoID)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_CatchLog_photoID ON CatchLog(photoID)")
+
+    # Drop photos once no catch refers to them anymore
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS CatchLog_photo_delete
+        AFTER DELETE ON CatchLog
+        WHEN old.photoID IS NOT NULL
+         AND NOT EXISTS (SELECT 1 FROM CatchLog WHERE photoID = old.photoID)
+        BEGIN
+            DELETE FROM Photos WHERE photoID = old.photoID;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS Photos_renditions_delete AFTER DELETE ON Photos BEGIN
+            DELETE FROM PhotoRenditions WHERE photoID = old.photoID;
+        END
+    ''')
+
+
+def store_photo(conn, data, renditions=None):
+    """Store photo bytes in Photos, reusing the existing row for identical bytes. Returns the photoID.
+
+    ``renditions`` maps a kind to (jpeg bytes, width, height), as made by
+    fishdex_images.make_renditions().
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    conn.execute(
+        "INSERT INTO Photos (sha256, size, data) VALUES (?, ?, ?) ON CONFLICT (sha256) DO NOTHING",
+        (digest, len(data), data),
+    )
+    photo_id = conn.execute("SELECT photoID FROM Photos WHERE sha256 = ?", (digest,)).fetchone()[0]
+    if renditions:
+        store_renditions(conn, photo_id, renditions)
+    return photo_id
+
+
+def store_renditions(conn, photo_id, renditions):
+    """Store downscaled copies of a photo, keeping any that already exist."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO PhotoRenditions (photoID, kind, width, height, data) VALUES (?, ?, ?, ?, ?)",
+        [(photo_id, kind, width, height, data) for kind, (data, width, height) in renditions.items()],
+    )
+
+
+def migrate_inline_photos(conn, batch_size=100, progress=None):
+    """Move photos stored inline in CatchLog.photo into the Photos store.
+
+    Works in batches, each in its own transaction, so an interrupted migration
+    resumes where it stopped. When everything is moved the old column is dropped
+    (SQLite 3.35+). ``progress(moved)`` is called after every batch. Returns a dict
+    with the number of photos moved and how many of them were duplicates.
+    """
+    stats = {"moved": 0, "duplicates": 0}
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(CatchLog)")}
+    if "photo" not in columns:
+        return stats
+
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT catchID, photo FROM CatchLog WHERE photo IS NOT NULL LIMIT ?", (batch_size,)
+            ).fetchall()
+            for catch_id, data in rows:
+                if not isinstance(data, (bytes, bytearray)):
+                    # Not image data, nothing worth keeping
+                    conn.execute("UPDATE CatchLog SET photo = NULL WHERE catchID = ?", (catch_id,))
+                    continue
+                before = conn.total_changes
+                photo_id = store_photo(conn, bytes(data))
+                if conn.total_changes == before:
+                    stats["duplicates"] += 1
+                conn.execute("UPDATE CatchLog SET photoID = ?, photo = NULL WHERE catchID = ?", (photo_id, catch_id))
+                stats["moved"] += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if progress:
+            progress(stats["moved"])
+        if len(rows) < batch_size:
+            break
+
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        conn.execute("ALTER TABLE CatchLog DROP COLUMN photo")
+    return stats
+
+
+def create_schema(conn):
+    """Create every FishDex table and index that doesn't exist yet."""
+    conn.execute(CREATE_LOCATIONS)
+    conn.execute(CREATE_CATCH_LOG)
+    conn.execute(CREATE_SPECIES)
+    create_photo_store(conn)
+    create_reference_table(conn)
+    create_reference_search_index(conn)
+    create_location_search_index(conn)
+
+    # Species tab sort orders
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_Species_orderDiscovered ON Species(orderDiscovered)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_Species_quantityCaught ON Species(quantityCaught)")
+
+    # The CatchLog indexes and SpeciesSummary are made by store_catch_times()
+    # once CatchLog has its current shape
+
+
+def add_reference_hashes(conn):
+    """Add ReferenceSpecies.contentHash and fill it in for the existing rows."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(ReferenceSpecies)")}
+    if "contentHash" not in columns:
+        conn.execute("ALTER TABLE ReferenceSpecies ADD COLUMN contentHash INTEGER")
+
+    # Older search triggers fire on any update; recreate it for name changes only
+    # so filling in the hashes doesn't reindex every name
+    conn.execute("DROP TRIGGER IF EXISTS ReferenceSpecies_search_update")
+    conn.create_function("reference_hash", 4, reference_hash, deterministic=True)
+    conn.execute("UPDATE ReferenceSpecies SET contentHash = reference_hash(scientificName, commonName, imageLink, fishLink)")
+    create_reference_search_index(conn)
+
+
+# CatchLog since schema version 3. caughtAt is UTC seconds since the epoch and
+# utcOffset the seconds the angler's wall clock was ahead of UTC. localAt and
+# datetimeCaught are that wall-clock time as seconds and as the text the views
+# show; they are computed, not stored.
+CREATE_CATCH_LOG_TIMES = '''
+CREATE TABLE CatchLog_new (
+    catchID INTEGER PRIMARY KEY AUTOINCREMENT,
+    speciesID INTEGER NOT NULL,
+    caughtAt INTEGER NOT NULL,
+    utcOffset INTEGER NOT NULL DEFAULT 0,
+    locationID INTEGER NOT NULL,
+    photoID INTEGER,{extra_columns}
+    localAt INTEGER GENERATED ALWAYS AS (caughtAt + utcOffset) VIRTUAL,
+    datetimeCaught TEXT GENERATED ALWAYS AS (strftime('%Y-%m-%d %H:%M', caughtAt + utcOffset, 'unixepoch')) VIRTUAL,
+    FOREIGN KEY (speciesID) REFERENCES ReferenceSpecies(ID) ON DELETE CASCADE,
+    FOREIGN KEY (locationID) REFERENCES Locations(locationID) ON DELETE CASCADE,
+    FOREIGN KEY (photoID) REFERENCES Photos(photoID)
+);
+'''
+
+# Month of a catch on the angler's calendar, the expression idx_CatchLog_month indexes
+CATCH_MONTH = "CAST(strftime('%m', c.localAt, 'unixepoch') AS INTEGER)"
+
+
+def store_catch_times(conn):
+    """Rebuild CatchLog with catch times as epoch integers and index them.
+
+    The old datetimeCaught text is read as local time on this computer, which
+    is where the app wrote it. The rebuild fails, leaving the database as it
+    was, if any catch time can't be read.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(CatchLog)")}
+    unreadable = []
+
+    def catch_time(catch_id, value, part):
+        try:
+            return parse_catch_time(value)[part]
+        except (TypeError, ValueError):
+            unreadable.append((catch_id, value))
+            return 0
+
+    if "caughtAt" not in columns:
+        # Inline photos still waiting for migrate_inline_photos() come along
+        inline_photos = "photo" in columns
+        conn.execute("DROP TABLE IF EXISTS CatchLog_new")
+        conn.execute(CREATE_CATCH_LOG_TIMES.format(extra_columns="\n    photo BLOB," if inline_photos else ""))
+        conn.create_function("catch_time", 3, catch_time)
+        conn.execute(f'''
+            INSERT INTO CatchLog_new (catchID, speciesID, caughtAt, utcOffset, locationID, photoID{", photo" if inline_photos else ""})
+            SELECT catchID, speciesID, catch_time(catchID, datetimeCaught, 0), catch_time(catchID, datetimeCaught, 1),
+                   locationID, photoID{", photo" if inline_photos else ""}
+            FROM CatchLog
+        ''')
+        if unreadable:
+            examples = ", ".join(f"catch {catch_id}: {value!r}" for catch_id, value in unreadable[:5])
+            raise ValueError(f"{len(unreadable)} catch times can't be read as dates ({examples})")
+
+        # Keep handing out catch IDs after the highest one ever used, not just the highest left
+        sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'CatchLog'").fetchone()
+        conn.execute("DROP TABLE CatchLog")  # Its indexes and triggers go with it
+        conn.execute("ALTER TABLE CatchLog_new RENAME TO CatchLog")
+        if sequence is not None:
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'CatchLog'", sequence)
+
+    # Sorting, date ranges and date searches scan this index; the month index
+    # answers searches like "July" across every year
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_CatchLog_localAt ON CatchLog(localAt)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_CatchLog_month ON CatchLog(CAST(strftime('%m', localAt, 'unixepoch') AS INTEGER), localAt)"
+    )
+    create_photo_store(conn)
+
+    # The summary is derived data, rebuild it around caughtAt
+    for name in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS CatchLog_summary_{name}")
+    conn.execute("DROP TABLE IF EXISTS SpeciesSummary")
+    create_species_summary(conn)
+
+
+# --- Coordinates ---
+EARTH_RADIUS_KM = 6371.0088
+
+# A location name that is a position, as photo imports prefill it: "47.60621, -122.33207"
+COORDINATES = re.compile(r"^\s*([+-]?\d{1,3}(?:\.\d+)?)\s*,\s*([+-]?\d{1,3}(?:\.\d+)?)\s*$")
+
+
+def parse_coordinates(text):
+    """Return (latitude, longitude) degrees written as "lat, lon", or None if the text isn't a position."""
+    match = COORDINATES.match(text or "")
+    if match is None:
+        return None
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two positions, or None if either is missing."""
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return None
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    half_chord = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(half_chord)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Named parameters of the latitude/longitude box holding every point within ``radius_km``.
+
+    The box is what the LocationsGeo R*Tree is searched with; distance_km()
+    then drops its corners. Near a pole, or where the box would cross the
+    antimeridian, it spans every longitude.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    min_lon, max_lon = -180.0, 180.0
+    if -90 < min_lat and max_lat < 90:
+        # Widest longitude difference of a point within the radius, at this latitude
+        spread = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))
+        if spread < 1:
+            delta_lon = math.degrees(math.asin(spread))
+            if -180 <= longitude - delta_lon and longitude + delta_lon <= 180:
+                min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    return {
+        "latitude": latitude, "longitude": longitude, "radius": radius_km,
+        "min_lat": max(min_lat, -90.0), "max_lat": min(max_lat, 90.0), "min_lon": min_lon, "max_lon": max_lon,
+    }
+
+
+def add_location_coordinates(conn):
+    """Add optional Locations.latitude/longitude, an R*Tree over them, and fill them in from names that are positions.
+
+    LocationsGeo holds one point per located spot, keyed by locationID, and is
+    kept in step with Locations by triggers. Locations named after a photo's
+    GPS position get that position.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(Locations)")}
+    if "latitude" not in columns:
+        conn.execute("ALTER TABLE Locations ADD COLUMN latitude REAL")
+        conn.execute("ALTER TABLE Locations ADD COLUMN longitude REAL")
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS LocationsGeo USING rtree(
+            locationID, minLatitude, maxLatitude, minLongitude, maxLongitude
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Locations_geo_insert AFTER INSERT ON Locations
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+            INSERT INTO LocationsGeo VALUES (new.locationID, new.latitude, new.latitude, new.longitude, new.longitude);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Locations_geo_update AFTER UPDATE OF latitude, longitude ON Locations BEGIN
+            DELETE FROM LocationsGeo WHERE locationID = old.locationID;
+            INSERT INTO LocationsGeo
+            SELECT new.locationID, new.latitude, new.latitude, new.longitude, new.longitude
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS Locations_geo_delete AFTER DELETE ON Locations BEGIN
+            DELETE FROM LocationsGeo WHERE locationID = old.locationID;
+        END
+    """)
+
+    # The location search trigger fires on any update; recreate it for name
+    # changes only so filling in positions doesn't reindex every name
+    conn.execute("DROP TRIGGER IF EXISTS Locations_search_update")
+    create_location_search_index(conn)
+
+    located = [
+        (*coordinates, location_id)
+        for location_id, name in conn.execute("SELECT locationID, locationName FROM Locations WHERE latitude IS NULL")
+        if (coordinates := parse_coordinates(name)) is not None
+    ]
+    conn.executemany(SET_MISSING_COORDINATES, located)
+
+
+# Catch Log sort columns since schema version 5: copies of the species names and
+# the location name of each catch, so sorting by them walks an index instead of
+# sorting the whole joined log. Missing names sort as the views show them.
+CATCH_SORT_NAMES = {
+    "commonNameSort": "COALESCE((SELECT commonName FROM ReferenceSpecies WHERE ID = {species}), '')",
+    "scientificNameSort": "COALESCE((SELECT scientificName FROM ReferenceSpecies WHERE ID = {species}), '')",
+    "locationNameSort": "COALESCE((SELECT locationName FROM Locations WHERE locationID = {location}), 'Unknown')",
+}
+SPECIES_SORT_NAMES = ("commonNameSort", "scientificNameSort")
+LOCATION_SORT_NAMES = ("locationNameSort",)
+
+
+def catch_sort_names(species, location, columns=tuple(CATCH_SORT_NAMES)):
+    """SET clause filling in sort columns from SQL expressions for a catch's species and location IDs."""
+    return ", ".join(
+        f"{column} = {CATCH_SORT_NAMES[column].format(species=species, location=location)}" for column in columns
+    )
+
+
+def add_catch_log_sort_columns(conn):
+    """Add the CatchLog name sort columns, fill them in, index them and keep them up to date with triggers.
+
+    insert_catch() writes the columns with the row. Catches inserted any other
+    way, and edits of a catch's species or location, are filled in by
+    triggers. Adding, renaming or removing a species or location rewrites the
+    columns of its catches through idx_CatchLog_species_caughtAt or
+    idx_CatchLog_locationID.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(CatchLog)")}
+    for column in CATCH_SORT_NAMES:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE CatchLog ADD COLUMN {column} TEXT")
+    # Qualified, an unqualified locationID in the subquery would be the Locations column
+    conn.execute(f"UPDATE CatchLog SET {catch_sort_names('CatchLog.speciesID', 'CatchLog.locationID')}")
+
+    # Each index also orders by catchID, the rowid, so it serves the (sort key, catchID) keyset as is
+    for column in CATCH_SORT_NAMES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_CatchLog_{column} ON CatchLog({column})")
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS CatchLog_sort_insert AFTER INSERT ON CatchLog
+        WHEN new.commonNameSort IS NULL OR new.scientificNameSort IS NULL OR new.locationNameSort IS NULL BEGIN
+            UPDATE CatchLog SET {catch_sort_names("new.speciesID", "new.locationID")} WHERE catchID = new.catchID;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS CatchLog_sort_species AFTER UPDATE OF speciesID ON CatchLog BEGIN
+            UPDATE CatchLog SET {catch_sort_names("new.speciesID", None, SPECIES_SORT_NAMES)}
+            WHERE catchID = new.catchID;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS CatchLog_sort_location AFTER UPDATE OF locationID ON CatchLog BEGIN
+            UPDATE CatchLog SET {catch_sort_names(None, "new.locationID", LOCATION_SORT_NAMES)}
+            WHERE catchID = new.catchID;
+        END
+    """)
+    for name, event, row in (
+        ("insert", "INSERT", "new"), ("update", "UPDATE OF commonName, scientificName", "new"), ("delete", "DELETE", "old"),
+    ):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS ReferenceSpecies_sort_{name} AFTER {event} ON ReferenceSpecies BEGIN
+                UPDATE CatchLog SET {catch_sort_names(f"{row}.ID", None, SPECIES_SORT_NAMES)}
+                WHERE speciesID = {row}.ID;
+            END
+        """)
+    for name, event, row in (
+        ("insert", "INSERT", "new"), ("update", "UPDATE OF locationName", "new"), ("delete", "DELETE", "old"),
+    ):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS Locations_sort_{name} AFTER {event} ON Locations BEGIN
+                UPDATE CatchLog SET {catch_sort_names(None, f"{row}.locationID", LOCATION_SORT_NAMES)}
+                WHERE locationID = {row}.locationID;
+            END
+        """)
+
+
+def add_log_revision(conn):
+    """Add LogRevision, counters of the changes to the log that adding catches doesn't explain.
+
+    ``catchEdits`` goes up whenever a catch is edited or deleted and
+    ``nameEdits`` whenever a species or location is added, renamed or
+    removed, so caches of the log can tell appends from everything else.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS LogRevision (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            catchEdits INTEGER NOT NULL DEFAULT 0,
+            nameEdits INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO LogRevision (id) VALUES (1)")
+    for name, event in (
+        ("update", "UPDATE OF speciesID, caughtAt, utcOffset, locationID ON CatchLog"),
+        ("delete", "DELETE ON CatchLog"),
+    ):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS CatchLog_revision_{name} AFTER {event} BEGIN
+                UPDATE LogRevision SET catchEdits = catchEdits + 1 WHERE id = 1;
+            END
+        """)
+    for name, event in (
+        ("species_insert", "INSERT ON ReferenceSpecies"),
+        ("species_update", "UPDATE OF commonName, scientificName ON ReferenceSpecies"),
+        ("species_delete", "DELETE ON ReferenceSpecies"),
+        ("location_update", "UPDATE OF locationName ON Locations"),
+        ("location_delete", "DELETE ON Locations"),
+    ):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS LogRevision_{name} AFTER {event} BEGIN
+                UPDATE LogRevision SET nameEdits = nameEdits + 1 WHERE id = 1;
+            END
+        """)
+
+
+# Schema upgrades in order; a database at PRAGMA user_version N still needs
+# MIGRATIONS[N:]. Version 1 is everything from before the schema was versioned,
+# so unversioned databases pick up whatever they are missing from it.
+MIGRATIONS = (
+    create_schema,
+    add_reference_hashes,
+    store_catch_times,
+    add_location_coordinates,
+    add_catch_log_sort_columns,
+    add_log_revision,
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Upgrade the database to SCHEMA_VERSION, one transaction per version.
+
+    Each step commits together with its new user_version, so an interrupted
+    upgrade resumes at the step that failed. Returns the versions applied.
+    """
+    applied = []
+    if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+        return applied  # Up to date, don't take the write lock
+    for version, step in enumerate(MIGRATIONS, 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Read under the write lock in case another process is migrating too
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            if current > SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Database schema version {current} is newer than this FishDex supports ({SCHEMA_VERSION})"
+                )
+            if current < version:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                applied.append(version)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return applied
+
+
+def connect(path=DB_PATH, readonly=False, timed=False):
+    """Open a connection in autocommit mode with WAL journaling and the tuned pragmas applied.
+
+    Transactions are started explicitly (see Database.transaction) rather than
+    implicitly by the sqlite3 module. A ``timed`` connection records every
+    statement in fishdex_metrics. Queries can call distance_km().
+    """
+    conn = sqlite3.connect(
+        path,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        factory=TimedConnection if timed else sqlite3.Connection,
+    )
+    if not readonly:
+        conn.execute("PRAGMA journal_mode = WAL")
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+    conn.create_function("distance_km", 4, distance_km, deterministic=True)
+    return conn
+
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input is matched literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# --- Catch times ---
+# How catch times are entered and shown: the angler's wall clock, to the minute
+CATCH_TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# Shape of a catch time; a search is a date if it is a prefix of this (digits for the zeros)
+CATCH_TIME_SHAPE = "0000-00-00 00:00"
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# Month names a search can match, at least their first three letters
+MONTH_NAMES = (
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+)
+
+# Seconds per day, for day boundaries on the wall clock
+DAY_SECONDS = 86400
+
+
+def parse_catch_time(value):
+    """Turn a catch time into ``(caughtAt, utcOffset)`` seconds.
+
+    ``value`` is a datetime or ISO 8601 text such as "2024-07-01 18:30" or
+    "2024-07-01 18:30+02:00". Times without an offset are on this computer's
+    clock, with the daylight saving rule in force on that date.
+    """
+    moment = value if isinstance(value, datetime.datetime) else datetime.datetime.fromisoformat(value.strip())
+    if moment.tzinfo is None:
+        moment = moment.astimezone()
+    return int(moment.timestamp() // 1), int(moment.utcoffset().total_seconds())
+
+
+# Optional UTC offset after a catch time, as devices in another time zone send it
+UTC_OFFSET = re.compile(r"^[+-]\d\d:\d\d$")
+
+
+def check_catch(species_id, location_name, datetime_value):
+    """Return why a new catch can't be logged, or None if it can.
+
+    These are the New Entry form's rules, shared with the HTTP API: every
+    field is required, and the time is "YYYY-MM-DD HH:MM", optionally followed
+    by a UTC offset, and not in the future.
+    """
+    if species_id in (None, "") or not location_name or not datetime_value:
+        return "All fields except photo are required."
+    try:
+        datetime.datetime.strptime(datetime_value[:16], CATCH_TIME_FORMAT)
+        if datetime_value[16:] and not UTC_OFFSET.match(datetime_value[16:]):
+            raise ValueError(datetime_value)
+        caught_at = parse_catch_time(datetime_value)[0]
+    except ValueError:
+        return "Invalid datetime format. Use YYYY-MM-DD HH:MM."
+    if caught_at > time.time():
+        return "Datetime cannot be in the future."
+    return None
+
+
+def format_utc_offset(seconds):
+    """ISO 8601 form of a UTC offset, such as "+02:00"."""
+    sign = "-" if seconds < 0 else "+"
+    hours, minutes = divmod(abs(seconds) // 60, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+def wall_clock_seconds(moment):
+    """Seconds since the epoch of a wall-clock datetime, the scale of CatchLog.localAt."""
+    return int((moment.replace(tzinfo=None) - EPOCH).total_seconds())
+
+
+def _earliest_catch_time(text):
+    """Wall-clock seconds of the earliest valid catch time that sorts at or after ``text``.
+
+    ``text`` is a prefix of CATCH_TIME_SHAPE; returns None past year 9999.
+    """
+    padded = text + CATCH_TIME_SHAPE[len(text):]
+    year, month, day, hour, minute = (int(part) for part in re.split("[- :]", padded))
+    year = max(year, 1)
+    if month > 12:
+        year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+    month = max(month, 1)
+    if year > 9999:
+        return None
+    start = datetime.datetime(year, month, 1)
+    if day > 1:
+        days_in_month = ((start + datetime.timedelta(days=31)).replace(day=1) - start).days
+        if day > days_in_month:
+            return wall_clock_seconds(start + datetime.timedelta(days=days_in_month))
+        start = start.replace(day=day)
+    # An hour or minute past its range rolls over into the next day or hour
+    return wall_clock_seconds(start) + min(hour, 24) * 3600 + (0 if hour > 23 else min(minute, 60) * 60)
+
+
+def date_prefix_range(text):
+    """Wall-clock seconds bounding every catch time that starts with ``text``, or None if it isn't a date."""
+    if not 0 < len(text) <= len(CATCH_TIME_SHAPE):
+        return None
+    for char, shape in zip(text, CATCH_TIME_SHAPE):
+        if (shape == "0") != char.isdigit() or (shape != "0" and char != shape):
+            return None
+
+    start = _earliest_catch_time(text)
+    # Everything starting with the prefix sorts before its successor, so move the
+    # last digit up, carrying past nines and separators
+    successor = text.rstrip("9- :")
+    if not successor:
+        return start, None
+    end = _earliest_catch_time(successor[:-1] + chr(ord(successor[-1]) + 1))
+    return start, end
+
+# The trigram indexes can't match anything shorter than this
+MIN_INDEXED_SEARCH = 3
+
+
+def search_params(filter_text):
+    """Translate search box text into the named parameters used by the search filters.
+
+    Returns None for empty input. ``phrase`` is an FTS5 phrase for the trigram
+    indexes (None when the input is too short to use them), ``date_from`` and
+    ``date_to`` bound an index range scan on localAt for input that starts a
+    date, ``month`` is set for the name of a month, ``number`` matches IDs exactly
+    and ``pattern`` is a substring LIKE pattern for unindexed fallbacks.
+    """
+    text = filter_text.strip()
+    if not text:
+        return None
+
+    params = {
+        "phrase": None,
+        "date_from": None,
+        "date_to": None,
+        "month": None,
+        "number": int(text) if text.isdigit() else None,
+        "pattern": f"%{escape_like(text)}%",
+    }
+    if len(text) >= MIN_INDEXED_SEARCH:
+        params["phrase"] = '"{}"'.format(text.replace('"', '""'))
+    date_range = date_prefix_range(text)
+    if date_range is not None and date_range[0] is not None:
+        params["date_from"] = date_range[0]
+        # Year 9999 has no successor, search to the end of the index
+        params["date_to"] = date_range[1] if date_range[1] is not None else 1 << 62
+    if len(text) >= MIN_INDEXED_SEARCH:
+        months = [number for number, name in enumerate(MONTH_NAMES, 1) if name.startswith(text.lower())]
+        if len(months) == 1:
+            params["month"] = months[0]
+    return params
+
+
+def search_filter(filter_text):
+    """Return (params, search_mode) for a search box text.
+
+    ``params`` are the search_params, or an empty dict without a search, and
+    ``search_mode`` is the species_query and catch_log_page_query argument:
+    None, "indexed" when the trigram indexes can be used, or "like".
+    """
+    params = search_params(filter_text)
+    if params is None:
+        return {}, None
+    return params, "indexed" if params["phrase"] is not None else "like"
+
+
+# --- Queries ---
+# First and last catch details come from SpeciesSummary, which triggers keep current
+SPECIES_SELECT = '''
+    SELECT
+        s.speciesID,  -- Species ID
+        rs.commonName,  -- Common Name from ReferenceSpecies
+        rs.scientificName,  -- Scientific Name from ReferenceSpecies
+        s.quantityCaught,  -- Quantity Caught from Species
+        s.orderDiscovered,  -- Order Discovered from Species
+        fc.datetimeCaught AS firstCaughtDate,  -- First Date Caught
+        COALESCE(l.locationName, 'Unknown') AS firstLocationDiscovered  -- First Location Discovered
+    FROM Species s
+    LEFT JOIN ReferenceSpecies rs ON s.speciesID = rs.ID
+    LEFT JOIN SpeciesSummary ss ON s.speciesID = ss.speciesID
+    LEFT JOIN CatchLog fc ON ss.firstCatchID = fc.catchID
+    LEFT JOIN Locations l ON ss.firstLocationID = l.locationID
+'''
+
+SPECIES_ROW_QUERY = SPECIES_SELECT + '''
+    WHERE s.speciesID = ?;
+'''
+
+# Sortable Species columns and the SQL expression each one sorts on. IDs and
+# counts and catch times are integers, and names sort case-insensitively.
+SPECIES_SORT_KEYS = {
+    "Species ID": "s.speciesID",
+    "Common Name": "rs.commonName COLLATE NOCASE",
+    "Scientific Name": "rs.scientificName COLLATE NOCASE",
+    "Quantity Caught": "s.quantityCaught",
+    "Order Discovered": "s.orderDiscovered",
+    "First Caught Date": "ss.firstCaughtAt",
+    "First Location Discovered": "firstLocationDiscovered COLLATE NOCASE",
+}
+
+# Species matching the search through the name indexes, or by first catch date
+SPECIES_SEARCH = '''
+    (s.speciesID IN (SELECT rowid FROM ReferenceSpeciesSearch WHERE ReferenceSpeciesSearch MATCH :phrase)
+     OR s.speciesID = :number
+     OR (fc.localAt >= :date_from AND fc.localAt < :date_to)
+     OR CAST(strftime('%m', fc.localAt, 'unixepoch') AS INTEGER) = :month
+     OR ss.firstLocationID IN (SELECT rowid FROM LocationsSearch WHERE LocationsSearch MATCH :phrase))
+'''
+
+# Fallback for input too short for the trigram indexes
+SPECIES_FILTER = '''
+    (rs.commonName LIKE :pattern ESCAPE '\\'
+     OR rs.scientificName LIKE :pattern ESCAPE '\\'
+     OR fc.datetimeCaught LIKE :pattern ESCAPE '\\'
+     OR COALESCE(l.locationName, 'Unknown') LIKE :pattern ESCAPE '\\'
+     OR CAST(s.speciesID AS TEXT) LIKE :pattern ESCAPE '\\'
+     OR CAST(s.quantityCaught AS TEXT) LIKE :pattern ESCAPE '\\'
+     OR CAST(s.orderDiscovered AS TEXT) LIKE :pattern ESCAPE '\\')
+'''
+
+
+@lru_cache(maxsize=None)
+def species_query(sort_column, descending, search_mode):
+    """Build the Species tab query for one sort order.
+
+    Ties are broken by speciesID so the order is stable. ``search_mode`` is
+    None, "indexed" or "like". The text is cached so sqlite3 reuses the statement.
+    """
+    order = "DESC" if descending else "ASC"
+    where = ""
+    if search_mode == "indexed":
+        where = f"WHERE {SPECIES_SEARCH}"
+    elif search_mode == "like":
+        where = f"WHERE {SPECIES_FILTER}"
+    return f'''{SPECIES_SELECT}
+        {where}
+        ORDER BY {SPECIES_SORT_KEYS[sort_column]} {order}, s.speciesID {order};
+    '''
+
+
+# Sortable Catch Log columns and the CatchLog column each one sorts on. Every
+# one is indexed and never NULL, so a page is an index range scan from the
+# (sort key, catchID) keyset however long the log is.
+CATCH_LOG_SORT_KEYS = {
+    "Catch ID": "c.catchID",
+    "Common Name": "c.commonNameSort",
+    "Scientific Name": "c.scientificNameSort",
+    "Datetime Caught": "c.localAt",
+    "Location": "c.locationNameSort",
+}
+
+# Indexed search: names through the trigram indexes, dates as a range scan and
+# month names through the month index
+CATCH_LOG_SEARCH = f'''
+    (c.speciesID IN (SELECT rowid FROM ReferenceSpeciesSearch WHERE ReferenceSpeciesSearch MATCH :phrase)
+     OR c.locationID IN (SELECT rowid FROM LocationsSearch WHERE LocationsSearch MATCH :phrase)
+     OR (c.localAt >= :date_from AND c.localAt < :date_to)
+     OR {CATCH_MONTH} = :month
+     OR c.catchID = :number)
+'''
+
+# Catch Log date range filter, on the angler's wall clock
+CATCH_LOG_DATE_RANGE = "c.localAt >= :range_from AND c.localAt < :range_to"
+
+# Fallback for input too short for the trigram indexes
+CATCH_LOG_FILTER = '''
+    (rs.commonName LIKE :pattern ESCAPE '\\'
+     OR rs.scientificName LIKE :pattern ESCAPE '\\'
+     OR c.datetimeCaught LIKE :pattern ESCAPE '\\'
+     OR COALESCE(l.locationName, 'Unknown') LIKE :pattern ESCAPE '\\'
+     OR CAST(c.catchID AS TEXT) LIKE :pattern ESCAPE '\\')
+'''
+
+
+@lru_cache(maxsize=None)
+def catch_log_page_query(sort_column, descending, backwards, keyed, search_mode, single=False, ranged=False):
+    """Build the keyset-paginated Catch Log query for one sort order.
+
+    Rows are ordered by (sort key, catchID). A keyed query continues after the
+    given key; a backwards query walks towards the start of the list instead and
+    returns rows in reverse. ``search_mode`` is None, "indexed" or "like", a
+    ``single`` query only looks at one catch and a ``ranged`` one only at catches
+    between :range_from and :range_to. The text is cached so sqlite3 reuses the
+    statement.
+    """
+    key = CATCH_LOG_SORT_KEYS[sort_column]
+    # Walking backwards flips both the comparison and the ORDER BY direction
+    forward_desc = descending != backwards
+    order = "DESC" if forward_desc else "ASC"
+    conditions = ["c.catchID = :only_id"] if single else []
+    if keyed:
+        conditions.append(f"({key}, c.catchID) {'<' if forward_desc else '>'} (:key, :catch_id)")
+    if ranged:
+        conditions.append(CATCH_LOG_DATE_RANGE)
+    if search_mode == "indexed":
+        conditions.append(CATCH_LOG_SEARCH)
+    elif search_mode == "like":
+        conditions.append(CATCH_LOG_FILTER)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f'''
+        SELECT
+            c.catchID,
+            rs.commonName,
+            rs.scientificName,
+            c.datetimeCaught,
+            COALESCE(l.locationName, 'Unknown') AS locationName,
+            {key} AS sortKey
+        FROM CatchLog c
+        LEFT JOIN Locations l ON c.locationID = l.locationID
+        LEFT JOIN ReferenceSpecies rs ON c.speciesID = rs.ID
+        {where}
+        ORDER BY {key} {order}, c.catchID {order}
+        LIMIT :limit;
+    '''
+
+
+CATCH_PHOTO_QUERY = "SELECT photoID FROM CatchLog WHERE catchID = ?"
+
+REFERENCE_SPECIES_QUERY = "SELECT commonName, scientificName FROM ReferenceSpecies WHERE ID = ?"
+
+# Reference picture links, one species or every caught species, most caught first
+REFERENCE_IMAGE_QUERY = "SELECT imageLink FROM ReferenceSpecies WHERE ID = ?"
+CAUGHT_IMAGE_LINKS_QUERY = """
+    SELECT rs.imageLink
+    FROM Species s
+    JOIN ReferenceSpecies rs ON rs.ID = s.speciesID
+    WHERE rs.imageLink != ''
+    ORDER BY s.quantityCaught DESC, s.speciesID
+"""
+IMAGE_LINKS_QUERY = "SELECT imageLink FROM ReferenceSpecies WHERE imageLink != '' ORDER BY ID"
+
+# Latest catch and whether a day had any, for finding the last trip on idx_CatchLog_localAt
+LAST_CATCH_QUERY = "SELECT MAX(localAt) FROM CatchLog"
+CATCHES_BETWEEN_QUERY = "SELECT 1 FROM CatchLog WHERE localAt >= ? AND localAt < ? LIMIT 1"
+
+# Longest run of fishing days counted as one trip
+MAX_TRIP_DAYS = 14
+
+PHOTO_DATA_QUERY = "SELECT data FROM Photos WHERE photoID = ?"
+
+RENDITION_QUERY = "SELECT renditionID, data FROM PhotoRenditions WHERE photoID = ? AND kind = ?"
+
+RENDITION_ID_QUERY = "SELECT renditionID FROM PhotoRenditions WHERE photoID = ? AND kind = ?"
+
+# The whole Catch Log for export, oldest first, with the photo's content hash
+CATCH_LOG_EXPORT_QUERY = '''
+    SELECT
+        c.catchID,
+        c.speciesID,
+        rs.commonName,
+        rs.scientificName,
+        c.datetimeCaught,
+        COALESCE(l.locationName, 'Unknown') AS locationName,
+        p.sha256,
+        c.utcOffset
+    FROM CatchLog c
+    LEFT JOIN Locations l ON c.locationID = l.locationID
+    LEFT JOIN ReferenceSpecies rs ON c.speciesID = rs.ID
+    LEFT JOIN Photos p ON c.photoID = p.photoID
+    ORDER BY c.catchID;
+'''
+
+PHOTOS_EXPORT_QUERY = "SELECT photoID, sha256, size FROM Photos ORDER BY photoID"
+
+LOCATION_SUGGESTIONS_QUERY = "SELECT locationName FROM Locations WHERE locationName LIKE ? ESCAPE '\\' LIMIT 10"
+
+# The same, closest spots first and spots without a position last
+NEAREST_LOCATION_SUGGESTIONS_QUERY = '''
+    SELECT locationName FROM Locations
+    WHERE locationName LIKE :pattern ESCAPE '\\'
+    ORDER BY latitude IS NULL, distance_km(:latitude, :longitude, latitude, longitude), locationName
+    LIMIT 10
+'''
+
+LOCATION_COORDINATES_QUERY = "SELECT latitude, longitude FROM Locations WHERE locationName = ?"
+SET_COORDINATES = "UPDATE Locations SET latitude = ?, longitude = ? WHERE locationName = ?"
+
+# Position of the latest catch made at a located spot
+ANY_LOCATED_QUERY = "SELECT 1 FROM LocationsGeo LIMIT 1"
+LAST_SPOT_QUERY = '''
+    SELECT l.latitude, l.longitude
+    FROM CatchLog c
+    JOIN Locations l ON l.locationID = c.locationID
+    WHERE l.latitude IS NOT NULL
+    ORDER BY c.catchID DESC
+    LIMIT 1
+'''
+
+# Located spots within :radius km of a position. The R*Tree finds the spots in
+# the bounding_box() around it, the exact distance drops the box's corners.
+NEARBY_LOCATIONS = '''
+    SELECT l.locationID, l.locationName, distance_km(:latitude, :longitude, l.latitude, l.longitude) AS km
+    FROM LocationsGeo g
+    JOIN Locations l ON l.locationID = g.locationID
+    WHERE g.minLatitude <= :max_lat AND g.maxLatitude >= :min_lat
+      AND g.minLongitude <= :max_lon AND g.maxLongitude >= :min_lon
+      AND distance_km(:latitude, :longitude, l.latitude, l.longitude) <= :radius
+'''
+NEARBY_LOCATIONS_QUERY = NEARBY_LOCATIONS + "ORDER BY km, l.locationName"
+
+# Catches at those spots, newest first (idx_CatchLog_locationID per spot)
+CATCHES_NEAR_QUERY = f'''
+    WITH nearby AS ({NEARBY_LOCATIONS})
+    SELECT c.catchID, rs.commonName, rs.scientificName, c.datetimeCaught, n.locationName, n.km
+    FROM nearby n
+    JOIN CatchLog c ON c.locationID = n.locationID
+    LEFT JOIN ReferenceSpecies rs ON rs.ID = c.speciesID
+    ORDER BY c.localAt DESC, c.catchID DESC
+    LIMIT :limit
+'''
+
+# Species caught at those spots, most caught first
+SPECIES_NEAR_QUERY = f'''
+    WITH nearby AS ({NEARBY_LOCATIONS})
+    SELECT c.speciesID, rs.commonName, rs.scientificName, COUNT(*) AS catches, MIN(n.km) AS nearestKm
+    FROM nearby n
+    JOIN CatchLog c ON c.locationID = n.locationID
+    LEFT JOIN ReferenceSpecies rs ON rs.ID = c.speciesID
+    GROUP BY c.speciesID
+    ORDER BY catches DESC, nearestKm, c.speciesID
+'''
+
+# Species suggestions, one statement per searchable field
+SPECIES_PREFIX_QUERIES = {
+    field: f"""
+        SELECT ID, commonName, scientificName FROM ReferenceSpecies
+        WHERE {field} LIKE ? ESCAPE '\\' LIMIT 10;
+    """
+    for field in ("commonName", "scientificName")
+}
+
+SPECIES_SEARCH_QUERIES = {
+    field: f"""
+        SELECT rs.ID, rs.commonName, rs.scientificName
+        FROM ReferenceSpeciesSearch
+        JOIN ReferenceSpecies rs ON rs.ID = ReferenceSpeciesSearch.rowid
+        WHERE ReferenceSpeciesSearch MATCH ?
+        ORDER BY
+            CASE
+                WHEN rs.{field} LIKE ? ESCAPE '\\' THEN 0  -- Starts with the input
+                WHEN rs.{field} LIKE ? ESCAPE '\\' THEN 1  -- A later word starts with the input
+                ELSE 2
+            END,
+            length(rs.{field}),
+            rs.{field}
+        LIMIT 10;
+    """
+    for field in ("commonName", "scientificName")
+}
+
+
+# The writes of one catch, each a single statement returning the row it touched.
+# A known location is one index lookup; only a new name is inserted, since an
+# upsert on the AUTOINCREMENT table would use up a locationID on every conflict.
+# A position given with a catch is only stored for a spot that has none yet.
+# A new species is numbered after the last one discovered, read from
+# idx_Species_orderDiscovered inside the same write transaction. The catch is
+# written with its sort names, so CatchLog_sort_insert has nothing to do.
+LOCATION_ID_QUERY = "SELECT locationID, latitude FROM Locations WHERE locationName = ?"
+INSERT_LOCATION = "INSERT INTO Locations (locationName, latitude, longitude) VALUES (?, ?, ?) RETURNING locationID"
+SET_MISSING_COORDINATES = "UPDATE Locations SET latitude = ?, longitude = ? WHERE locationID = ? AND latitude IS NULL"
+UPSERT_SPECIES = '''
+    INSERT INTO Species (speciesID, quantityCaught, orderDiscovered)
+    VALUES (?, 1, (SELECT COALESCE(MAX(orderDiscovered), 0) + 1 FROM Species))
+    ON CONFLICT (speciesID) DO UPDATE SET quantityCaught = quantityCaught + 1
+    RETURNING quantityCaught
+'''
+INSERT_CATCH = f'''
+    INSERT INTO CatchLog (
+        speciesID, caughtAt, utcOffset, locationID, photoID, commonNameSort, scientificNameSort, locationNameSort
+    )
+    VALUES (
+        :species_id, :caught_at, :utc_offset, :location_id, :photo_id,
+        {CATCH_SORT_NAMES["commonNameSort"].format(species=":species_id")},
+        {CATCH_SORT_NAMES["scientificNameSort"].format(species=":species_id")},
+        :location_name
+    )
+    RETURNING catchID
+'''
+
+
+def insert_catch(cursor, fish_id, location_name, datetime_value, photo_data=None, photo_renditions=None,
+                 coordinates=None):
+    """Insert one catch inside the caller's transaction and update the species bookkeeping.
+
+    ``datetime_value`` is anything parse_catch_time() reads. ``coordinates``
+    is the (latitude, longitude) of the spot, taken from the name when it is a
+    position; it fills in a spot without one. Returns the ``catch_added``
+    change describing it.
+    """
+    caught_at, utc_offset = parse_catch_time(datetime_value)
+    if coordinates is None:
+        coordinates = parse_coordinates(location_name)
+    latitude, longitude = coordinates or (None, None)
+    row = cursor.execute(LOCATION_ID_QUERY, (location_name,)).fetchone()
+    if row is None:
+        location_id = cursor.execute(INSERT_LOCATION, (location_name, latitude, longitude)).fetchone()[0]
+    else:
+        location_id = row[0]
+        if row[1] is None and coordinates is not None:
+            cursor.execute(SET_MISSING_COORDINATES, (latitude, longitude, location_id))
+    quantity_caught = cursor.execute(UPSERT_SPECIES, (fish_id,)).fetchone()[0]
+
+    # Store the photo once per distinct image
+    photo_id = store_photo(cursor, photo_data, photo_renditions) if photo_data else None
+
+    catch_id = cursor.execute(INSERT_CATCH, {
+        "species_id": fish_id, "caught_at": caught_at, "utc_offset": utc_offset,
+        "location_id": location_id, "photo_id": photo_id, "location_name": location_name,
+    }).fetchone()[0]
+    return {
+        "type": "catch_added",
+        "catch_id": catch_id,
+        "species_id": int(fish_id),
+        "new_species": quantity_caught == 1,
+    }
+
+
+class Database:
+    """Owns the long-lived FishDex connections.
+
+    A single writer connection is shared behind a lock. Every thread that reads
+    gets its own query-only connection, so with WAL journaling background readers
+    never wait on the writer and the writer never waits on them.
+
+    With ``timed`` set every statement's duration is recorded in fishdex_metrics.
+    """
+
+    def __init__(self, path=DB_PATH, timed=False):
+        self.path = path
+        self.timed = timed
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._readers = {}  # Thread ident -> reader connection
+        self._readers_lock = threading.Lock()
+
+        self._listeners = []
+
+        self._fuzzy = None  # Loaded on the first species suggestion that needs it
+        self._fuzzy_lock = threading.Lock()
+        self._fuzzy_checked = {}  # Thread ident -> (data_version, index, up to date) its reader last saw
+
+        self._writer = connect(path, timed=timed)
+        with self._write_lock:
+            migrate(self._writer)
+            migrate_inline_photos(self._writer)
+
+    # --- Connections ---
+    def reader(self):
+        """Return this thread's read-only connection, opening it on first use."""
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            conn = connect(self.path, readonly=True, timed=self.timed)
+            self._local.reader = conn
+            with self._readers_lock:
+                self._readers[threading.get_ident()] = conn
+        return conn
+
+    def interrupt_reader(self, thread_ident):
+        """Abort whatever query the given thread's reader connection is running."""
+        with self._readers_lock:
+            conn = self._readers.get(thread_ident)
+        if conn is not None:
+            conn.interrupt()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block inside a write transaction on the shared writer connection."""
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    def explain(self, sql, params=None):
+        """Return the EXPLAIN QUERY PLAN of a statement as indented lines."""
+        rows = self.reader().execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node_id] + detail)
+        return lines
+
+    def close(self):
+        """Close the writer and every reader connection."""
+        with self._readers_lock:
+            for conn in self._readers.values():
+                conn.close()
+            self._readers.clear()
+        with self._write_lock:
+            self._writer.close()
+
+    # --- Change notifications ---
+    def subscribe(self, listener):
+        """Call ``listener(change)`` after every committed write.
+
+        ``change`` is a dict with a ``type`` key; ``"catch_added"`` changes also
+        carry ``catch_id``, ``species_id`` and ``new_species``. Listeners run on
+        the thread that made the write; an exception from one is logged and the
+        remaining listeners still run.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def _notify(self, change):
+        # The write is already committed; a failing listener must not make it look failed
+        for listener in list(self._listeners):
+            try:
+                listener(change)
+            except Exception:
+                logger.exception("Change listener %r failed on %s", listener, change["type"])
+
+    # --- Reads ---
+    def catch_log_page(self, sort_column="Catch ID", descending=True, after=None, before=None,
+                       limit=200, filter_text="", date_range=None):
+        """Return one page of the Catch Log as (key, values) pairs.
+
+        Pass the key of the last loaded row as ``after`` to get the next page, or
+        the key of the first loaded row as ``before`` to get the previous one.
+        Pages are always returned in display order. ``date_range`` limits the
+        page to catches from its start up to its end, in wall-clock seconds.
+        """
+        key = after if after is not None else before
+        params, search_mode = search_filter(filter_text)
+        params["limit"] = limit
+        if key is not None:
+            params["key"], params["catch_id"] = key
+        if date_range is not None:
+            params["range_from"], params["range_to"] = date_range
+
+        query = catch_log_page_query(
+            sort_column, descending, before is not None, key is not None, search_mode, ranged=date_range is not None
+        )
+        rows = self.reader().execute(query, params).fetchall()
+        if before is not None:
+            rows.reverse()
+        return [((row[5], row[0]), row[:5]) for row in rows]
+
+    def catch_log_row(self, catch_id, sort_column="Catch ID", descending=True, filter_text="", date_range=None):
+        """Return one catch as a (key, values) pair for the given sort order, or None if the filters exclude it."""
+        params, search_mode = search_filter(filter_text)
+        params["limit"] = 1
+        params["only_id"] = catch_id
+        if date_range is not None:
+            params["range_from"], params["range_to"] = date_range
+
+        query = catch_log_page_query(
+            sort_column, descending, False, False, search_mode, single=True, ranged=date_range is not None
+        )
+        row = self.reader().execute(query, params).fetchone()
+        return ((row[5], row[0]), row[:5]) if row else None
+
+    def last_trip(self):
+        """Return the wall-clock (start, end) seconds of the most recent fishing trip, or None without catches.
+
+        A trip is the run of consecutive days with catches that ends on the day of
+        the latest catch, up to MAX_TRIP_DAYS long. Each day is one index lookup.
+        """
+        conn = self.reader()
+        last = conn.execute(LAST_CATCH_QUERY).fetchone()[0]
+        if last is None:
+            return None
+        end = (last // DAY_SECONDS + 1) * DAY_SECONDS
+        start = end - DAY_SECONDS
+        for _ in range(MAX_TRIP_DAYS - 1):
+            if conn.execute(CATCHES_BETWEEN_QUERY, (start - DAY_SECONDS, start)).fetchone() is None:
+                break
+            start -= DAY_SECONDS
+        return start, end
+
+    def species_row(self, species_id):
+        """Return one discovered species with its first-catch details, or None."""
+        return self.reader().execute(SPECIES_ROW_QUERY, (species_id,)).fetchone()
+
+    def species_rows(self, filter_text="", sort_column="Order Discovered", descending=True):
+        """Return the discovered species with their first-catch details, sorted and optionally filtered by a search."""
+        params, search_mode = search_filter(filter_text)
+        query = species_query(sort_column, descending, search_mode)
+        return self.reader().execute(query, params).fetchall()
+
+    def reference_species(self, species_id):
+        """Return (commonName, scientificName) of a ReferenceSpecies row, or None if there is no such species."""
+        return self.reader().execute(REFERENCE_SPECIES_QUERY, (species_id,)).fetchone()
+
+    def reference_image_link(self, species_id):
+        """Return the imageLink of a ReferenceSpecies row, or None if it has none."""
+        row = self.reader().execute(REFERENCE_IMAGE_QUERY, (species_id,)).fetchone()
+        return row[0] if row and row[0] else None
+
+    def reference_image_links(self, caught_only=True):
+        """Return the imageLinks of every caught species, most caught first, or with ``caught_only`` off of every species."""
+        rows = self.reader().execute(CAUGHT_IMAGE_LINKS_QUERY if caught_only else IMAGE_LINKS_QUERY).fetchall()
+        return [row[0] for row in rows]
+
+    def catch_photo_id(self, catch_id):
+        """Return the photoID attached to a catch, or None."""
+        row = self.reader().execute(CATCH_PHOTO_QUERY, (catch_id,)).fetchone()
+        return row[0] if row else None
+
+    def open_photo(self, photo_id):
+        """Open a stored photo as a read-only, seekable file object.
+
+        The bytes are read incrementally through SQLite's blob I/O rather than
+        loaded as a whole. Use it as a context manager and close it once the
+        image has been decoded.
+        """
+        conn = self.reader()
+        if hasattr(conn, "blobopen"):  # Python 3.11+
+            return conn.blobopen("Photos", "data", photo_id, readonly=True)
+        row = conn.execute(PHOTO_DATA_QUERY, (photo_id,)).fetchone()
+        return io.BytesIO(row[0])
+
+    def iter_catch_log(self, batch_size=1000):
+        """Yield the whole Catch Log for export in lists of up to ``batch_size`` rows.
+
+        Rows are (catchID, speciesID, commonName, scientificName, datetimeCaught,
+        locationName, photo sha256, utcOffset). Only one batch is held in memory
+        at a time.
+        """
+        cursor = self.reader().execute(CATCH_LOG_EXPORT_QUERY)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+
+    def iter_photos(self):
+        """Yield (photoID, sha256, size) for every stored photo."""
+        cursor = self.reader().execute(PHOTOS_EXPORT_QUERY)
+        try:
+            while True:
+                rows = cursor.fetchmany(100)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def count_catches(self):
+        return self.reader().execute("SELECT COUNT(*) FROM CatchLog").fetchone()[0]
+
+    def count_photos(self):
+        return self.reader().execute("SELECT COUNT(*) FROM Photos").fetchone()[0]
+
+    def open_rendition(self, photo_id, kind):
+        """Open a downscaled copy of a photo like open_photo, or return None if it hasn't been made."""
+        conn = self.reader()
+        if hasattr(conn, "blobopen"):  # Python 3.11+
+            row = conn.execute(RENDITION_ID_QUERY, (photo_id, kind)).fetchone()
+            return conn.blobopen("PhotoRenditions", "data", row[0], readonly=True) if row else None
+        row = conn.execute(RENDITION_QUERY, (photo_id, kind)).fetchone()
+        return io.BytesIO(row[1]) if row else None
+
+    def add_renditions(self, photo_id, renditions):
+        """Store renditions for a photo that was saved without them."""
+        with self.transaction() as conn:
+            store_renditions(conn, photo_id, renditions)
+
+    def open_catch_photo(self, catch_id):
+        """Open the photo attached to a catch (see open_photo), or return None if it has none."""
+        photo_id = self.catch_photo_id(catch_id)
+        if photo_id is None:
+            return None
+        return self.open_photo(photo_id)
+
+    def location_suggestions(self, value, near=None):
+        """Return up to 10 location names containing the input.
+
+        With ``near`` set to a (latitude, longitude), the spots closest to it
+        come first and spots without a position last.
+        """
+        pattern = f"%{escape_like(value)}%"
+        if near is None:
+            rows = self.reader().execute(LOCATION_SUGGESTIONS_QUERY, (pattern,)).fetchall()
+        else:
+            rows = self.reader().execute(
+                NEAREST_LOCATION_SUGGESTIONS_QUERY, {"pattern": pattern, "latitude": near[0], "longitude": near[1]}
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def location_coordinates(self, location_name):
+        """Return the (latitude, longitude) of a location, or None if it has no position or doesn't exist."""
+        row = self.reader().execute(LOCATION_COORDINATES_QUERY, (location_name,)).fetchone()
+        return (row[0], row[1]) if row and row[0] is not None else None
+
+    def last_spot(self):
+        """Return the (latitude, longitude) of the latest catch at a located spot, or None."""
+        conn = self.reader()
+        if conn.execute(ANY_LOCATED_QUERY).fetchone() is None:
+            return None  # Nothing has a position, don't walk the whole Catch Log
+        row = conn.execute(LAST_SPOT_QUERY).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def nearby_locations(self, latitude, longitude, radius_km):
+        """Return (locationID, locationName, km) of every located spot within ``radius_km``, closest first."""
+        return self.reader().execute(NEARBY_LOCATIONS_QUERY, bounding_box(latitude, longitude, radius_km)).fetchall()
+
+    def catches_near(self, latitude, longitude, radius_km, limit=200):
+        """Return up to ``limit`` catches made within ``radius_km`` of a position, newest first.
+
+        Rows are (catchID, commonName, scientificName, datetimeCaught, locationName, km).
+        """
+        params = bounding_box(latitude, longitude, radius_km)
+        params["limit"] = limit
+        return self.reader().execute(CATCHES_NEAR_QUERY, params).fetchall()
+
+    def species_near(self, location_name, radius_km):
+        """Return the species caught within ``radius_km`` of a location, most caught first.
+
+        Rows are (speciesID, commonName, scientificName, catches, km to the
+        nearest spot). Raises ValueError if the location has no position.
+        """
+        coordinates = self.location_coordinates(location_name)
+        if coordinates is None:
+            raise ValueError(f"{location_name} has no coordinates.")
+        return self.reader().execute(SPECIES_NEAR_QUERY, bounding_box(*coordinates, radius_km)).fetchall()
+
+    def fuzzy_index(self):
+        """Return the typo-tolerant species name index, loading it from next to the database on first use.
+
+        The index is built, and saved for next time, if it is missing or the
+        reference species changed since it was saved. This can take a second
+        or more; run it off the Tk thread.
+        """
+        with self._fuzzy_lock:
+            conn = self.reader()
+            if self._fuzzy is None or self._fuzzy.signature != reference_signature(conn):
+                self._fuzzy = open_fuzzy_index(conn, index_path_for(self.path))
+            return self._fuzzy
+
+    def _current_fuzzy_index(self):
+        """Return the fuzzy index if it is loaded and up to date, otherwise None without waiting.
+
+        A missing or stale index is (re)loaded on a background thread for later
+        suggestions. The outcome is remembered per thread until something is
+        committed or another index is loaded, so while the index is stale, or
+        after it failed to load, keystrokes neither compare the ReferenceSpecies
+        signature again nor start more loads.
+        """
+        conn = self.reader()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        ident = threading.get_ident()
+        index = self._fuzzy
+        checked = self._fuzzy_checked.get(ident)
+        if checked is not None and checked[0] == version and checked[1] is index:
+            return index if checked[2] else None
+
+        current = index is not None and index.signature == reference_signature(conn)
+        self._fuzzy_checked[ident] = (version, index, current)
+        if current:
+            return index
+        if not self._fuzzy_lock.locked():
+            threading.Thread(target=self._load_fuzzy_index, name="fishdex-fuzzy", daemon=True).start()
+        return None
+
+    def _load_fuzzy_index(self):
+        """Load the fuzzy index for _current_fuzzy_index, logging why it couldn't be."""
+        try:
+            self.fuzzy_index()
+        except Exception:
+            logger.exception("Unable to load the fuzzy species index")
+
+    def species_suggestions(self, field, value):
+        """Return up to 10 (ID, commonName, scientificName) matches for the input, prefix matches first.
+
+        When fewer than 10 names contain the input, the closest names from the
+        fuzzy index follow, so misspelled or reordered names still match. Until
+        the index has been loaded (see fuzzy_index) only substring matches are
+        returned.
+        """
+        value = value.strip()
+        escaped = escape_like(value)
+        if len(value) < 3:
+            # The trigram index needs at least three characters, short input only matches prefixes
+            return self.reader().execute(SPECIES_PREFIX_QUERIES[field], (escaped + "%",)).fetchall()
+
+        phrase = '{} : "{}"'.format(field, value.replace('"', '""'))
+        rows = self.reader().execute(
+            SPECIES_SEARCH_QUERIES[field], (phrase, escaped + "%", "% " + escaped + "%")
+        ).fetchall()
+        # Skipped while the index is loading rather than waiting for it
+        index = self._current_fuzzy_index() if len(rows) < 10 and len(value) >= MIN_FUZZY_QUERY else None
+        if index is not None:
+            found = {row[0] for row in rows}
+            for species_id, _ in index.search(field, value, 10):
+                if species_id not in found and len(rows) < 10:
+                    names = self.reference_species(species_id)
+                    if names is not None:  # Removed since the index was loaded
+                        rows.append((species_id, *names))
+        return rows
+
+    # --- Writes ---
+    def add_catch(self, fish_id, location_name, datetime_value, photo_data=None, photo_renditions=None,
+                  coordinates=None):
+        """Record a catch, creating the location and species entries as needed.
+
+        Returns the new catch ID and notifies subscribers with a ``catch_added`` change.
+        """
+        with self.transaction() as cursor:
+            change = insert_catch(
+                cursor, fish_id, location_name, datetime_value, photo_data, photo_renditions, coordinates
+            )
+        self._notify(change)
+        return change["catch_id"]
+
+    def add_catches(self, catches, notify=True):
+        """Record many catches in a single transaction.
+
+        ``catches`` is an iterable of dicts with ``species_id``, ``location_name``,
+        ``datetime`` and optionally ``photo_data``, ``photo_renditions`` and
+        ``coordinates``. Either
+        every catch is stored or none is. Returns the new catch IDs in order and,
+        unless ``notify`` is False, notifies subscribers with one ``catch_added``
+        change per catch.
+        """
+        with self.transaction() as cursor:
+            changes = [
+                insert_catch(
+                    cursor, catch["species_id"], catch["location_name"], catch["datetime"],
+                    catch.get("photo_data"), catch.get("photo_renditions"), catch.get("coordinates"),
+                )
+                for catch in catches
+            ]
+        if notify:
+            for change in changes:
+                self._notify(change)
+        return [change["catch_id"] for change in changes]
+
+    def set_location_coordinates(self, location_name, latitude, longitude):
+        """Set, or with both None clear, the position of a location. Returns False if there is no such location."""
+        if (latitude is None) != (longitude is None):
+            raise ValueError("Give both latitude and longitude, or neither.")
+        if latitude is not None and not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("Latitude must be within -90..90 and longitude within -180..180.")
+        with self.transaction() as cursor:
+            return cursor.execute(SET_COORDINATES, (latitude, longitude, location_name)).rowcount > 0
+
+
+class CatchSession:
+    """Catches from one outing, checked as they're entered and saved in one transaction.
+
+    Nothing is written until commit(), so abandoning the session leaves the
+    database untouched.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.catches = []
+
+    def add(self, species_id, location_name, datetime_value, photo_data=None, photo_renditions=None,
+            coordinates=None):
+        """Queue a catch, raising ValueError with the New Entry form's message if it can't be logged."""
+        problem = check_catch(species_id, location_name, datetime_value)
+        if problem is not None:
+            raise ValueError(problem)
+        self.catches.append({
+            "species_id": species_id,
+            "location_name": location_name,
+            "datetime": datetime_value,
+            "photo_data": photo_data,
+            "photo_renditions": photo_renditions,
+            "coordinates": coordinates,
+        })
+
+    def remove(self, index):
+        del self.catches[index]
+
+    def commit(self):
+        """Save every queued catch together and return their catch IDs; the queue is kept if it fails."""
+        catch_ids = self.db.add_catches(self.catches)
+        self.catches = []
+        return catch_ids
+
+    def __len__(self):
+        return len(self.catches)
@@ -0,0 +1,261 @@
+import io
+import os
+import csv
+import json
+import time
+import zipfile
+import argparse
+
+from fishdex_db import check_catch, format_utc_offset
+
+
+# Columns of an exported Catch Log, in file order
+EXPORT_COLUMNS = ("catchID", "speciesID", "commonName", "scientificName", "datetimeCaught", "locationName", "photo")
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+# Rows fetched from SQLite per fetchmany() call while exporting
+EXPORT_BATCH_SIZE = 1000
+
+# Catches per transaction while importing, and the photo bytes a batch may hold
+IMPORT_BATCH_SIZE = 500
+IMPORT_BATCH_BYTES = 16 * 1024 * 1024
+
+# Blob bytes copied into the archive per read
+COPY_CHUNK_SIZE = 1 << 20
+
+# Folder of an archive that holds the photos, named by their SHA-256
+PHOTO_FOLDER = "photos/"
+
+
+def photo_name(sha256):
+    """Archive member name of a photo."""
+    return f"{PHOTO_FOLDER}{sha256}.jpg" if sha256 else ""
+
+
+def log_name(fmt):
+    """Archive member name of the Catch Log."""
+    return f"catch_log.{fmt}"
+
+
+def format_of(path):
+    """Pick the export format from a file name: csv, jsonl or zip."""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in EXPORT_FORMATS or extension == "zip":
+        return extension
+    raise ValueError(f"Unsupported file type: {path} (use .csv, .jsonl or .zip)")
+
+
+class ExportCancelled(Exception):
+    """Raised inside an export or import when ``cancelled()`` returns True."""
+
+
+def _write_log(db, text_file, fmt, progress, cancelled, total):
+    """Stream the Catch Log into an open text file one fetchmany() batch at a time."""
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(text_file)
+        writer.writerow(EXPORT_COLUMNS)
+
+    done = 0
+    for rows in db.iter_catch_log(EXPORT_BATCH_SIZE):
+        if cancelled and cancelled():
+            raise ExportCancelled()
+        for row in rows:
+            # Catch times keep their UTC offset, so an import elsewhere knows when they happened
+            values = row[:4] + (row[4] + format_utc_offset(row[7]), row[5], photo_name(row[6]))
+            if writer is not None:
+                writer.writerow(values)
+            else:
+                text_file.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + "\n")
+        done += len(rows)
+        if progress:
+            progress(done, total)
+    return done
+
+
+def export_catch_log(db, path, fmt=None, progress=None, cancelled=None):
+    """Export the Catch Log to a CSV, JSONL or ZIP file.
+
+    A ZIP archive holds the log as ``catch_log.csv`` (or ``.jsonl`` with
+    ``fmt="jsonl"``) plus every photo under ``photos/``, each copied straight
+    from its blob in chunks. Memory use doesn't grow with the size of the log.
+    ``progress(done, total)`` counts catches and then photos. The file is
+    removed if ``cancelled()`` returns True. Returns a stats dict.
+    """
+    archive = format_of(path) == "zip"
+    fmt = fmt or ("csv" if archive else format_of(path))
+    start = time.perf_counter()
+    catches = db.count_catches()
+    photos = db.count_photos() if archive else 0
+    total = catches + photos
+    stats = {"catches": 0, "photos": 0, "bytes": 0}
+
+    try:
+        if not archive:
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                stats["catches"] = _write_log(db, file, fmt, progress, cancelled, total)
+        else:
+            with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+                with zip_file.open(log_name(fmt), "w", force_zip64=True) as member:
+                    text_file = io.TextIOWrapper(member, encoding="utf-8", newline="")
+                    stats["catches"] = _write_log(db, text_file, fmt, progress, cancelled, total)
+                    text_file.flush()
+                    text_file.detach()
+
+                for photo_id, sha256, size in db.iter_photos():
+                    if cancelled and cancelled():
+                        raise ExportCancelled()
+                    # JPEGs don't compress further, store them as they are
+                    info = zipfile.ZipInfo(photo_name(sha256), date_time=time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_STORED
+                    info.file_size = size
+                    with db.open_photo(photo_id) as blob, zip_file.open(info, "w", force_zip64=True) as member:
+                        while chunk := blob.read(COPY_CHUNK_SIZE):
+                            member.write(chunk)
+                    stats["photos"] += 1
+                    if progress:
+                        progress(stats["catches"] + stats["photos"], total)
+    except BaseException:
+        # Don't leave a truncated export behind
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    stats["bytes"] = os.path.getsize(path)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def _read_log(text_file, fmt):
+    """Yield exported Catch Log rows as dicts."""
+    if fmt == "csv":
+        yield from csv.DictReader(text_file)
+    else:
+        for line in text_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _check_row(db, row, known_species):
+    """Return why an exported row can't be imported, or None if it can.
+
+    ``known_species`` caches whether each species ID is in ReferenceSpecies.
+    """
+    try:
+        species_id = int(row.get("speciesID"))
+    except (TypeError, ValueError):
+        return "speciesID must be a number."
+    location_name = row.get("locationName")
+    datetime_value = row.get("datetimeCaught")
+    if not all(isinstance(value, (str, type(None))) for value in (location_name, datetime_value)):
+        return "locationName and datetimeCaught must be text."
+    problem = check_catch(species_id, (location_name or "").strip(), datetime_value)
+    if problem is not None:
+        return problem
+    if species_id not in known_species:
+        known_species[species_id] = db.reference_species(species_id) is not None
+    if not known_species[species_id]:
+        return f"Unknown species ID {species_id}."
+    return None
+
+
+def import_catch_log(db, path, progress=None, cancelled=None):
+    """Add the catches of a CSV, JSONL or ZIP export to the database.
+
+    Catches get new IDs; species, locations and photos are matched or created
+    like any other new catch, and identical photos are still stored once. Rows
+    are checked like New Entry catches and must name a known species; rows that
+    fail are skipped and listed in ``stats["rejected"]`` as (row number,
+    reason), counting rows from 1 after any CSV header. Rows are committed in
+    batches without change notifications, so reload the views afterwards.
+    ``progress(done, None)`` is called after each batch. Returns a stats dict.
+    """
+    fmt = format_of(path)
+    start = time.perf_counter()
+    stats = {"catches": 0, "photos": 0, "rejected": []}
+    known_species = {}
+    zip_file = zipfile.ZipFile(path) if fmt == "zip" else None
+
+    try:
+        if zip_file is not None:
+            names = set(zip_file.namelist())
+            fmt = next((f for f in EXPORT_FORMATS if log_name(f) in names), None)
+            if fmt is None:
+                raise ValueError(f"{path} has no {log_name('csv')} or {log_name('jsonl')}")
+            text_file = io.TextIOWrapper(zip_file.open(log_name(fmt)), encoding="utf-8", newline="")
+        else:
+            text_file = open(path, encoding="utf-8", newline="")
+
+        with text_file:
+            batch = []
+            batch_bytes = 0
+            for row_number, row in enumerate(_read_log(text_file, fmt), start=1):
+                problem = _check_row(db, row, known_species)
+                if problem is not None:
+                    stats["rejected"].append((row_number, problem))
+                    continue
+                catch = {
+                    "species_id": int(row["speciesID"]),
+                    "location_name": row["locationName"].strip(),
+                    "datetime": row["datetimeCaught"],
+                }
+                if row.get("photo") and zip_file is not None:
+                    catch["photo_data"] = zip_file.read(row["photo"])
+                    batch_bytes += len(catch["photo_data"])
+                    stats["photos"] += 1
+                batch.append(catch)
+
+                if len(batch) >= IMPORT_BATCH_SIZE or batch_bytes >= IMPORT_BATCH_BYTES:
+                    if cancelled and cancelled():
+                        raise ExportCancelled()
+                    db.add_catches(batch, notify=False)
+                    stats["catches"] += len(batch)
+                    batch = []
+                    batch_bytes = 0
+                    if progress:
+                        progress(stats["catches"], None)
+
+            if batch:
+                db.add_catches(batch, notify=False)
+                stats["catches"] += len(batch)
+                if progress:
+                    progress(stats["catches"], None)
+    finally:
+        if zip_file is not None:
+            zip_file.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the Catch Log to CSV, JSONL or a ZIP with photos, or import such a file.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="File to write or read (.csv, .jsonl or .zip)")
+    parser.add_argument("--db", default="fishdex.db", help="SQLite database file (default: fishdex.db)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Catch Log format inside a ZIP export (default: csv)")
+    args = parser.parse_args(argv)
+
+    from fishdex_db import Database
+
+    def progress(done, total):
+        print(f"\r{done}/{total}" if total else f"\r{done}", end="", flush=True)
+
+    db = Database(args.db)
+    try:
+        if args.command == "export":
+            stats = export_catch_log(db, args.path, args.format, progress)
+            print(f"\nExported {stats['catches']} catches and {stats['photos']} photos "
+                  f"({stats['bytes'] / (1024 * 1024):.1f} MiB) in {stats['seconds']:.2f}s.")
+        else:
+            stats = import_catch_log(db, args.path, progress)
+            print(f"\nImported {stats['catches']} catches with {stats['photos']} photos in {stats['seconds']:.2f}s.")
+            for row_number, problem in stats["rejected"]:
+                print(f"Skipped row {row_number}: {problem}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
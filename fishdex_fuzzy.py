@@ -0,0 +1,253 @@
+import os
+import re
+import json
+import time
+import argparse
+import unicodedata
+from array import array
+from collections import Counter
+
+
+# Bumped whenever the file layout or the trigram rules change, older files are rebuilt
+INDEX_VERSION = 1
+
+FIELDS = ("commonName", "scientificName")
+
+# Queries shorter than this have too few trigrams to rank anything
+MIN_FUZZY_QUERY = 3
+
+# Names scored exactly per query, taken from those sharing the most trigrams with it
+CANDIDATES = 200
+
+# Lowest similarity still offered as a suggestion
+MIN_SIMILARITY = 0.3
+
+REFERENCE_NAMES_QUERY = "SELECT ID, commonName, scientificName FROM ReferenceSpecies ORDER BY ID"
+
+# Changes whenever a ReferenceSpecies row is added, removed or edited
+REFERENCE_SIGNATURE_QUERY = '''
+    SELECT COUNT(*), COALESCE(SUM(ID), 0), COALESCE(SUM(contentHash & 4294967295), 0), COALESCE(MAX(ID), 0)
+    FROM ReferenceSpecies
+'''
+
+_NOT_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def index_path_for(db_path):
+    """File the fuzzy index of a database is kept in, next to the database file."""
+    return os.path.splitext(os.path.abspath(db_path))[0] + "-fuzzy.idx"
+
+
+def normalize(name):
+    """Lowercase words of a name without accents or punctuation."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    return _NOT_ALPHANUMERIC.sub(" ", text).split()
+
+
+def trigrams(name):
+    """The name's set of word trigrams, each word padded like pg_trgm does.
+
+    Word order doesn't matter, so "salar salmo" matches "Salmo salar", and a
+    word split in two ("large mouth") still shares most trigrams with the whole.
+    """
+    grams = set()
+    for word in normalize(name):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the species whose name in one field contains them.
+
+    Postings are stored flat in one array, with each trigram's start and end,
+    so the index loads as a handful of arrays rather than thousands of objects.
+    """
+
+    def __init__(self, species_ids, sizes, grams, offsets, postings):
+        self.species_ids = species_ids  # Entry -> speciesID
+        self.sizes = sizes  # Entry -> number of distinct trigrams in its name
+        self.grams = grams  # Trigram -> position in offsets
+        self.offsets = offsets
+        self.postings = postings
+
+    @classmethod
+    def build(cls, names):
+        """Index an iterable of (speciesID, name) pairs."""
+        species_ids = array("q")
+        sizes = array("H")
+        lists = {}
+        for species_id, name in names:
+            name_grams = trigrams(name or "")
+            if not name_grams:
+                continue
+            entry = len(species_ids)
+            species_ids.append(species_id)
+            sizes.append(min(len(name_grams), 65535))
+            for gram in name_grams:
+                lists.setdefault(gram, []).append(entry)
+
+        grams = {}
+        offsets = array("I", [0])
+        postings = array("I")
+        for position, (gram, entries) in enumerate(sorted(lists.items())):
+            grams[gram] = position
+            postings.extend(entries)
+            offsets.append(len(postings))
+        return cls(species_ids, sizes, grams, offsets, postings)
+
+    def search(self, text, limit=10):
+        """Return up to ``limit`` (speciesID, similarity) pairs for the text, best first.
+
+        Similarity is shared trigrams over all distinct trigrams of both names.
+        Counting each query trigram's postings gives every name's shared count at
+        once; only the names sharing the most are scored.
+        """
+        query = trigrams(text)
+        counts = Counter()
+        for gram in query:
+            position = self.grams.get(gram)
+            if position is not None:
+                counts.update(self.postings[self.offsets[position]:self.offsets[position + 1]])
+
+        scored = []
+        for entry, shared in counts.most_common(CANDIDATES):
+            similarity = shared / (len(query) + self.sizes[entry] - shared)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, -entry))  # Ties go to the earlier entry
+        scored.sort(reverse=True)
+
+        results = []
+        seen = set()
+        for similarity, negated_entry in scored:
+            species_id = self.species_ids[-negated_entry]
+            if species_id not in seen:
+                seen.add(species_id)
+                results.append((species_id, similarity))
+                if len(results) == limit:
+                    break
+        return results
+
+
+class FuzzySpeciesIndex:
+    """Typo-tolerant lookup of ReferenceSpecies by common or scientific name.
+
+    Built once from the database and saved next to it; ``signature`` identifies
+    the ReferenceSpecies contents it was built from so a stale file is rebuilt.
+    """
+
+    def __init__(self, signature, fields):
+        self.signature = signature
+        self.fields = fields  # Field name -> TrigramIndex
+
+    @classmethod
+    def build(cls, conn):
+        rows = conn.execute(REFERENCE_NAMES_QUERY).fetchall()
+        fields = {
+            field: TrigramIndex.build((row[0], row[index + 1]) for row in rows)
+            for index, field in enumerate(FIELDS)
+        }
+        return cls(reference_signature(conn), fields)
+
+    def search(self, field, text, limit=10):
+        return self.fields[field].search(text, limit)
+
+    def save(self, path):
+        """Write the index as a JSON header line followed by its arrays, replacing any older file."""
+        header = {"version": INDEX_VERSION, "signature": self.signature, "fields": {}}
+        blobs = []
+        for field, index in self.fields.items():
+            arrays = {
+                "species_ids": index.species_ids, "sizes": index.sizes,
+                "offsets": index.offsets, "postings": index.postings,
+            }
+            header["fields"][field] = {
+                "grams": sorted(index.grams, key=index.grams.get),
+                "arrays": {name: [values.typecode, len(values)] for name, values in arrays.items()},
+            }
+            blobs.extend(values.tobytes() for values in arrays.values())
+
+        with open(path + ".tmp", "wb") as file:
+            file.write(json.dumps(header).encode("utf-8") + b"\n")
+            for blob in blobs:
+                file.write(blob)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved index, or return None if there is none or it was written by another version."""
+        try:
+            with open(path, "rb") as file:
+                header = json.loads(file.readline())
+                if header.get("version") != INDEX_VERSION:
+                    return None
+                fields = {}
+                for field, layout in header["fields"].items():
+                    arrays = {}
+                    for name, (typecode, length) in layout["arrays"].items():
+                        values = array(typecode)
+                        values.frombytes(file.read(length * values.itemsize))
+                        if len(values) != length:
+                            return None  # Truncated
+                        arrays[name] = values
+                    grams = {gram: position for position, gram in enumerate(layout["grams"])}
+                    fields[field] = TrigramIndex(
+                        arrays["species_ids"], arrays["sizes"], grams, arrays["offsets"], arrays["postings"]
+                    )
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(header["signature"], fields)
+
+
+def reference_signature(conn):
+    return list(conn.execute(REFERENCE_SIGNATURE_QUERY).fetchone())
+
+
+def open_fuzzy_index(conn, path):
+    """Load the saved index at ``path``, rebuilding and saving it if it's missing or out of date."""
+    index = FuzzySpeciesIndex.load(path)
+    if index is not None and index.signature == reference_signature(conn):
+        return index
+    index = FuzzySpeciesIndex.build(conn)
+    try:
+        index.save(path)
+    except OSError:
+        pass  # Read-only location, keep the index in memory only
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the fuzzy species name index next to the database, or search it.")
+    parser.add_argument("query", nargs="?", help="Name to look up, typos and all")
+    parser.add_argument("--db", default="fishdex.db", help="SQLite database file (default: fishdex.db)")
+    parser.add_argument("--field", choices=FIELDS, default="commonName", help="Name to match (default: commonName)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index even if it is up to date")
+    args = parser.parse_args(argv)
+
+    from fishdex_db import REFERENCE_SPECIES_QUERY, connect
+
+    conn = connect(args.db, readonly=True)
+    path = index_path_for(args.db)
+    try:
+        start = time.perf_counter()
+        if args.rebuild:
+            index = FuzzySpeciesIndex.build(conn)
+            index.save(path)
+        else:
+            index = open_fuzzy_index(conn, path)
+        print(f"Index ready in {(time.perf_counter() - start) * 1000:.0f} ms: {path}")
+
+        if args.query:
+            start = time.perf_counter()
+            matches = index.search(args.field, args.query)
+            elapsed = time.perf_counter() - start
+            for species_id, similarity in matches:
+                common, scientific = conn.execute(REFERENCE_SPECIES_QUERY, (species_id,)).fetchone()
+                print(f"{similarity:.2f}  {species_id:>6}  {common or ''} ({scientific})")
+            print(f"{len(matches)} matches in {elapsed * 1000:.2f} ms")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1479 @@
+import time
+
+STARTED = time.perf_counter()  # Start of the GUI import, for the startup timings
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import datetime
+from fishdex_db import DB_PATH, CatchSession, Database, check_catch, parse_coordinates, wall_clock_seconds
+from fishdex_widgets import ColumnWidths, VirtualTreeview, Debouncer, LatestQuery, BackgroundTasks, job_callbacks
+from fishdex_images import ImageCache, encode_catch_photo, renditions_from_jpeg, open_image
+from fishdex_metrics import metrics
+from fishdex_analytics import CatchStats
+from fishdex_refimages import ReferenceImageCache, ReferenceImagePrefetcher, cache_dir_for
+import io
+import os
+
+# Pillow's Tk support, NumPy for the Analytics tab and the batch import's process pool are imported when first used
+
+
+# --- Database Setup ---
+# Long-lived connections shared by every view, opened by main() once the window is showing
+db = None
+
+# Milliseconds of quiet typing before a search box queries the database
+SEARCH_DELAY_MS = 200
+
+# --- Tkinter UI ---
+root = tk.Tk()
+root.title("FishDex")
+root.geometry("1000x600")  # Set window size
+
+notebook = ttk.Notebook(root)
+notebook.pack(fill="both", expand=True)
+
+
+# --- Home Tab ---
+home_tab = ttk.Frame(notebook)
+notebook.add(home_tab, text="Home")
+
+new_entry_button = ttk.Button(home_tab, text="New Entry")
+new_entry_button.pack(pady=10)
+
+import_photos_button = ttk.Button(home_tab, text="Import Photos")
+import_photos_button.pack(pady=10)
+
+export_button = ttk.Button(home_tab, text="Export Catch Log")
+export_button.pack(pady=10)
+
+import_catches_button = ttk.Button(home_tab, text="Import Catch Log")
+import_catches_button.pack(pady=10)
+
+quit_button = ttk.Button(home_tab, text="Quit", command=root.quit)
+quit_button.pack(pady=10)
+
+# --- Catch Log Tab ---
+catch_log_tab = ttk.Frame(notebook)
+notebook.add(catch_log_tab, text="Catch Log")
+
+# Search Bar Frame
+catch_log_search_frame = ttk.Frame(catch_log_tab)
+catch_log_search_frame.pack(fill="x", pady=5)
+
+# Search Bar
+catch_log_search = ttk.Entry(catch_log_search_frame, width=50)
+catch_log_search.pack(side="left", padx=5)
+catch_log_search.bind("<KeyRelease>", lambda e: search_catch_log_debounced(catch_log_search.get()))
+
+# Date range filter; the custom range is typed into the From/To boxes
+DATE_RANGES = ("All dates", "Last trip", "Last 30 days", "This season", "This year", "Custom range")
+catch_log_range = ttk.Combobox(catch_log_search_frame, values=DATE_RANGES, state="readonly", width=14)
+catch_log_range.set(DATE_RANGES[0])
+catch_log_range.pack(side="left", padx=5)
+catch_log_range.bind("<<ComboboxSelected>>", lambda e: filter_catch_log_dates())
+
+catch_log_range_from = ttk.Entry(catch_log_search_frame, width=11, state="disabled")
+catch_log_range_from.pack(side="left")
+ttk.Label(catch_log_search_frame, text="to").pack(side="left", padx=2)
+catch_log_range_to = ttk.Entry(catch_log_search_frame, width=11, state="disabled")
+catch_log_range_to.pack(side="left")
+for range_entry in (catch_log_range_from, catch_log_range_to):
+    range_entry.bind("<Return>", lambda e: filter_catch_log_dates())
+
+# Thumbnail of the selected catch
+catch_log_preview = tk.Label(catch_log_search_frame, text="No photo", fg="gray", width=18)
+catch_log_preview.pack(side="right", padx=5)
+
+# Treeview for Catch Log
+catch_log_table = ttk.Treeview(
+    catch_log_tab,
+    columns=("Catch ID", "Common Name", "Scientific Name", "Datetime Caught", "Location"),
+    show="headings"
+)
+catch_log_table.heading("Catch ID", text="Catch Number", command=lambda: sort_catch_log("Catch ID"))
+catch_log_table.heading("Common Name", text="Common Name", command=lambda: sort_catch_log("Common Name"))
+catch_log_table.heading("Scientific Name", text="Scientific Name", command=lambda: sort_catch_log("Scientific Name"))
+catch_log_table.heading("Datetime Caught", text="Date Caught", command=lambda: sort_catch_log("Datetime Caught"))
+catch_log_table.heading("Location", text="Location Caught", command=lambda: sort_catch_log("Location"))
+catch_log_table.pack(fill="both", expand=True, pady=5)
+
+
+@metrics.instrument("ui")
+def on_catch_log_row_click(event):
+    """Handle row click in Catch Log to display full-size image or a no-image message."""
+    # Get selected item
+    selected_item = catch_log_table.selection()
+    if not selected_item:
+        return
+
+    # Get the Catch ID from the selected row
+    catch_id = catch_log_table.item(selected_item, "values")[0]
+
+    photo_id = db.catch_photo_id(catch_id)
+
+    if photo_id is not None:
+        # Create a popup to display the image
+        popup = tk.Toplevel(root)
+        popup.title(f"Catch ID: {catch_id} Photo")
+
+        # Show progress while the photo is decoded in the background
+        loading = ttk.Progressbar(popup, mode="indeterminate", length=200)
+        loading.pack(padx=20, pady=20)
+        loading.start()
+
+        def show(photo_image):
+            loading.destroy()
+            # Size the popup to match the image
+            popup.geometry(f"{photo_image.width()}x{photo_image.height()}")
+
+            label = tk.Label(popup, image=photo_image)
+            label.image = photo_image  # Keep a reference to avoid garbage collection
+            label.pack(fill="both", expand=True)
+
+        def failed(e):
+            # Handle corrupted image data
+            popup.destroy()
+            messagebox.showerror("Error", f"Unable to display image for Catch ID: {catch_id}\n{e}")
+
+        task = load_photo_image(photo_id, "preview", show, failed)
+        if task is not None:
+            # Closing the popup early cancels the decode
+            popup.bind("<Destroy>", lambda e: task.cancel() if e.widget is popup else None)
+
+    else:  # No valid photo available
+        messagebox.showinfo("No Image", f"No image available for Catch ID: {catch_id}")
+
+
+# Decoded photos, so re-opening recent catches doesn't decode them again
+photo_cache = ImageCache()
+
+# Pillow work runs here instead of on the Tk thread
+image_tasks = BackgroundTasks(root)
+
+# Exports, imports and other long jobs, kept off the photo decode pool
+long_tasks = BackgroundTasks(root, max_workers=2)
+
+
+@metrics.instrument("image")
+def decode_rendition(photo_id, kind):
+    """Decode one rendition of a stored photo (runs on a worker thread)."""
+    photo_file = db.open_rendition(photo_id, kind)
+    if photo_file is None:
+        # Photo stored before renditions existed, make them now
+        with db.open_photo(photo_id) as full:
+            renditions = renditions_from_jpeg(full.read())
+        db.add_renditions(photo_id, renditions)
+        photo_file = io.BytesIO(renditions[kind][0])
+
+    # Decode straight from the blob, then release it
+    with photo_file:
+        image = open_image(photo_file)
+        image.load()
+    return image
+
+
+def load_photo_image(photo_id, kind, on_ready, on_error, decode=decode_rendition):
+    """Get a PhotoImage of one rendition of a stored photo and pass it to ``on_ready``.
+
+    Cached images are delivered immediately and None is returned. Otherwise the
+    photo is decoded in the background and the cancellable task is returned.
+    ``decode(photo_id, kind)`` loads the image on a worker thread.
+    """
+    key = (photo_id, kind)
+    photo_image = photo_cache.get(key)
+    if photo_image is not None:
+        on_ready(photo_image)
+        return None
+
+    def decoded(image):
+        from PIL import ImageTk
+
+        # PhotoImage has to be created on the Tk thread
+        with metrics.timed("image", "PhotoImage"):
+            photo_image = ImageTk.PhotoImage(image)
+        photo_cache.put(key, photo_image)
+        on_ready(photo_image)
+
+    return image_tasks.submit(decode, photo_id, kind, on_done=decoded, on_error=on_error)
+
+
+# Thumbnail decode for the preview pane, replaced when the selection changes
+preview_task = None
+
+
+@metrics.instrument("ui")
+def on_catch_log_select(event):
+    """Show the thumbnail of the selected catch in the preview pane."""
+    global preview_task
+    if preview_task is not None:
+        preview_task.cancel()
+        preview_task = None
+
+    selected_item = catch_log_table.selection()
+    photo_id = db.catch_photo_id(selected_item[0]) if selected_item else None
+    if photo_id is None:
+        catch_log_preview.config(image="", text="No photo", width=18)
+        catch_log_preview.image = None
+        return
+
+    def show(thumbnail):
+        catch_log_preview.config(image=thumbnail, text="", width=thumbnail.width())
+        catch_log_preview.image = thumbnail  # Keep a reference to avoid garbage collection
+
+    def failed(e):
+        catch_log_preview.config(image="", text="Unreadable photo", width=18)
+        catch_log_preview.image = None
+
+    catch_log_preview.config(image="", text="Loading...", width=18)
+    preview_task = load_photo_image(photo_id, "thumbnail", show, failed)
+
+
+# Bind the row click event
+catch_log_table.bind("<ButtonRelease-1>", on_catch_log_row_click)
+catch_log_table.bind("<<TreeviewSelect>>", on_catch_log_select)
+
+# Scrollbars for Treeview
+tree_scroll_y = ttk.Scrollbar(catch_log_tab, orient="vertical", command=catch_log_table.yview)
+tree_scroll_y.pack(side="right", fill="y")
+
+# Current Catch Log search text, date range and sort order, applied in the page query
+catch_log_state = {"filter_text": "", "date_range": None, "sort_column": "Catch ID", "descending": True}
+
+
+@metrics.instrument("ui")
+def fetch_catch_log_page(after=None, before=None, limit=200):
+    """Fetch one page of the Catch Log with the current search, date range and sort order."""
+    return db.catch_log_page(
+        catch_log_state["sort_column"], catch_log_state["descending"],
+        after=after, before=before, limit=limit, filter_text=catch_log_state["filter_text"],
+        date_range=catch_log_state["date_range"],
+    )
+
+
+# Columns are sized from the widest loaded value, updated as rows come and go
+catch_log_widths = ColumnWidths(catch_log_table)
+
+# Only the rows around the visible window are kept in the Treeview
+catch_log_view = VirtualTreeview(catch_log_table, tree_scroll_y, fetch_catch_log_page, column_widths=catch_log_widths)
+
+
+# --- Species Tab ---
+species_tab = ttk.Frame(notebook)
+notebook.add(species_tab, text="Species")
+
+# Search Bar Frame for Species Tab
+species_search_frame = ttk.Frame(species_tab)
+species_search_frame.pack(fill="x", pady=5)
+
+# Search Bar
+species_search = ttk.Entry(species_search_frame, width=50)
+species_search.pack(side="left", padx=5)
+
+# Bind Search Bar to Species Refresh Function
+species_search.bind("<KeyRelease>", lambda e: search_species_debounced(species_search.get()))
+
+# Reference picture of the selected species
+species_picture = tk.Label(species_search_frame, text="No picture", fg="gray", width=18)
+species_picture.pack(side="right", padx=5)
+
+# Treeview for Species Tab
+species_table = ttk.Treeview(
+    species_tab,
+    columns=("Species ID", "Common Name", "Scientific Name", "Quantity Caught", "Order Discovered", "First Caught Date", "First Location Discovered"),
+    show="headings"
+)
+species_table.heading("Species ID", text="Species ID", command=lambda: sort_species("Species ID"))
+species_table.heading("Common Name", text="Common Name", command=lambda: sort_species("Common Name"))
+species_table.heading("Scientific Name", text="Scientific Name", command=lambda: sort_species("Scientific Name"))
+species_table.heading("Quantity Caught", text="Quantity Caught", command=lambda: sort_species("Quantity Caught"))
+species_table.heading("Order Discovered", text="Order Discovered", command=lambda: sort_species("Order Discovered"))
+species_table.heading("First Caught Date", text="Date Discovered", command=lambda: sort_species("First Caught Date"))
+species_table.heading("First Location Discovered", text="Location Discovered", command=lambda: sort_species("First Location Discovered"))
+species_table.pack(fill="both", expand=True, pady=5)
+
+
+# Scrollbars for Treeview
+species_scroll_y = ttk.Scrollbar(species_tab, orient="vertical", command=species_table.yview)
+species_scroll_y.pack(side="right", fill="y")
+species_table.configure(yscrollcommand=species_scroll_y.set)
+
+species_widths = ColumnWidths(species_table)
+
+# Current Species search text and sort order, applied in the query; newest discoveries first by default
+species_state = {"filter_text": "", "sort_column": "Order Discovered", "descending": True}
+
+# Downloads reference pictures into the cache next to the database, started by main()
+reference_images = None
+
+# Reference picture load for the Species tab, replaced when the selection changes
+species_picture_task = None
+
+
+def decode_reference_image(url, kind):
+    """Decode a cached reference picture (runs on a worker thread)."""
+    path = reference_images.cache.path(url, kind)
+    if path is None:
+        raise FileNotFoundError(f"{url} is not cached")  # Evicted since it was fetched
+    image = open_image(path)
+    image.load()
+    return image
+
+
+@metrics.instrument("ui")
+def on_species_select(event):
+    """Show the reference picture of the selected species, from the offline cache when it's there."""
+    global species_picture_task
+    if species_picture_task is not None:
+        species_picture_task.cancel()
+        species_picture_task = None
+
+    selected_item = species_table.selection()
+    url = db.reference_image_link(selected_item[0]) if selected_item else None
+    if url is None:
+        species_picture.config(image="", text="No picture", width=18)
+        species_picture.image = None
+        return
+
+    def show(thumbnail):
+        species_picture.config(image=thumbnail, text="", width=thumbnail.width())
+        species_picture.image = thumbnail  # Keep a reference to avoid garbage collection
+
+    def failed(e):
+        species_picture.config(image="", text="Picture unavailable", width=18)
+        species_picture.image = None
+
+    def decode(_=None):
+        global species_picture_task
+        species_picture_task = load_photo_image(url, "thumbnail", show, failed, decode_reference_image)
+
+    species_picture.config(image="", text="Loading...", width=18)
+    if url in reference_images.cache:
+        decode()
+    else:
+        # Downloads wait on the prefetcher's loop, not on a photo decode worker
+        species_picture_task = image_tasks.watch(reference_images.request(url), on_done=decode, on_error=failed)
+
+
+species_table.bind("<<TreeviewSelect>>", on_species_select)
+
+
+# --- Diagnostics Tab ---
+diagnostics_tab = ttk.Frame(notebook)
+notebook.add(diagnostics_tab, text="Diagnostics")
+
+diagnostics_buttons = ttk.Frame(diagnostics_tab)
+diagnostics_buttons.pack(fill="x", pady=5)
+ttk.Button(diagnostics_buttons, text="Refresh", command=lambda: refresh_diagnostics()).pack(side="left", padx=5)
+ttk.Button(diagnostics_buttons, text="Reset", command=lambda: reset_diagnostics()).pack(side="left", padx=5)
+
+# UI callbacks and image operations
+operations_table = ttk.Treeview(
+    diagnostics_tab, columns=("Category", "Operation", "Calls", "p50 ms", "p95 ms", "Max ms"), show="headings", height=8
+)
+for col in operations_table["columns"]:
+    operations_table.heading(col, text=col)
+operations_table.pack(fill="both", expand=True, padx=5, pady=5)
+
+# Slowest SQL statements; selecting one shows its query plan
+queries_table = ttk.Treeview(
+    diagnostics_tab, columns=("Max ms", "p95 ms", "Calls", "Statement"), show="headings", height=8
+)
+for col in queries_table["columns"]:
+    queries_table.heading(col, text=col)
+queries_table.column("Statement", width=600)
+queries_table.pack(fill="both", expand=True, padx=5, pady=5)
+
+query_plan_text = tk.Text(diagnostics_tab, height=10, wrap="none")
+query_plan_text.pack(fill="both", expand=True, padx=5, pady=5)
+
+# Statements shown in the queries table, by item id
+diagnostics_statements = {}
+
+# Slow statements listed in the Diagnostics tab
+SLOWEST_QUERIES_SHOWN = 50
+
+
+# --- Analytics Tab ---
+analytics_tab = ttk.Frame(notebook)
+notebook.add(analytics_tab, text="Analytics")
+
+analytics_buttons = ttk.Frame(analytics_tab)
+analytics_buttons.pack(fill="x", pady=5)
+ttk.Button(analytics_buttons, text="Refresh", command=lambda: refresh_analytics()).pack(side="left", padx=5)
+analytics_status = ttk.Label(analytics_buttons, text="")
+analytics_status.pack(side="left", padx=10)
+
+# Catches per hour of the day and species discovered over time
+analytics_charts = ttk.Frame(analytics_tab)
+analytics_charts.pack(fill="x", padx=5, pady=5)
+hours_canvas = tk.Canvas(analytics_charts, height=160, background="white")
+hours_canvas.pack(side="left", fill="x", expand=True, padx=(0, 5))
+discovery_canvas = tk.Canvas(analytics_charts, height=160, background="white")
+discovery_canvas.pack(side="left", fill="x", expand=True)
+
+# Catch rates per location
+locations_table = ttk.Treeview(
+    analytics_tab, columns=("Location", "Catches", "Fishing Days", "Catches/Day", "Last Catch"), show="headings", height=7
+)
+for col in locations_table["columns"]:
+    locations_table.heading(col, text=col)
+locations_table.pack(fill="both", expand=True, padx=5, pady=5)
+
+# Catches per species over the last months of the log
+species_months_table = ttk.Treeview(analytics_tab, show="headings", height=8)
+species_months_table.pack(fill="both", expand=True, padx=5, pady=5)
+
+# Months and species shown in the species-by-month table
+ANALYTICS_MONTHS_SHOWN = 12
+ANALYTICS_SPECIES_SHOWN = 50
+
+# Delay before recomputing the visible dashboard after new catches
+ANALYTICS_DELAY_MS = 1000
+
+
+# --- Functions to Refresh Data ---
+def refresh_catch_log(filter_text=None, on_loaded=None):
+    """Reload the Catch Log from the first page in the background, optionally with a new search filter.
+
+    Only the latest refresh is shown; ``on_loaded`` is called once its rows are.
+    """
+    if filter_text is not None:
+        catch_log_state["filter_text"] = filter_text
+
+    def show(rows):
+        show_catch_log_page(rows)
+        if on_loaded:
+            on_loaded()
+
+    catch_log_queries.submit(lambda: fetch_catch_log_page(limit=catch_log_view.page_size), show)
+
+
+@metrics.instrument("ui")
+def show_catch_log_page(rows):
+    """Replace the rows in the Catch Log Treeview with a freshly fetched first page."""
+    catch_log_view.refresh(first_page=rows)
+
+
+@metrics.instrument("ui")
+def sort_catch_log(col):
+    """Sort the Catch Log by a column in the database, toggling direction on repeated clicks."""
+    if catch_log_state["sort_column"] == col:
+        catch_log_state["descending"] = not catch_log_state["descending"]
+    else:
+        catch_log_state["sort_column"] = col
+        catch_log_state["descending"] = False
+    refresh_catch_log()
+
+
+def catch_log_date_range(choice):
+    """Wall-clock (start, end) seconds of a date range choice, or None for all dates.
+
+    Raises ValueError when a custom range isn't two YYYY-MM-DD dates.
+    """
+    today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = today + datetime.timedelta(days=1)
+    if choice == "Last trip":
+        return db.last_trip()
+    if choice == "Last 30 days":
+        start = today - datetime.timedelta(days=29)
+    elif choice == "This season":
+        # Meteorological seasons: winter starts in December, spring in March and so on
+        month = today.month - today.month % 3
+        start = today.replace(year=today.year - 1, month=12, day=1) if month == 0 else today.replace(month=month, day=1)
+    elif choice == "This year":
+        start = today.replace(month=1, day=1)
+    elif choice == "Custom range":
+        start = datetime.datetime.strptime(catch_log_range_from.get().strip(), "%Y-%m-%d")
+        # The end date is included
+        end = datetime.datetime.strptime(catch_log_range_to.get().strip(), "%Y-%m-%d") + datetime.timedelta(days=1)
+    else:
+        return None
+    return wall_clock_seconds(start), wall_clock_seconds(end)
+
+
+@metrics.instrument("ui")
+def filter_catch_log_dates():
+    """Apply the chosen date range to the Catch Log."""
+    choice = catch_log_range.get()
+    custom = choice == "Custom range"
+    for range_entry in (catch_log_range_from, catch_log_range_to):
+        range_entry.config(state="normal" if custom else "disabled")
+    if custom and not (catch_log_range_from.get().strip() and catch_log_range_to.get().strip()):
+        catch_log_range_from.focus_set()
+        return  # Wait for both dates
+    try:
+        catch_log_state["date_range"] = catch_log_date_range(choice)
+    except ValueError:
+        messagebox.showerror("Error", "Invalid date range. Use YYYY-MM-DD for both dates.")
+        return
+    refresh_catch_log()
+
+
+@metrics.instrument("ui")
+def fetch_species_rows():
+    """Fetch the Species tab with the current search and sort order."""
+    return db.species_rows(species_state["filter_text"], species_state["sort_column"], species_state["descending"])
+
+
+def refresh_species(filter_text=None, on_loaded=None):
+    """Reload the Species tab in the background, optionally with a new search filter.
+
+    Only the latest refresh is shown; ``on_loaded`` is called once its rows are.
+    """
+    if filter_text is not None:
+        species_state["filter_text"] = filter_text
+
+    def show(rows):
+        show_species_rows(rows)
+        if on_loaded:
+            on_loaded()
+
+    species_queries.submit(fetch_species_rows, show)
+
+
+@metrics.instrument("ui")
+def sort_species(col):
+    """Sort the Species tab by a column in the database, toggling direction on repeated clicks."""
+    if species_state["sort_column"] == col:
+        species_state["descending"] = not species_state["descending"]
+    else:
+        species_state["sort_column"] = col
+        species_state["descending"] = False
+    refresh_species()
+
+
+@metrics.instrument("ui")
+def show_species_rows(rows):
+    """Replace the rows in the Species Treeview."""
+    # Clear the existing rows in the Treeview
+    species_table.delete(*species_table.get_children())
+    species_widths.clear()
+
+    # Insert rows into the Treeview, keyed by species ID so they can be patched in place
+    for row in rows:
+        species_table.insert("", "end", iid=str(row[0]), values=row)
+        species_widths.add(str(row[0]), row)
+
+    # Adjust column widths dynamically
+    species_widths.apply()
+
+
+@metrics.instrument("ui")
+def on_catch_added(change):
+    """Patch the views for a newly logged catch instead of reloading them."""
+    # Insert the catch at its sorted position if it's in the loaded window and matches the search
+    row = db.catch_log_row(
+        change["catch_id"], catch_log_state["sort_column"], catch_log_state["descending"],
+        catch_log_state["filter_text"], catch_log_state["date_range"],
+    )
+    if row is not None:
+        key, values = row
+        catch_log_view.insert_row(key, values, catch_log_state["descending"])
+
+    # Update only the affected species row
+    species_id = str(change["species_id"])
+    species_values = db.species_row(change["species_id"])
+    # A catch can change the quantity and first-catch columns, so rows sorted by them may move
+    stable_order = species_state["sort_column"] in ("Species ID", "Common Name", "Scientific Name", "Order Discovered")
+    default_order = species_state["sort_column"] == "Order Discovered" and species_state["descending"]
+    if species_table.exists(species_id) and stable_order:
+        species_table.item(species_id, values=species_values)
+    elif species_state["filter_text"].strip() or not default_order:
+        # The row may move or may not match the current search, let the database decide
+        refresh_species()
+        return
+    else:
+        # Newest discovery goes first in the default Order Discovered order
+        species_table.insert("", 0, iid=species_id, values=species_values)
+    species_widths.add(species_id, species_values)
+    species_widths.apply()
+
+
+def refresh_diagnostics():
+    """Show the current timings in the Diagnostics tab."""
+    operations_table.delete(*operations_table.get_children())
+    for category, name, summary in metrics.summaries():
+        if category == "sql":
+            continue
+        operations_table.insert("", "end", values=(
+            category, name, summary["count"],
+            f"{summary['p50_ms']:.1f}", f"{summary['p95_ms']:.1f}", f"{summary['max_ms']:.1f}",
+        ))
+
+    queries_table.delete(*queries_table.get_children())
+    diagnostics_statements.clear()
+    slowest = sorted(metrics.summaries("sql"), key=lambda row: row[2]["max_ms"], reverse=True)
+    for _, sql, summary in slowest[:SLOWEST_QUERIES_SHOWN]:
+        iid = queries_table.insert("", "end", values=(
+            f"{summary['max_ms']:.1f}", f"{summary['p95_ms']:.1f}", summary["count"], sql,
+        ))
+        diagnostics_statements[iid] = sql
+
+
+def reset_diagnostics():
+    metrics.reset()
+    query_plan_text.delete("1.0", "end")
+    refresh_diagnostics()
+
+
+def on_query_select(event):
+    """Show the selected statement with the EXPLAIN QUERY PLAN of its slowest execution."""
+    selected_item = queries_table.selection()
+    if not selected_item:
+        return
+    sql = diagnostics_statements[selected_item[0]]
+    try:
+        plan = db.explain(sql, metrics.slowest_params(sql)) or ["(no query plan for this statement)"]
+    except Exception as e:
+        plan = [f"Unable to explain: {e}"]
+    query_plan_text.delete("1.0", "end")
+    query_plan_text.insert("end", sql + "\n\n" + "\n".join(plan))
+
+
+queries_table.bind("<<TreeviewSelect>>", on_query_select)
+
+
+# Computes the Analytics tab, created by main() together with the database
+catch_stats = None
+analytics_state = {"task": None, "stale": False}
+
+
+def refresh_analytics():
+    """Compute the catch statistics in the background and show them in the Analytics tab."""
+    if analytics_state["task"] is not None:
+        # Run again once the current computation is shown
+        analytics_state["stale"] = True
+        return
+    analytics_state["stale"] = False
+
+    def failed(e):
+        analytics_state["task"] = None
+        if isinstance(e, ImportError):
+            analytics_status.config(text="Install NumPy to see catch statistics.")
+        else:
+            analytics_status.config(text=f"Unable to compute statistics: {e}")
+
+    analytics_status.config(text="Computing...")
+    analytics_state["task"] = long_tasks.submit(catch_stats.stats, on_done=show_analytics, on_error=failed)
+
+
+def format_epoch(seconds, fmt="%Y-%m-%d"):
+    """Format a wall-clock time stored as seconds since the epoch."""
+    return (datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=int(seconds))).strftime(fmt)
+
+
+@metrics.instrument("ui")
+def show_analytics(stats):
+    # The task's future may not be marked done yet while its result is being delivered
+    analytics_state["task"] = None
+    if analytics_state["stale"]:
+        refresh_analytics()
+    analytics_status.config(
+        text=f"{stats['catches']} catches, {stats['fetched']} read, computed in {stats['seconds'] * 1000:.0f} ms"
+    )
+    draw_hours_chart(stats["hours"])
+    draw_discovery_chart(stats["discovery"])
+
+    locations_table.delete(*locations_table.get_children())
+    location_rows = sorted(stats["locations"].items(), key=lambda item: item[1][0], reverse=True)
+    for location_id, (catches, fishing_days, per_day, last) in location_rows:
+        locations_table.insert("", "end", values=(
+            stats["location_names"].get(location_id, location_id), catches, fishing_days,
+            f"{per_day:.2f}", format_epoch(last, "%Y-%m-%d %H:%M"),
+        ))
+
+    species_months_table.delete(*species_months_table.get_children())
+    if stats["months"] is None:
+        species_months_table["columns"] = ()
+        return
+    (first_year, first_month), month_count = stats["months"]
+    shown = min(month_count, ANALYTICS_MONTHS_SHOWN)
+    month_labels = []
+    for index in range(month_count - shown, month_count):
+        year, month = divmod(first_month - 1 + index, 12)
+        month_labels.append(f"{first_year + year}-{month + 1:02d}")
+    columns = ("Species", *month_labels, "Total")
+    species_months_table["columns"] = columns
+    for col in columns:
+        species_months_table.heading(col, text=col)
+        species_months_table.column(col, width=200 if col == "Species" else 60, anchor="w" if col == "Species" else "e")
+
+    totals = sorted(
+        ((int(per_month.sum()), species_id) for species_id, per_month in stats["species_months"].items()), reverse=True
+    )
+    for total, species_id in totals[:ANALYTICS_SPECIES_SHOWN]:
+        per_month = stats["species_months"][species_id]
+        species_months_table.insert("", "end", values=(
+            stats["species_names"].get(species_id, species_id), *per_month[-shown:].tolist(), total,
+        ))
+
+
+def draw_hours_chart(hours):
+    """Bar chart of catches per hour of the day."""
+    hours_canvas.delete("all")
+    width = max(hours_canvas.winfo_width(), 240)
+    height = int(hours_canvas["height"])
+    top = max(int(hours.max()), 1)
+    bar = (width - 20) / 24
+    for hour, count in enumerate(hours.tolist()):
+        x = 10 + hour * bar
+        bar_height = (height - 30) * count / top
+        hours_canvas.create_rectangle(x + 1, height - 20 - bar_height, x + bar - 1, height - 20, fill="steelblue", width=0)
+        if hour % 6 == 0:
+            hours_canvas.create_text(x, height - 10, text=f"{hour:02d}:00", anchor="w")
+    hours_canvas.create_text(10, 8, text=f"Catches by hour (max {top})", anchor="nw")
+
+
+def draw_discovery_chart(discovery):
+    """Species discovered against the date of their first catch."""
+    discovery_canvas.delete("all")
+    discovery_canvas.create_text(10, 8, text=f"Species discovered ({len(discovery)})", anchor="nw")
+    if len(discovery) < 2:
+        return
+    width = max(discovery_canvas.winfo_width(), 240)
+    height = int(discovery_canvas["height"])
+    order, first = discovery[:, 0], discovery[:, 1]
+    span = max(int(first.max() - first.min()), 1)
+    xs = 10 + (first - first.min()) * (width - 20) / span
+    ys = height - 20 - (order - order.min()) * (height - 40) / max(int(order.max() - order.min()), 1)
+    points = [coord for point in zip(xs.tolist(), ys.tolist()) for coord in point]
+    discovery_canvas.create_line(*points, fill="seagreen", width=2)
+    discovery_canvas.create_text(10, height - 10, text=format_epoch(first.min()), anchor="w")
+    discovery_canvas.create_text(width - 10, height - 10, text=format_epoch(first.max()), anchor="e")
+
+
+def analytics_visible():
+    return notebook.select() == str(analytics_tab)
+
+
+refresh_analytics_debounced = Debouncer(root, ANALYTICS_DELAY_MS, lambda: refresh_analytics() if analytics_visible() else None)
+
+
+def on_tab_changed(event):
+    selected = notebook.select()
+    if selected == str(diagnostics_tab):
+        refresh_diagnostics()
+    elif selected == str(analytics_tab):
+        refresh_analytics()
+
+
+notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
+
+
+def on_database_change(change):
+    """Route data layer change notifications to the views."""
+    if change["type"] == "catch_added":
+        on_catch_added(change)
+        refresh_analytics_debounced()
+
+
+# Searches run in the background; fast typing only runs the last query.
+# The query runners are created by main() together with the database.
+catch_log_queries = species_queries = None
+search_catch_log_debounced = Debouncer(root, SEARCH_DELAY_MS, refresh_catch_log)
+search_species_debounced = Debouncer(root, SEARCH_DELAY_MS, refresh_species)
+
+
+
+# --- New Entry Popup Function ---
+def fetch_location_suggestions(value, near=None):
+    """Fetch suggestions for the location field, closest to ``near`` first when it is given."""
+    return db.location_suggestions(value, near)
+
+
+def open_new_entry_popup():
+    popup = tk.Toplevel(root)
+    popup.title("New Entry")
+    popup.geometry("400x700")
+    
+        # Ensure the popup stays on top of the main window
+    popup.transient(root)  # Make the popup a "child" of the main window
+    popup.grab_set()       # Prevent interaction with the main window
+    popup.focus_set()      # Focus on the popup window
+
+    def fetch_suggestions(field, value):
+        """Fetch suggestions for autosuggestion dropdown, prefix matches first."""
+        return db.species_suggestions(field, value)
+
+    @metrics.instrument("ui")
+    def show_suggestions(entry_widget, field, other_entry, id_entry, dropdown):
+        """Update and display dropdown under the entry field."""
+        value = entry_widget.get()
+        if not value.strip():
+            dropdown.place_forget()  # Hide dropdown when input is empty
+            return
+
+        suggestions = fetch_suggestions(field, value)
+        if not suggestions:
+            dropdown.place_forget()  # Hide dropdown if no suggestions
+            return
+
+        # Populate dropdown with suggestions
+        dropdown.delete(0, "end")
+        for suggestion in suggestions:
+            dropdown.insert("end", f"{suggestion[1]} ({suggestion[2]})")
+
+        # Position the dropdown directly below the entry widget
+        x = entry_widget.winfo_x()
+        y = entry_widget.winfo_y() + entry_widget.winfo_height()
+        dropdown.place(x=x, y=y, width=entry_widget.winfo_width())
+        dropdown.lift()  # Bring the dropdown to the top layer
+
+        def on_select(event):
+            """Handle selection from dropdown."""
+            selected_index = dropdown.curselection()
+            if selected_index:
+                selected = suggestions[selected_index[0]]
+                # Autofill both fields and ID
+                entry_widget.delete(0, "end")
+                entry_widget.insert(0, selected[1] if field == "commonName" else selected[2])
+                other_entry.delete(0, "end")
+                other_entry.insert(0, selected[2] if field == "commonName" else selected[1])
+                id_entry.config(state="normal")  # Allow programmatic update
+                id_entry.delete(0, "end")
+                id_entry.insert(0, selected[0])
+                id_entry.config(state="readonly")  # Prevent further edits
+                dropdown.place_forget()  # Hide dropdown after selection
+
+        dropdown.bind("<<ListboxSelect>>", on_select)
+
+    # Common Name Field
+    tk.Label(popup, text="Common Name:").pack(pady=5)
+    common_name_entry = ttk.Entry(popup, width=30)
+    common_name_entry.pack(pady=5)
+    common_name_dropdown = tk.Listbox(popup, height=5)
+
+    common_name_entry.bind(
+        "<KeyRelease>", lambda e: show_suggestions(
+            common_name_entry, "commonName", species_name_entry, fish_id_entry, common_name_dropdown
+        )
+    )
+    common_name_entry.bind("<FocusIn>", lambda e: common_name_dropdown.lift())
+    common_name_entry.bind("<FocusOut>", lambda e: common_name_dropdown.place_forget())
+
+    # Scientific Name Field
+    tk.Label(popup, text="Scientific Name:").pack(pady=5)
+    species_name_entry = ttk.Entry(popup, width=30)
+    species_name_entry.pack(pady=5)
+    species_name_dropdown = tk.Listbox(popup, height=5)
+
+    species_name_entry.bind(
+        "<KeyRelease>", lambda e: show_suggestions(
+            species_name_entry, "scientificName", common_name_entry, fish_id_entry, species_name_dropdown
+        )
+    )
+    species_name_entry.bind("<FocusIn>", lambda e: species_name_dropdown.lift())
+    species_name_entry.bind("<FocusOut>", lambda e: species_name_dropdown.place_forget())
+
+    # Fish ID Field (Read-only)
+    tk.Label(popup, text="Fish ID:").pack(pady=5)
+    fish_id_entry = ttk.Entry(popup, width=30, state="readonly")
+    fish_id_entry.pack(pady=5)
+
+    # Location Field
+    tk.Label(popup, text="Location Name:").pack(pady=5)
+    location_name_entry = ttk.Entry(popup, width=30)
+    location_name_entry.pack(pady=5)
+    location_dropdown = tk.Listbox(popup, height=5)
+    last_spot = db.last_spot()  # Suggestions near where the last catch was made come first
+    selected_location = None  # Suggestion the coordinates field was filled in from
+
+    @metrics.instrument("ui")
+    def show_location_suggestions(event):
+        """Update and display dropdown under the location entry field."""
+        value = location_name_entry.get()
+        if not value.strip():
+            location_dropdown.place_forget()  # Hide dropdown when input is empty
+            return
+
+        suggestions = fetch_location_suggestions(value, last_spot)
+        if not suggestions:
+            location_dropdown.place_forget()  # Hide dropdown if no suggestions
+            return
+
+        # Populate dropdown with suggestions
+        location_dropdown.delete(0, "end")
+        for suggestion in suggestions:
+            location_dropdown.insert("end", suggestion)
+
+        # Position the dropdown directly below the entry widget
+        x = location_name_entry.winfo_x()
+        y = location_name_entry.winfo_y() + location_name_entry.winfo_height()
+        location_dropdown.place(x=x, y=y, width=location_name_entry.winfo_width())
+        location_dropdown.lift()  # Bring the dropdown to the top layer
+
+    def on_location_select(event):
+        """Handle selection from location dropdown."""
+        nonlocal selected_location
+        selected_index = location_dropdown.curselection()
+        if selected_index:
+            selected = location_dropdown.get(selected_index)
+            location_name_entry.delete(0, "end")
+            location_name_entry.insert(0, selected)
+            location_dropdown.place_forget()  # Hide dropdown after selection
+
+            # A known spot brings its own position along, or none
+            from fishdex_batch import format_gps
+
+            coordinates = db.location_coordinates(selected)
+            coordinates_entry.delete(0, "end")
+            if coordinates is not None:
+                coordinates_entry.insert(0, format_gps(coordinates))
+            selected_location = selected
+
+    def on_location_changed(*args):
+        """Drop the coordinates once the location is no longer the spot they belong to."""
+        nonlocal selected_location
+        if location_text.get() != selected_location:
+            selected_location = None
+            coordinates_entry.delete(0, "end")
+
+    location_dropdown.bind("<<ListboxSelect>>", on_location_select)
+
+    # Bind location entry field to show suggestions
+    location_text = tk.StringVar(popup)
+    location_name_entry.config(textvariable=location_text)
+    location_text.trace_add("write", on_location_changed)
+    location_name_entry.bind("<KeyRelease>", show_location_suggestions)
+    location_name_entry.bind("<FocusIn>", lambda e: location_dropdown.lift())
+    location_name_entry.bind("<FocusOut>", lambda e: location_dropdown.place_forget())
+
+    # Optional position of the spot, used for nearby searches
+    tk.Label(popup, text="Coordinates (latitude, longitude, optional):").pack(pady=5)
+    coordinates_entry = ttk.Entry(popup, width=30)
+    coordinates_entry.pack(pady=5)
+
+    # Datetime Field
+    tk.Label(popup, text="Datetime (YYYY-MM-DD HH:MM):").pack(pady=5)
+    current_datetime = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    datetime_entry = ttk.Entry(popup, width=30)
+    datetime_entry.insert(0, current_datetime)
+    datetime_entry.pack(pady=5)
+
+    # Photo Upload
+    photo_task = None  # Resize/encode running in the background
+
+    def upload_photo():
+        nonlocal photo_task
+        file_path = filedialog.askopenfilename(
+            title="Select Photo",
+            filetypes=[("Image Files", "*.png;*.jpg;*.jpeg"), ("All Files", "*.*")]
+        )
+        if file_path:
+            cancel_photo()
+
+            def encoded(result):
+                nonlocal photo_task
+                photo_task = None
+                photo_progress.stop()
+                photo_progress.pack_forget()
+                photo_cancel_button.pack_forget()
+
+                # Store the binary data
+                photo_label.photo_data, photo_label.photo_renditions = result
+                photo_label.config(text="Photo Selected")
+
+            def failed(e):
+                nonlocal photo_task
+                photo_task = None
+                photo_progress.stop()
+                photo_progress.pack_forget()
+                photo_cancel_button.pack_forget()
+                photo_label.config(text="No file selected")
+                messagebox.showerror("Error", f"Unable to read photo:\n{e}", parent=popup)
+
+            # Resize to at most 1000px, JPEG encode, and make the renditions off the Tk thread
+            photo_label.photo_data = photo_label.photo_renditions = None
+            photo_label.config(text="Processing photo...")
+            photo_progress.pack(after=photo_label, pady=5)
+            photo_progress.start()
+            photo_cancel_button.pack(after=photo_progress, pady=5)
+            photo_task = image_tasks.submit(encode_catch_photo, file_path, on_done=encoded, on_error=failed)
+
+    def cancel_photo():
+        """Stop processing the selected photo."""
+        nonlocal photo_task
+        if photo_task is not None:
+            photo_task.cancel()
+            photo_task = None
+            photo_progress.stop()
+            photo_progress.pack_forget()
+            photo_cancel_button.pack_forget()
+            photo_label.config(text="No file selected")
+
+    tk.Label(popup, text="Photo:").pack(pady=5)
+    photo_label = tk.Label(popup, text="No file selected", fg="gray")
+    photo_label.pack(pady=5)
+    photo_progress = ttk.Progressbar(popup, mode="indeterminate", length=200)
+    photo_cancel_button = ttk.Button(popup, text="Cancel Photo", command=cancel_photo)
+    photo_button = ttk.Button(popup, text="Upload Photo", command=upload_photo)
+    photo_button.pack(pady=5)
+
+    # Don't keep encoding a photo for a closed popup
+    popup.bind("<Destroy>", lambda e: cancel_photo() if e.widget is popup else None)
+
+    # Session mode: catches from one outing are queued and saved together
+    session = CatchSession(db)
+    session_mode = tk.BooleanVar(value=False)
+
+    def update_session():
+        submit_button.config(text="Add to Session" if session_mode.get() else "Submit")
+        # Queued catches stay in the session until it is saved or discarded
+        session_check.config(state="disabled" if len(session) else "normal")
+        if session_mode.get():
+            session_label.config(text=f"{len(session)} catches waiting to be saved")
+            session_label.pack(after=session_check, pady=5)
+            save_session_button.pack(after=session_label, pady=5)
+            save_session_button.config(state="normal" if len(session) else "disabled")
+        else:
+            session_label.pack_forget()
+            save_session_button.pack_forget()
+
+    def clear_catch_fields():
+        """Empty the fields that change from catch to catch; location and time stay for the next one."""
+        common_name_entry.delete(0, "end")
+        species_name_entry.delete(0, "end")
+        fish_id_entry.config(state="normal")
+        fish_id_entry.delete(0, "end")
+        fish_id_entry.config(state="readonly")
+        photo_label.photo_data = photo_label.photo_renditions = None
+        photo_label.config(text="No file selected")
+        common_name_entry.focus_set()
+
+    @metrics.instrument("ui")
+    def save_session():
+        """Save every queued catch in one transaction."""
+        try:
+            catch_ids = session.commit()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save the session: {e}", parent=popup)
+            return
+        messagebox.showinfo("Success", f"{len(catch_ids)} catches added.", parent=popup)
+        popup.destroy()
+
+    def close_popup():
+        if len(session) and not messagebox.askyesno(
+            "Discard Session", f"Discard the {len(session)} catches that haven't been saved?", parent=popup
+        ):
+            return
+        popup.destroy()
+
+    popup.protocol("WM_DELETE_WINDOW", close_popup)
+
+    # Submit Button
+    @metrics.instrument("ui")
+    def submit_entry():
+        fish_id = fish_id_entry.get()
+        common_name = common_name_entry.get()
+        scientific_name = species_name_entry.get()
+        location_name = location_name_entry.get()
+        coordinates_text = coordinates_entry.get().strip()
+        datetime_value = datetime_entry.get()
+        photo_data = getattr(photo_label, 'photo_data', None)  # Retrieve binary data
+        photo_renditions = getattr(photo_label, 'photo_renditions', None)
+
+        if photo_task is not None:
+            messagebox.showerror("Error", "The photo is still being processed.", parent=popup)
+            return
+
+        # Input validation, the same rules the HTTP API applies
+        problem = check_catch(fish_id, location_name, datetime_value)
+        if problem is None and (not common_name or not scientific_name):
+            problem = "All fields except photo are required."
+        coordinates = parse_coordinates(coordinates_text) if coordinates_text else None
+        if problem is None and coordinates_text and coordinates is None:
+            problem = "Coordinates must be latitude, longitude in degrees, like 47.60621, -122.33207."
+        if problem is not None:
+            messagebox.showerror("Error", problem)
+            return
+
+        if session_mode.get():
+            session.add(fish_id, location_name, datetime_value, photo_data, photo_renditions, coordinates)
+            clear_catch_fields()
+            update_session()
+            return
+
+        # Insert data into database
+        try:
+            # The views update themselves from the change notification
+            db.add_catch(fish_id, location_name, datetime_value, photo_data, photo_renditions, coordinates)
+
+            messagebox.showinfo("Success", "New entry added successfully!")
+            popup.destroy()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to add entry: {e}")
+
+    submit_button = ttk.Button(popup, text="Submit", command=submit_entry)
+    submit_button.pack(pady=10)
+    session_check = ttk.Checkbutton(
+        popup, text="Session: log several catches, save them together", variable=session_mode, command=update_session
+    )
+    session_check.pack(pady=5)
+    session_label = tk.Label(popup, fg="gray")
+    save_session_button = ttk.Button(popup, text="Save Session", command=save_session)
+    ttk.Button(popup, text="Cancel", command=close_popup).pack(pady=10)
+
+
+new_entry_button.config(command=open_new_entry_popup)
+
+
+# --- Batch Photo Import ---
+def run_with_progress(title, describe, work, on_done, error_message, on_cancelled=None):
+    """Run ``work(progress, cancelled)`` in the background behind a progress window.
+
+    ``work`` reports with ``progress(done, total)``, where total may be None, and
+    stops early once ``cancelled()`` returns True. ``describe(done, total)`` gives
+    the status text. ``on_done(result)`` runs on the Tk thread unless the job was
+    cancelled with the Cancel button or by closing the window, in which case
+    ``on_cancelled`` runs instead.
+    """
+    popup = tk.Toplevel(root)
+    popup.title(title)
+    popup.transient(root)
+    popup.grab_set()
+
+    # Written by the worker thread, read by the Tk thread
+    state = {"done": 0, "total": None, "cancelled": False}
+
+    status_label = tk.Label(popup, text=describe(0, None))
+    status_label.pack(padx=20, pady=10)
+    progress_bar = ttk.Progressbar(popup, mode="indeterminate", length=300)
+    progress_bar.pack(padx=20, pady=5)
+
+    def cancel():
+        state["cancelled"] = True
+        status_label.config(text="Cancelling...")
+
+    ttk.Button(popup, text="Cancel", command=cancel).pack(pady=10)
+
+    def update_progress():
+        if not popup.winfo_exists() or task.done():
+            return
+        if state["total"]:
+            progress_bar.config(mode="determinate", maximum=state["total"], value=state["done"])
+        else:
+            progress_bar.step()
+        if not state["cancelled"]:
+            status_label.config(text=describe(state["done"], state["total"]))
+        popup.after(100, update_progress)
+
+    finished, failed = job_callbacks(
+        popup, state, on_done, lambda e: messagebox.showerror("Error", f"{error_message}:\n{e}"), on_cancelled
+    )
+
+    # Closing the window stops the job too; the window goes once the job has stopped
+    popup.protocol("WM_DELETE_WINDOW", cancel)
+
+    task = long_tasks.submit(
+        work, lambda done, total: state.update(done=done, total=total), lambda: state["cancelled"],
+        on_done=finished, on_error=failed,
+    )
+    update_progress()
+
+
+def import_photo_folder():
+    """Pick a folder of photos, prepare them in worker processes, then open the review grid."""
+    from fishdex_batch import find_photos, prepare_photos
+
+    folder = filedialog.askdirectory(title="Select Photo Folder")
+    if not folder:
+        return
+    paths = find_photos(folder)
+    if not paths:
+        messagebox.showinfo("No Photos", f"No photos found in {folder}")
+        return
+
+    run_with_progress(
+        "Import Photos",
+        lambda done, total: f"Preparing {done}/{len(paths)} photos...",
+        lambda progress, cancelled: prepare_photos(paths, None, progress, cancelled),
+        lambda result: open_import_review(*result),
+        "Unable to prepare photos",
+    )
+
+
+def open_import_review(prepared, failed, stats):
+    """Review grid for assigning species and locations to prepared photos before committing."""
+    from fishdex_batch import commit_photos, throughput_report, format_gps
+
+    popup = tk.Toplevel(root)
+    popup.title("Review Imported Photos")
+    popup.geometry("900x550")
+    popup.transient(root)
+    popup.grab_set()
+
+    if failed:
+        tk.Label(
+            popup, fg="red",
+            text=f"{len(failed)} photos could not be read: " + ", ".join(os.path.basename(path) for path, _ in failed),
+        ).pack(fill="x", padx=5, pady=5)
+
+    columns = ("File", "Datetime Caught", "Location", "Species ID", "Common Name", "Scientific Name")
+    grid_frame = ttk.Frame(popup)
+    grid_frame.pack(fill="both", expand=True, padx=5, pady=5)
+    grid = ttk.Treeview(grid_frame, columns=columns, show="headings", selectmode="extended")
+    for col in columns:
+        grid.heading(col, text=col)
+    grid_scroll = ttk.Scrollbar(grid_frame, orient="vertical", command=grid.yview)
+    grid.configure(yscrollcommand=grid_scroll.set)
+    grid_scroll.pack(side="right", fill="y")
+    grid.pack(side="left", fill="both", expand=True)
+
+    grid_widths = ColumnWidths(grid)
+
+    # Row id -> prepared photo; photos with GPS get their coordinates as the location
+    photos = {}
+    for index, photo in enumerate(prepared):
+        iid = str(index)
+        photos[iid] = photo
+        location = format_gps(photo["gps"]) if photo["gps"] else ""
+        values = (os.path.basename(photo["path"]), photo["datetime"], location, "", "", "")
+        grid.insert("", "end", iid=iid, values=values)
+        grid_widths.add(iid, values)
+    grid_widths.apply()
+
+    # Editing controls apply to every selected row
+    edit_frame = ttk.Frame(popup)
+    edit_frame.pack(fill="x", padx=5, pady=5)
+
+    tk.Label(edit_frame, text="Species:").grid(row=0, column=0, sticky="w")
+    species_entry = ttk.Entry(edit_frame, width=30)
+    species_entry.grid(row=0, column=1, padx=5)
+    species_dropdown = tk.Listbox(popup, height=5)
+    species_suggestions = []
+
+    tk.Label(edit_frame, text="Location:").grid(row=0, column=2, sticky="w")
+    location_entry = ttk.Entry(edit_frame, width=30)
+    location_entry.grid(row=0, column=3, padx=5)
+
+    def selected_rows():
+        rows = grid.selection()
+        if not rows:
+            messagebox.showinfo("No Rows Selected", "Select the photos to change first.", parent=popup)
+        return rows
+
+    def show_species_suggestions(event):
+        """Suggest species by common name, the same lookup as the New Entry form."""
+        nonlocal species_suggestions
+        value = species_entry.get()
+        species_suggestions = db.species_suggestions("commonName", value) if value.strip() else []
+        if not species_suggestions:
+            species_dropdown.place_forget()
+            return
+        species_dropdown.delete(0, "end")
+        for suggestion in species_suggestions:
+            species_dropdown.insert("end", f"{suggestion[1]} ({suggestion[2]})")
+        x = edit_frame.winfo_x() + species_entry.winfo_x()
+        y = edit_frame.winfo_y() - species_dropdown.winfo_reqheight()
+        species_dropdown.place(x=x, y=y, width=species_entry.winfo_width())
+        species_dropdown.lift()
+
+    def on_species_select(event):
+        """Assign the chosen species to the selected rows."""
+        selected_index = species_dropdown.curselection()
+        if not selected_index:
+            return
+        species_id, common_name, scientific_name = species_suggestions[selected_index[0]]
+        species_dropdown.place_forget()
+        species_entry.delete(0, "end")
+        species_entry.insert(0, common_name)
+        for iid in selected_rows():
+            grid.set(iid, "Species ID", species_id)
+            grid.set(iid, "Common Name", common_name)
+            grid.set(iid, "Scientific Name", scientific_name)
+            grid_widths.add(iid, grid.item(iid, "values"))
+        grid_widths.apply()
+
+    species_entry.bind("<KeyRelease>", show_species_suggestions)
+    species_dropdown.bind("<<ListboxSelect>>", on_species_select)
+
+    def apply_location():
+        location_name = location_entry.get().strip()
+        if not location_name:
+            return
+        for iid in selected_rows():
+            grid.set(iid, "Location", location_name)
+            grid_widths.add(iid, grid.item(iid, "values"))
+        grid_widths.apply()
+
+    def remove_rows():
+        rows = selected_rows()
+        for iid in rows:
+            grid.delete(iid)
+            del photos[iid]
+        grid_widths.remove(rows)
+        grid_widths.apply()
+
+    ttk.Button(edit_frame, text="Apply Location", command=apply_location).grid(row=0, column=4, padx=5)
+    ttk.Button(edit_frame, text="Remove", command=remove_rows).grid(row=0, column=5, padx=5)
+    ttk.Button(edit_frame, text="Select All", command=lambda: grid.selection_set(grid.get_children())).grid(row=0, column=6, padx=5)
+
+    def commit():
+        catches = []
+        for iid in grid.get_children():
+            values = grid.set(iid)
+            if not values["Species ID"] or not values["Location"]:
+                grid.selection_set(iid)
+                grid.see(iid)
+                messagebox.showerror("Error", "Every photo needs a species and a location.", parent=popup)
+                return
+            photo = photos[iid]
+            catches.append({
+                "species_id": values["Species ID"],
+                "location_name": values["Location"],
+                "datetime": values["Datetime Caught"],
+                "photo_data": photo["data"],
+                "photo_renditions": photo["renditions"],
+                "coordinates": photo["gps"],  # Also places a renamed spot that has no position yet
+            })
+        if not catches:
+            return
+
+        try:
+            # One transaction for every catch; the views update from the change notifications
+            commit_photos(db, catches, stats)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to import photos: {e}", parent=popup)
+            return
+        popup.destroy()
+        messagebox.showinfo("Import Complete", throughput_report(stats))
+
+    button_frame = ttk.Frame(popup)
+    button_frame.pack(pady=10)
+    ttk.Button(button_frame, text="Commit", command=commit).pack(side="left", padx=5)
+    ttk.Button(button_frame, text="Cancel", command=popup.destroy).pack(side="left", padx=5)
+
+
+import_photos_button.config(command=import_photo_folder)
+
+
+# --- Export and Import ---
+def export_catches():
+    """Export the Catch Log to CSV or JSONL, or to a ZIP archive together with the photos."""
+    from fishdex_export import export_catch_log
+
+    path = filedialog.asksaveasfilename(
+        title="Export Catch Log",
+        defaultextension=".zip",
+        filetypes=[("ZIP archive with photos", "*.zip"), ("CSV", "*.csv"), ("JSON Lines", "*.jsonl")],
+    )
+    if not path:
+        return
+
+    def exported(stats):
+        messagebox.showinfo(
+            "Export Complete",
+            f"Exported {stats['catches']} catches and {stats['photos']} photos "
+            f"({stats['bytes'] / (1024 * 1024):.1f} MiB) in {stats['seconds']:.1f}s.",
+        )
+
+    run_with_progress(
+        "Export Catch Log",
+        lambda done, total: f"Exported {done}/{total}..." if total else "Exporting...",
+        lambda progress, cancelled: export_catch_log(db, path, None, progress, cancelled),
+        exported,
+        "Unable to export",
+    )
+
+
+# Skipped rows listed after an import; the rest are only counted
+IMPORT_REJECTED_SHOWN = 10
+
+
+def import_catches():
+    """Add the catches from a CSV, JSONL or ZIP export."""
+    from fishdex_export import import_catch_log
+
+    path = filedialog.askopenfilename(
+        title="Import Catch Log",
+        filetypes=[("FishDex exports", "*.zip;*.csv;*.jsonl"), ("All Files", "*.*")],
+    )
+    if not path:
+        return
+
+    def imported(stats):
+        load_tables()  # The import doesn't send per-catch change notifications
+        message = f"Imported {stats['catches']} catches with {stats['photos']} photos in {stats['seconds']:.1f}s."
+        if stats["rejected"]:
+            message += f"\n\nSkipped {len(stats['rejected'])} rows that can't be logged:"
+            for row_number, problem in stats["rejected"][:IMPORT_REJECTED_SHOWN]:
+                message += f"\nRow {row_number}: {problem}"
+            if len(stats["rejected"]) > IMPORT_REJECTED_SHOWN:
+                message += "\n..."
+        messagebox.showinfo("Import Complete", message)
+
+    def import_cancelled():
+        load_tables()
+        messagebox.showinfo("Import Cancelled", "Catches imported before cancelling were kept.")
+
+    run_with_progress(
+        "Import Catch Log",
+        lambda done, total: f"Imported {done} catches...",
+        lambda progress, cancelled: import_catch_log(db, path, progress, cancelled),
+        imported,
+        "Unable to import",
+        on_cancelled=import_cancelled,
+    )
+
+
+export_button.config(command=export_catches)
+import_catches_button.config(command=import_catches)
+
+
+def load_tables(on_loaded=None):
+    """Fetch the first Catch Log page and the Species rows in the background."""
+    pending = {"tables": 2}
+
+    def loaded():
+        pending["tables"] -= 1
+        if not pending["tables"] and on_loaded:
+            on_loaded()
+
+    refresh_catch_log(on_loaded=loaded)
+    refresh_species(on_loaded=loaded)
+
+
+def main(db_path=DB_PATH, report_startup=False, started=STARTED, trace_path=None):
+    """Show the window, open the database, and load the tables without blocking the first paint.
+
+    With ``report_startup`` the import, first paint, database open and table
+    load times since ``started`` are printed. With ``trace_path`` every timed
+    statement, UI callback and image operation is appended there as JSON lines.
+    """
+    global db, catch_log_queries, species_queries, catch_stats, reference_images
+    timings = {"import": time.perf_counter() - started}
+
+    # Paint the empty window before touching the database
+    root.update()
+    timings["first paint"] = time.perf_counter() - started
+
+    if trace_path:
+        metrics.open_trace(trace_path)
+    db = Database(db_path, timed=True)
+    db.subscribe(on_database_change)
+    catch_log_queries = LatestQuery(root, db)
+    species_queries = LatestQuery(root, db)
+    catch_stats = CatchStats(db)
+    reference_images = ReferenceImagePrefetcher(ReferenceImageCache(cache_dir_for(db_path)))
+    reference_images.start()
+    timings["database"] = time.perf_counter() - started
+
+    def tables_loaded():
+        timings["tables loaded"] = time.perf_counter() - started
+        if report_startup:
+            print("Startup: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()))
+        # Have the pictures of every caught species on disk before they're asked for
+        long_tasks.submit(db.reference_image_links, on_done=reference_images.prefetch)
+        # Load (or build) the fuzzy name index before the first suggestion needs it
+        long_tasks.submit(db.fuzzy_index, on_done=lambda index: None)
+
+    load_tables(tables_loaded)
+
+    root.mainloop()
+    catch_log_queries.shutdown()
+    species_queries.shutdown()
+    image_tasks.shutdown()
+    long_tasks.shutdown()
+    reference_images.stop()
+    db.close()
+    metrics.close_trace()
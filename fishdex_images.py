@@ -0,0 +1,207 @@
+import io
+import os
+import re
+import datetime
+from collections import OrderedDict
+
+from fishdex_metrics import metrics
+
+
+# Largest stored version of an uploaded photo, same limit upload_photo always used
+FULL_SIZE = (1000, 1000)
+
+# EXIF tags read for batch imports
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+TAG_DATETIME = 306
+TAG_DATETIME_ORIGINAL = 36867
+TAG_OFFSET_TIME_ORIGINAL = 36881  # UTC offset of DateTimeOriginal, e.g. "+02:00" (EXIF 2.31)
+EXIF_DATETIME_FORMAT = "%Y:%m:%d %H:%M:%S"
+EXIF_OFFSET = re.compile(r"^[+-]\d\d:\d\d$")
+# Same format the New Entry form uses for datetimeCaught
+CATCH_DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# Smaller renditions generated at upload time, largest first
+RENDITION_SIZES = {
+    "preview": (640, 640),  # Shown in the photo viewer
+    "thumbnail": (128, 128),  # Shown in the Catch Log preview pane
+}
+
+
+def open_image(source, max_size=None):
+    """Open an image, letting the JPEG decoder downscale it while decoding.
+
+    With ``max_size`` set, JPEG draft mode decodes at the smallest 1/2, 1/4 or 1/8
+    scale that is still at least that big, which is much cheaper than decoding a
+    full camera image and resizing it afterwards. Other formats are unaffected.
+    """
+    from PIL import Image
+
+    image = Image.open(source)
+    if max_size is not None:
+        image.draft("RGB", max_size)
+    return image
+
+
+def _encode_jpeg(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")  # Save as JPEG to reduce size further
+    return buffer.getvalue()
+
+
+def make_renditions(image):
+    """Downscale an RGB image into every rendition.
+
+    Returns a dict of kind -> (jpeg bytes, width, height). Each rendition is made
+    from the previous, larger one, which is both faster and as sharp as resizing
+    the original each time.
+    """
+    from PIL import Image
+
+    renditions = {}
+    for kind, size in RENDITION_SIZES.items():
+        image = image.copy()
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        renditions[kind] = (_encode_jpeg(image), image.width, image.height)
+    return renditions
+
+
+@metrics.instrument("image")
+def encode_catch_photo(source):
+    """Prepare an uploaded photo for storage.
+
+    ``source`` is a path or file object. Returns ``(data, renditions)`` where
+    ``data`` is the full-size JPEG and ``renditions`` is the dict from make_renditions().
+    """
+    from PIL import Image
+
+    # Open the image, decoding large JPEGs at a reduced scale
+    image = open_image(source, FULL_SIZE)
+
+    # Convert RGBA (or palette, CMYK...) to RGB, JPEG only stores RGB and greyscale
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    # Resize while preserving aspect ratio
+    image.thumbnail(FULL_SIZE, Image.Resampling.LANCZOS)
+
+    return _encode_jpeg(image), make_renditions(image)
+
+
+@metrics.instrument("image")
+def renditions_from_jpeg(data):
+    """Build the renditions for an already stored photo (one saved before renditions existed)."""
+    image = open_image(io.BytesIO(data), RENDITION_SIZES["preview"])
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    return make_renditions(image)
+
+
+def _gps_degrees(dms, ref):
+    """Convert an EXIF (degrees, minutes, seconds) triple to signed decimal degrees."""
+    degrees, minutes, seconds = (float(value) for value in dms)
+    value = degrees + minutes / 60 + seconds / 3600
+    return -value if ref in ("S", "W") else value
+
+
+def read_exif(path):
+    """Read the capture time and GPS position of a photo.
+
+    Returns ``(datetime_caught, gps)``. ``datetime_caught`` is formatted like the
+    New Entry form, followed by the camera's UTC offset when the photo records
+    one, and falls back to the file's modification time when the photo has no
+    usable EXIF date. ``gps`` is ``(latitude, longitude)`` or None.
+    """
+    from PIL import Image
+
+    with Image.open(path) as image:
+        exif = image.getexif()
+        # DateTimeOriginal is when the shutter fired, DateTime may be a later edit
+        exif_ifd = exif.get_ifd(EXIF_IFD)
+        taken = exif_ifd.get(TAG_DATETIME_ORIGINAL) or exif.get(TAG_DATETIME)
+        offset = str(exif_ifd.get(TAG_OFFSET_TIME_ORIGINAL, "")).strip("\x00 ")
+        gps_info = exif.get_ifd(GPS_IFD)
+
+    try:
+        caught = datetime.datetime.strptime(str(taken).strip("\x00 "), EXIF_DATETIME_FORMAT)
+    except ValueError:
+        caught = datetime.datetime.fromtimestamp(os.path.getmtime(path))
+        offset = ""
+
+    gps = None
+    try:
+        if gps_info.get(2) and gps_info.get(4):
+            gps = (_gps_degrees(gps_info[2], gps_info.get(1)), _gps_degrees(gps_info[4], gps_info.get(3)))
+    except (TypeError, ValueError, ZeroDivisionError):
+        pass  # Malformed GPS block, treat as missing
+    if gps is not None and not (-90 <= gps[0] <= 90 and -180 <= gps[1] <= 180):
+        gps = None  # Not a position on Earth
+
+    if not EXIF_OFFSET.match(offset):
+        offset = ""  # Stored as local time on this computer
+    return caught.strftime(CATCH_DATETIME_FORMAT) + offset, gps
+
+
+def prepare_catch_photo(path):
+    """Read the metadata of one photo and encode it for storage (runs in a worker process).
+
+    Returns a dict with ``path``, ``datetime``, ``gps``, ``data``, ``renditions``
+    and ``source_bytes``, the size of the original file.
+    """
+    datetime_caught, gps = read_exif(path)
+    data, renditions = encode_catch_photo(path)
+    return {
+        "path": path,
+        "datetime": datetime_caught,
+        "gps": gps,
+        "data": data,
+        "renditions": renditions,
+        "source_bytes": os.path.getsize(path),
+    }
+
+
+class ImageCache:
+    """LRU cache of decoded ImageTk.PhotoImage objects, capped by their decoded size in bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (photo image, bytes)
+
+    @staticmethod
+    def image_bytes(photo_image):
+        # Tk keeps the decoded pixels as 32-bit RGBA
+        return photo_image.width() * photo_image.height() * 4
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, photo_image):
+        nbytes = self.image_bytes(photo_image)
+        if nbytes > self.max_bytes:
+            return  # Would evict everything else for a single image
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        self._entries[key] = (photo_image, nbytes)
+        self.size += nbytes
+
+        # Evict the least recently used images until we're back under the cap
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
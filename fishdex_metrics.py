@@ -0,0 +1,239 @@
+import re
+import json
+import time
+import sqlite3
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+
+# Samples kept per operation; older ones roll out of the histogram
+WINDOW = 1000
+
+# Histogram bucket upper bounds in milliseconds; slower samples go in the last bucket
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Statements whose timings are kept, slowest first
+MAX_STATEMENTS = 500
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """One-line form of a statement, used to group its executions."""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class Histogram:
+    """Rolling window of the last ``WINDOW`` durations of one operation."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0  # Every sample ever recorded, not just the window
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    def buckets(self):
+        """Sample counts in the window per BUCKETS_MS bucket, plus one for anything slower."""
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for seconds in self.samples:
+            ms = seconds * 1000
+            for index, bound in enumerate(BUCKETS_MS):
+                if ms <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class Metrics:
+    """Thread-safe timings of SQL statements, UI callbacks and image operations.
+
+    Every operation keeps a rolling Histogram in memory. SQL statements also
+    remember the parameters of their slowest execution so the plan can be
+    explained later. With a trace file open, every sample is also written as a
+    JSON line.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (category, name) -> Histogram
+        self._slowest_params = {}  # sql -> parameters of its slowest execution
+        self._trace = None
+
+    def record(self, category, name, seconds, params=None):
+        with self._lock:
+            histogram = self._histograms.get((category, name))
+            if histogram is None:
+                if category == "sql" and len(self._slowest_params) >= MAX_STATEMENTS:
+                    return  # Don't grow without bound on generated SQL
+                histogram = self._histograms[(category, name)] = Histogram()
+            if category == "sql" and seconds >= histogram.max:
+                self._slowest_params[name] = params
+            histogram.add(seconds)
+            if self._trace is not None:
+                self._trace.write(json.dumps({
+                    "time": time.time(), "category": category, "name": name, "ms": round(seconds * 1000, 3),
+                }) + "\n")
+
+    @contextmanager
+    def timed(self, category, name):
+        """Record how long the block takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(category, name, time.perf_counter() - start)
+
+    def instrument(self, category, name=None):
+        """Decorator recording every call of a function under its name."""
+        def decorate(fn):
+            label = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(category, label, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def summaries(self, category=None):
+        """(category, name, summary) for every operation, slowest p95 first."""
+        with self._lock:
+            rows = [
+                (cat, name, histogram.summary())
+                for (cat, name), histogram in self._histograms.items()
+                if category is None or cat == category
+            ]
+        rows.sort(key=lambda row: row[2]["p95_ms"], reverse=True)
+        return rows
+
+    def histogram(self, category, name):
+        with self._lock:
+            return self._histograms.get((category, name))
+
+    def slowest_params(self, sql):
+        with self._lock:
+            return self._slowest_params.get(sql)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._slowest_params.clear()
+
+    def open_trace(self, path):
+        """Append every following sample to a JSON-lines file."""
+        trace = open(path, "a", encoding="utf-8")
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+            self._trace = trace
+
+    def close_trace(self):
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+
+
+# Shared by the data layer, the image helpers and the GUI
+metrics = Metrics()
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records each statement's execute and fetch time in ``metrics``.
+
+    The fetches that follow an execute are added to the same sample, which is
+    recorded once the rows are fetched, the cursor is reused or it is closed.
+    Rows read by iterating over the cursor are not timed.
+    """
+
+    _pending = None  # [sql, params, seconds] of the statement being fetched
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, parameters, time.perf_counter() - start]
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record("sql", normalize_sql(sql), time.perf_counter() - start)
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._pending is not None:
+                self._pending[2] += time.perf_counter() - start
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(super().fetchmany, *args)
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, params, seconds = pending
+            if sql.lstrip()[:7].upper() == "EXPLAIN":
+                return  # Diagnostics looking at a plan, not the app's own work
+            metrics.record("sql", normalize_sql(sql), seconds, params)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose statements, including Connection.execute(), go through TimedCursor."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,331 @@
+import io
+import os
+import time
+import asyncio
+import hashlib
+import argparse
+import threading
+import itertools
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fishdex_images import RENDITION_SIZES, make_renditions, open_image
+from fishdex_metrics import metrics
+
+
+# Disk space the cached pictures may use before the least recently used are removed
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# Downloads in flight at once
+DEFAULT_CONCURRENCY = 8
+
+# Seconds before a download gives up, and the largest picture accepted
+FETCH_TIMEOUT = 20
+MAX_DOWNLOAD_BYTES = 10 * 1024 * 1024
+
+USER_AGENT = "FishDex reference image prefetcher"
+
+# Queue priorities: pictures the UI is waiting for go before bulk prefetching
+URGENT = 0
+BACKGROUND = 1
+
+
+def cache_dir_for(db_path):
+    """Directory the reference pictures of a database are cached in, next to the database file."""
+    return os.path.splitext(os.path.abspath(db_path))[0] + "-images"
+
+
+def download(url, timeout=FETCH_TIMEOUT):
+    """Fetch a picture over HTTP(S), refusing anything larger than MAX_DOWNLOAD_BYTES."""
+    if not url.lower().startswith(("http://", "https://")):
+        raise ValueError(f"Not an HTTP link: {url}")
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read(MAX_DOWNLOAD_BYTES + 1)
+    if len(data) > MAX_DOWNLOAD_BYTES:
+        raise ValueError(f"{url} is larger than {MAX_DOWNLOAD_BYTES // (1024 * 1024)} MiB")
+    return data
+
+
+@metrics.instrument("image")
+def fetch_reference_image(url):
+    """Download a reference picture and return its renditions, as make_renditions() does."""
+    data = download(url)
+    image = open_image(io.BytesIO(data), RENDITION_SIZES["preview"])
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image.thumbnail(RENDITION_SIZES["preview"])
+    return make_renditions(image)
+
+
+class ReferenceImageCache:
+    """Size-capped LRU cache of reference pictures on disk.
+
+    Each picture is stored as one JPEG per rendition, named by a hash of its
+    link. The recency order lives in memory and is rebuilt from the files'
+    modification times, which are bumped on every hit, so it survives restarts.
+    Lookups never touch the network.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> bytes on disk, least recently used first
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+    def _file(self, key, kind):
+        return os.path.join(self.directory, f"{key}.{kind}.jpg")
+
+    def _load(self):
+        entries = {}  # key -> [bytes, latest mtime, renditions found]
+        for entry in os.scandir(self.directory):
+            parts = entry.name.split(".")
+            if len(parts) != 3 or parts[1] not in RENDITION_SIZES or parts[2] != "jpg":
+                if entry.name.endswith(".tmp"):
+                    os.remove(entry.path)  # Left behind by an interrupted write
+                continue
+            stat = entry.stat()
+            found = entries.setdefault(parts[0], [0, 0.0, 0])
+            found[0] += stat.st_size
+            found[1] = max(found[1], stat.st_mtime)
+            found[2] += 1
+        for key, (nbytes, _, renditions) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if renditions < len(RENDITION_SIZES):
+                self._remove(key)  # Incomplete, fetch it again when it's needed
+                continue
+            self._entries[key] = nbytes
+            self.size += nbytes
+        with self._lock:
+            self._evict()
+
+    def _remove(self, key):
+        for kind in RENDITION_SIZES:
+            try:
+                os.remove(self._file(key, kind))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            key, nbytes = self._entries.popitem(last=False)
+            self.size -= nbytes
+            self._remove(key)
+
+    def __contains__(self, url):
+        with self._lock:
+            return self.key(url) in self._entries
+
+    def path(self, url, kind="thumbnail"):
+        """Return the file of a cached rendition and mark it recently used, or None if it isn't cached."""
+        key = self.key(url)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self._file(key, kind)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None  # Removed behind our back
+        return path
+
+    def store(self, url, renditions):
+        """Write every rendition of a picture, then remove the least recently used pictures over the cap."""
+        key = self.key(url)
+        nbytes = 0
+        for kind in RENDITION_SIZES:
+            data = renditions[kind][0]
+            path = self._file(key, kind)
+            with open(path + ".tmp", "wb") as file:
+                file.write(data)
+            os.replace(path + ".tmp", path)
+            nbytes += len(data)
+        with self._lock:
+            self.size += nbytes - self._entries.pop(key, 0)
+            self._entries[key] = nbytes
+            self._evict()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class ReferenceImagePrefetcher:
+    """Downloads reference pictures into a ReferenceImageCache on a background asyncio loop.
+
+    At most ``concurrency`` downloads run at once, on as many threads, and each
+    link is fetched once however often it is asked for. Pictures the UI asks for
+    with lookup() or get() jump the queue ahead of prefetch(). A link that fails
+    is not tried again until the prefetcher is restarted. ``fetch(url)`` returns
+    the renditions to store; pass another one to test against a stand-in server.
+    """
+
+    def __init__(self, cache, concurrency=DEFAULT_CONCURRENCY, fetch=fetch_reference_image):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.fetch = fetch
+        self.stats = {"fetched": 0, "failed": 0, "seconds": 0.0}
+        self._loop = None
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fishdex-refimage")
+        self._order = itertools.count()  # Keeps the queue first-in first-out within a priority
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="fishdex-refimages", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.PriorityQueue()
+        self._futures = {}  # url -> future of its download
+        self._started = set()  # Links a worker has taken up
+        self._workers = [self._loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        ready.set()
+        self._loop.run_forever()
+        for worker in self._workers:
+            worker.cancel()
+        self._loop.run_until_complete(asyncio.gather(*self._workers, return_exceptions=True))
+        self._loop.close()
+
+    def stop(self):
+        """Stop the loop; downloads in progress finish on their threads but are not stored."""
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- On the loop ---
+    def _request(self, url, priority):
+        future = self._futures.get(url)
+        if future is not None and (not future.done() or future.exception() is not None or url in self.cache):
+            if not future.done() and priority == URGENT:
+                self._queue.put_nowait((priority, next(self._order), url))  # Move it up the queue
+            return future
+        future = self._futures[url] = self._loop.create_future()
+        if url in self.cache:
+            future.set_result(None)
+        else:
+            self._queue.put_nowait((priority, next(self._order), url))
+        return future
+
+    def _request_all(self, urls, priority):
+        for url in urls:
+            self._request(url, priority)
+
+    async def _wait_for(self, url):
+        await asyncio.shield(self._request(url, URGENT))
+
+    async def _worker(self):
+        while True:
+            _, _, url = await self._queue.get()
+            try:
+                future = self._futures[url]
+                if future.done() or url in self._started:
+                    continue  # A duplicate entry of a link that was moved up the queue
+                self._started.add(url)
+                start = time.perf_counter()
+                try:
+                    renditions = await self._loop.run_in_executor(self._executor, self.fetch, url)
+                    await self._loop.run_in_executor(self._executor, self.cache.store, url, renditions)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    future.set_exception(e)
+                    future.exception()  # Only the callers waiting on it need to see the error
+                else:
+                    self.stats["fetched"] += 1
+                    future.set_result(None)
+                self._started.discard(url)
+                self.stats["seconds"] += time.perf_counter() - start
+            finally:
+                self._queue.task_done()
+
+    async def _join(self):
+        await self._queue.join()
+
+    # --- From any thread ---
+    def lookup(self, url, kind="thumbnail"):
+        """Return the cached file of a picture without blocking, or None and fetch it ahead of prefetches."""
+        path = self.cache.path(url, kind)
+        if path is None:
+            self._loop.call_soon_threadsafe(self._request, url, URGENT)
+        return path
+
+    def request(self, url):
+        """Fetch a picture ahead of prefetches without blocking.
+
+        Returns a concurrent.futures.Future that completes once the picture is
+        cached, or with the error if the download failed. Cancelling it leaves
+        the download running for the next caller.
+        """
+        return asyncio.run_coroutine_threadsafe(self._wait_for(url), self._loop)
+
+    def get(self, url, kind="thumbnail", timeout=None):
+        """Return the cached file of a picture, waiting for it to be fetched; raises if the download failed.
+
+        This blocks, call it from a worker thread rather than the Tk thread.
+        """
+        path = self.cache.path(url, kind)
+        if path is None:
+            self.request(url).result(timeout)
+            path = self.cache.path(url, kind)
+        return path
+
+    def prefetch(self, urls):
+        """Queue pictures to fetch behind anything the UI asked for."""
+        self._loop.call_soon_threadsafe(self._request_all, list(urls), BACKGROUND)
+
+    def join(self, timeout=None):
+        """Block until every queued picture has been fetched or has failed."""
+        asyncio.run_coroutine_threadsafe(self._join(), self._loop).result(timeout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download reference species pictures into the offline cache.")
+    parser.add_argument("--db", default="fishdex.db", help="SQLite database file (default: fishdex.db)")
+    parser.add_argument("--cache", help="Cache directory (default: next to the database)")
+    parser.add_argument("--all", action="store_true", help="Every reference species, not only the ones caught")
+    parser.add_argument("--limit", type=int, help="Fetch at most this many pictures")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Downloads at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--max-mb", type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                        help=f"Cache size cap in MiB (default: {DEFAULT_CACHE_BYTES // (1024 * 1024)})")
+    args = parser.parse_args(argv)
+
+    from fishdex_db import Database
+
+    db = Database(args.db)
+    try:
+        urls = db.reference_image_links(caught_only=not args.all)
+    finally:
+        db.close()
+    if args.limit is not None:
+        urls = urls[:args.limit]
+
+    cache = ReferenceImageCache(args.cache or cache_dir_for(args.db), args.max_mb * 1024 * 1024)
+    cached = sum(url in cache for url in urls)
+    prefetcher = ReferenceImagePrefetcher(cache, args.concurrency)
+    prefetcher.start()
+    start = time.perf_counter()
+    try:
+        prefetcher.prefetch(urls)
+        prefetcher.join()
+    finally:
+        prefetcher.stop()
+    stats = prefetcher.stats
+    print(f"{len(urls)} pictures: {cached} already cached, {stats['fetched']} fetched, {stats['failed']} failed "
+          f"in {time.perf_counter() - start:.1f}s. Cache: {len(cache)} pictures, {cache.size / (1024 * 1024):.1f} MiB.")
+
+
+if __name__ == "__main__":
+    main()
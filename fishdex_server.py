@@ -0,0 +1,513 @@
+import io
+import json
+import time
+import base64
+import asyncio
+import argparse
+import binascii
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from fishdex_db import CATCH_LOG_SORT_KEYS, SPECIES_SORT_KEYS, Database, check_catch, date_prefix_range
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Reader threads, each with its own query-only connection
+DEFAULT_READERS = 4
+
+# Most catches committed in one transaction, and how long the writer waits for
+# more after the first one arrives. Writes that queue up while a transaction
+# is committing always go into the next one, so the wait can be zero.
+DEFAULT_MAX_BATCH = 200
+DEFAULT_BATCH_WINDOW_MS = 0
+
+# Largest request body, a catch with a full-size photo fits comfortably
+MAX_BODY = 16 * 1024 * 1024
+
+# Longest request or header line, and most headers per request
+MAX_LINE = 8192
+MAX_HEADERS = 100
+
+# Catch Log rows per page unless the client asks for fewer (or up to MAX_PAGE_SIZE)
+PAGE_SIZE = 200
+MAX_PAGE_SIZE = 500
+
+PHOTO_KINDS = ("thumbnail", "preview", "full")
+
+# Search radius of the nearby queries unless the client asks for another, and
+# the largest, half way round the Earth
+DEFAULT_RADIUS_KM = 10.0
+MAX_RADIUS_KM = 20000.0
+
+REASONS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """Ends a request with an error status and a JSON ``{"error": message}`` body."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class CatchWriter:
+    """Single writer task that commits queued catches in grouped transactions.
+
+    Every request adds its catch to one queue. The writer takes whatever has
+    queued up, up to ``max_batch`` catches, and stores them with one
+    Database.add_catches() call on its own thread, so many devices logging at
+    once cost one commit per batch instead of one each. If a batch fails its
+    catches are retried one by one, so a bad catch only fails its own request.
+    """
+
+    def __init__(self, db, max_batch=DEFAULT_MAX_BATCH, window_ms=DEFAULT_BATCH_WINDOW_MS):
+        self.db = db
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fishdex-writer")
+        self.stats = {"catches": 0, "batches": 0, "largest_batch": 0, "failed": 0, "commit_seconds": 0.0}
+
+    async def add(self, catch):
+        """Queue a catch dict for Database.add_catches() and return its new catch ID once committed."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((catch, future))
+        return await future
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            start = time.perf_counter()
+            try:
+                catch_ids = await loop.run_in_executor(self.executor, self.db.add_catches, [c for c, _ in batch])
+                results = list(zip(batch, catch_ids))
+            except Exception:
+                results = []
+                for catch, future in batch:
+                    try:
+                        catch_ids = await loop.run_in_executor(self.executor, self.db.add_catches, [catch])
+                        results.append(((catch, future), catch_ids[0]))
+                    except Exception as e:
+                        self.stats["failed"] += 1
+                        if not future.done():
+                            future.set_exception(e)
+            self.stats["commit_seconds"] += time.perf_counter() - start
+            self.stats["batches"] += 1
+            self.stats["catches"] += len(results)
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            for (_, future), catch_id in results:
+                if not future.done():  # The client may have gone away, the catch is stored anyway
+                    future.set_result(catch_id)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class FishDexServer:
+    """Local JSON API over a FishDex database, for logging catches from several devices.
+
+    Reads run concurrently on a pool of reader threads; writes go through one
+    CatchWriter. Catches are checked with the same rules as the New Entry form.
+    """
+
+    def __init__(self, db, readers=DEFAULT_READERS, max_batch=DEFAULT_MAX_BATCH, window_ms=DEFAULT_BATCH_WINDOW_MS):
+        self.db = db
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="fishdex-reader")
+        self.writer = CatchWriter(db, max_batch, window_ms)
+        self.requests = 0
+        self.started = time.time()
+        self.routes = {
+            ("GET", "health"): self.health,
+            ("GET", "stats"): self.server_stats,
+            ("GET", "catches"): self.catch_log,
+            ("POST", "catches"): self.add_catch,
+            ("GET", "species"): self.species,
+            ("GET", "suggest/species"): self.suggest_species,
+            ("GET", "suggest/locations"): self.suggest_locations,
+            ("GET", "locations/near"): self.locations_near,
+            ("GET", "catches/near"): self.catches_near,
+            ("GET", "species/near"): self.species_near,
+        }
+
+    async def read(self, fn, *args):
+        """Run a read on the reader pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.readers, fn, *args)
+
+    # --- Handlers, each returns (status, JSON value or (content type, bytes)) ---
+    async def health(self, query, body):
+        return 200, {"status": "ok"}
+
+    async def server_stats(self, query, body):
+        return 200, {**self.writer.stats, "requests": self.requests, "uptime_seconds": time.time() - self.started}
+
+    async def catch_log(self, query, body):
+        sort_column = _choice(query, "sort", CATCH_LOG_SORT_KEYS, "Catch ID")
+        descending = _flag(query, "desc", True)
+        limit = min(_int(query, "limit", PAGE_SIZE), MAX_PAGE_SIZE)
+        after = _key(query, "after")
+        before = _key(query, "before")
+        date_range = None
+        if "from" in query or "to" in query:
+            start = _date(query, "from", 0, 0)
+            end = _date(query, "to", 1, 1 << 62)
+            date_range = (start, end)
+
+        page = await self.read(
+            lambda: self.db.catch_log_page(
+                sort_column, descending, after, before, limit, query.get("search", ""), date_range
+            )
+        )
+        columns = ("catchID", "commonName", "scientificName", "datetimeCaught", "locationName")
+        return 200, {
+            "catches": [dict(zip(columns, values)) for _, values in page],
+            # Keys of the first and last row, for the before and after of the neighbouring pages
+            "first": list(page[0][0]) if page else None,
+            "last": list(page[-1][0]) if page else None,
+        }
+
+    async def species(self, query, body):
+        sort_column = _choice(query, "sort", SPECIES_SORT_KEYS, "Order Discovered")
+        descending = _flag(query, "desc", True)
+        rows = await self.read(self.db.species_rows, query.get("search", ""), sort_column, descending)
+        columns = (
+            "speciesID", "commonName", "scientificName", "quantityCaught", "orderDiscovered",
+            "firstCaughtDate", "firstLocation",
+        )
+        return 200, {"species": [dict(zip(columns, row)) for row in rows]}
+
+    async def suggest_species(self, query, body):
+        field = _choice(query, "field", ("commonName", "scientificName"), "commonName")
+        rows = await self.read(self.db.species_suggestions, field, query.get("q", ""))
+        return 200, {"species": [
+            {"speciesID": species_id, "commonName": common, "scientificName": scientific}
+            for species_id, common, scientific in rows
+        ]}
+
+    async def suggest_locations(self, query, body):
+        # Closest to the given position, or to the last spot fished
+        near = _position(query) if "lat" in query or "lon" in query else await self.read(self.db.last_spot)
+        return 200, {"locations": await self.read(self.db.location_suggestions, query.get("q", ""), near)}
+
+    async def locations_near(self, query, body):
+        latitude, longitude = _position(query)
+        rows = await self.read(self.db.nearby_locations, latitude, longitude, _radius(query))
+        return 200, {"locations": [
+            {"locationID": location_id, "locationName": name, "km": km} for location_id, name, km in rows
+        ]}
+
+    async def catches_near(self, query, body):
+        latitude, longitude = _position(query)
+        limit = min(_int(query, "limit", PAGE_SIZE), MAX_PAGE_SIZE)
+        rows = await self.read(self.db.catches_near, latitude, longitude, _radius(query), limit)
+        columns = ("catchID", "commonName", "scientificName", "datetimeCaught", "locationName", "km")
+        return 200, {"catches": [dict(zip(columns, row)) for row in rows]}
+
+    async def species_near(self, query, body):
+        location_name = query.get("location", "").strip()
+        if not location_name:
+            raise HTTPError(400, "location is required.")
+        try:
+            rows = await self.read(self.db.species_near, location_name, _radius(query))
+        except ValueError as e:
+            raise HTTPError(404, str(e))
+        columns = ("speciesID", "commonName", "scientificName", "catches", "km")
+        return 200, {"species": [dict(zip(columns, row)) for row in rows]}
+
+    async def add_catch(self, query, body):
+        try:
+            fields = json.loads(body)
+        except (UnicodeDecodeError, ValueError):
+            raise HTTPError(400, "The body must be a JSON object.")
+        if not isinstance(fields, dict):
+            raise HTTPError(400, "The body must be a JSON object.")
+
+        species_id = fields.get("species_id")
+        location_name = fields.get("location")
+        datetime_value = fields.get("datetime")
+        if not all(isinstance(value, (str, type(None))) for value in (location_name, datetime_value)) or (
+            species_id is not None and (not isinstance(species_id, int) or isinstance(species_id, bool))
+        ):
+            raise HTTPError(400, "species_id must be a number, location and datetime text.")
+        location_name = (location_name or "").strip()
+        problem = check_catch(species_id, location_name, datetime_value)
+        if problem is not None:
+            raise HTTPError(400, problem)
+        if await self.read(self.db.reference_species, species_id) is None:
+            raise HTTPError(400, f"Unknown species ID {species_id}.")
+
+        catch = {"species_id": species_id, "location_name": location_name, "datetime": datetime_value}
+        if fields.get("latitude") is not None or fields.get("longitude") is not None:
+            latitude, longitude = fields.get("latitude"), fields.get("longitude")
+            numbers = all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (latitude, longitude))
+            if not numbers or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                raise HTTPError(400, "latitude and longitude must be numbers within -90..90 and -180..180.")
+            catch["coordinates"] = (latitude, longitude)
+        if fields.get("photo"):
+            try:
+                upload = base64.b64decode(fields["photo"], validate=True)
+            except (TypeError, binascii.Error):
+                raise HTTPError(400, "photo must be base64 encoded image data.")
+            catch["photo_data"], catch["photo_renditions"] = await self.read(_encode_photo, upload)
+
+        catch_id = await self.writer.add(catch)
+        return 201, {"catchID": catch_id}
+
+    async def photo(self, catch_id, query):
+        kind = _choice(query, "kind", PHOTO_KINDS, "full")
+        data = await self.read(self._photo_bytes, catch_id, kind)
+        if data is None:
+            raise HTTPError(404, f"Catch {catch_id} has no photo.")
+        return 200, ("image/jpeg", data)
+
+    def _photo_bytes(self, catch_id, kind):
+        photo_id = self.db.catch_photo_id(catch_id)
+        if photo_id is None:
+            return None
+        # Photos stored before renditions existed fall back to the full size
+        blob = self.db.open_rendition(photo_id, kind) if kind != "full" else None
+        with blob or self.db.open_photo(photo_id) as file:
+            return file.read()
+
+    async def dispatch(self, method, path, query, body):
+        path = path.strip("/")
+        parts = path.split("/")
+        if len(parts) == 3 and parts[0] == "catches" and parts[2] == "photo" and parts[1].isdigit():
+            if method != "GET":
+                raise HTTPError(405, f"{method} is not allowed on /{path}.")
+            return await self.photo(int(parts[1]), query)
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(405, f"{method} is not allowed on /{path}.")
+            raise HTTPError(404, f"No such resource: /{path}.")
+        return await handler(query, body)
+
+    # --- HTTP/1.1 over asyncio streams ---
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as e:
+                    await _respond(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                self.requests += 1
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, content = await self.dispatch(method, path, query, body)
+                except HTTPError as e:
+                    status, content = e.status, {"error": e.message}
+                except Exception as e:
+                    status, content = 500, {"error": f"{type(e).__name__}: {e}"}
+                await _respond(writer, status, content, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # The client hung up
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """Serve until cancelled. ``ready(port)`` is called once the socket listens."""
+        writer_task = asyncio.create_task(self.writer.run())
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE)
+        try:
+            if ready:
+                ready(server.sockets[0].getsockname()[1])
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+    def close(self):
+        self.writer.close()
+        self.readers.shutdown()
+
+
+def _encode_photo(upload):
+    try:
+        from fishdex_images import encode_catch_photo
+        return encode_catch_photo(io.BytesIO(upload))
+    except ImportError:
+        raise HTTPError(400, "Photos can't be stored, Pillow is not installed on the server.")
+    except (OSError, ValueError):
+        raise HTTPError(400, "photo is not an image that can be read.")
+
+
+async def _read_request(reader):
+    """Read one request as (method, path, query dict, headers dict, body), or None at the end of the connection."""
+    try:
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+            raise HTTPError(400, "Malformed request line.")
+        method, target, _ = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n"):
+                break
+            if not line:
+                raise asyncio.IncompleteReadError(line, None)
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+            if len(headers) > MAX_HEADERS:
+                raise HTTPError(400, "Too many headers.")
+    except ValueError:  # A line longer than MAX_LINE
+        raise HTTPError(400, "Request line or header too long.")
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length.")
+    if length > MAX_BODY:
+        raise HTTPError(413, f"Request bodies are limited to {MAX_BODY // (1024 * 1024)} MiB.")
+    body = await reader.readexactly(length) if length > 0 else b""
+
+    url = urlsplit(target)
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    return method, unquote(url.path), query, headers, body
+
+
+async def _respond(writer, status, content, keep_alive):
+    if isinstance(content, tuple):
+        content_type, body = content
+    else:
+        content_type, body = "application/json", json.dumps(content).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+# --- Query string parameters ---
+def _choice(query, name, choices, default):
+    value = query.get(name, default)
+    if value not in choices:
+        raise HTTPError(400, f"{name} must be one of: {', '.join(choices)}.")
+    return value
+
+
+def _flag(query, name, default):
+    value = query.get(name)
+    if value is None:
+        return default
+    if value.lower() not in ("1", "0", "true", "false"):
+        raise HTTPError(400, f"{name} must be true or false.")
+    return value.lower() in ("1", "true")
+
+
+def _int(query, name, default):
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise HTTPError(400, f"{name} must be a positive whole number.")
+    return value
+
+
+def _float(query, name, default, low, high):
+    try:
+        value = float(query.get(name, default))
+    except (TypeError, ValueError):
+        value = None
+    if value is None or not low <= value <= high:
+        raise HTTPError(400, f"{name} must be a number from {low:g} to {high:g}.")
+    return value
+
+
+def _position(query):
+    """The (latitude, longitude) given as ``lat`` and ``lon``."""
+    return _float(query, "lat", None, -90, 90), _float(query, "lon", None, -180, 180)
+
+
+def _radius(query):
+    return _float(query, "km", DEFAULT_RADIUS_KM, 0, MAX_RADIUS_KM)
+
+
+def _key(query, name):
+    """A page key as returned in ``first`` or ``last``: [sort key, catch ID]."""
+    if name not in query:
+        return None
+    try:
+        key = json.loads(query[name])
+    except ValueError:
+        key = None
+    if not (isinstance(key, list) and len(key) == 2 and isinstance(key[1], int)):
+        raise HTTPError(400, f"{name} must be the first or last key of a page, like [\"Lake\", 12].")
+    return tuple(key)
+
+
+def _date(query, name, end, default):
+    """Wall-clock seconds where a from/to date starts (``end`` 0) or, for the whole date, ends (``end`` 1)."""
+    if name not in query:
+        return default
+    bounds = date_prefix_range(query[name].strip())
+    if bounds is None:
+        raise HTTPError(400, f"{name} must be a date such as 2024-07 or 2024-07-01.")
+    return bounds[end] if bounds[end] is not None else default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a FishDex database as a local JSON API for several devices.")
+    parser.add_argument("--db", default="fishdex.db", help="SQLite database file (default: fishdex.db)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST}, use 0.0.0.0 for the local network)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on, 0 picks a free one (default: {DEFAULT_PORT})")
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS, help=f"Reader threads (default: {DEFAULT_READERS})")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help=f"Most catches per write transaction (default: {DEFAULT_MAX_BATCH})")
+    parser.add_argument("--batch-window-ms", type=float, default=DEFAULT_BATCH_WINDOW_MS,
+                        help=f"Milliseconds the writer waits for more catches before committing (default: {DEFAULT_BATCH_WINDOW_MS})")
+    args = parser.parse_args(argv)
+
+    db = Database(args.db)
+    server = FishDexServer(db, args.readers, args.max_batch, args.batch_window_ms)
+
+    def ready(port):
+        print(f"Serving {args.db} on http://{args.host}:{port}", flush=True)
+
+    try:
+        asyncio.run(server.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+import queue
+import sqlite3
+import threading
+import tkinter.font as tkFont
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def report_error(widget, error):
+    """Hand an exception to Tk's error reporting, as an exception in a Tk callback would be."""
+    widget._root().report_callback_exception(type(error), error, error.__traceback__)
+
+
+class ColumnWidths:
+    """Size Treeview columns to their widest value without rescanning the table.
+
+    Each distinct string is measured once and the pixel widths of every tracked
+    row are counted per column, so adding or removing rows only touches those
+    rows and the column maximum is found from the counts. Past ``max_rows``
+    tracked rows only every ``stride``-th new row is measured, and no column is
+    made wider than ``max_width``.
+    """
+
+    # Distinct strings whose measured width is remembered
+    MEASURE_CACHE_SIZE = 20000
+
+    def __init__(self, treeview, font=None, padding=0, max_width=400, max_rows=2000, stride=10):
+        self.treeview = treeview
+        self.font = font or tkFont.Font()  # Default font for Treeview
+        self.padding = padding
+        self.max_width = max_width
+        self.max_rows = max_rows
+        self.stride = stride
+        self.columns = tuple(treeview["columns"])
+        self._measured = {}  # string -> pixel width
+        self._rows = {}  # item id -> tuple of pixel widths
+        self._counts = {col: Counter() for col in self.columns}  # col -> width -> rows that wide
+        self._headers = {col: self.measure(col) for col in self.columns}  # Header width is the minimum
+        self._applied = {}  # col -> width last set on the widget
+        self._skipped = 0
+
+    def measure(self, text):
+        text = str(text)
+        width = self._measured.get(text)
+        if width is None:
+            if len(self._measured) >= self.MEASURE_CACHE_SIZE:
+                self._measured.clear()
+            width = self._measured[text] = self.font.measure(text)
+        return width
+
+    def add(self, iid, values):
+        """Track a row that was inserted (or whose values changed)."""
+        if iid in self._rows:
+            self.remove((iid,))
+        elif len(self._rows) >= self.max_rows:
+            # Huge table: sample new rows instead of measuring all of them
+            self._skipped += 1
+            if self._skipped % self.stride:
+                return
+        widths = tuple(self.measure(value) for value in values)
+        self._rows[iid] = widths
+        for col, width in zip(self.columns, widths):
+            self._counts[col][width] += 1
+
+    def remove(self, iids):
+        """Stop tracking rows that were deleted from the Treeview."""
+        for iid in iids:
+            widths = self._rows.pop(iid, None)
+            if widths is None:
+                continue
+            for col, width in zip(self.columns, widths):
+                counts = self._counts[col]
+                counts[width] -= 1
+                if not counts[width]:
+                    del counts[width]
+
+    def clear(self):
+        """Forget every row, before the Treeview is reloaded."""
+        self._rows.clear()
+        for counts in self._counts.values():
+            counts.clear()
+        self._skipped = 0
+
+    def apply(self):
+        """Set every column to its widest tracked value, only touching columns that changed."""
+        for col in self.columns:
+            counts = self._counts[col]
+            width = max(self._headers[col], max(counts) if counts else 0) + self.padding
+            width = min(width, self.max_width)
+            if self._applied.get(col) != width:
+                self.treeview.column(col, width=width)
+                self._applied[col] = width
+
+
+class VirtualTreeview:
+    """Show a large, keyset-paginated result set in a ttk.Treeview.
+
+    Only a sliding window of ``max_pages`` pages is kept in the widget. When the
+    view scrolls near the bottom the next page is fetched after the last loaded
+    key and the top page is dropped; scrolling near the top fetches the previous
+    page before the first loaded key. Memory and refresh time therefore depend on
+    the window size, not on the size of the table.
+
+    ``fetch_page(after=None, before=None, limit=...)`` must return a list of
+    ``(key, values)`` pairs in display order; ``values[0]`` is used as the item id.
+    With ``column_widths`` (a ColumnWidths) the columns are resized as rows come and go.
+    """
+
+    # Fraction of the loaded window from an edge at which the next page is fetched
+    PREFETCH_THRESHOLD = 0.15
+
+    def __init__(self, treeview, scrollbar, fetch_page, page_size=200, max_pages=3, on_load=None, column_widths=None):
+        self.treeview = treeview
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.on_load = on_load  # Called after rows are added or removed
+        self.column_widths = column_widths
+        self.pages = deque()  # Each page is a list of (key, item id)
+        self.at_start = True  # Nothing before the first loaded page
+        self.at_end = True  # Nothing after the last loaded page
+        self._loading = False
+
+        treeview.configure(yscrollcommand=self._on_yscroll)
+
+    def refresh(self, first_page=None):
+        """Drop every loaded row and load the first page again.
+
+        ``first_page`` can be passed when it was already fetched in the background.
+        """
+        self.treeview.delete(*self.treeview.get_children())
+        self.pages.clear()
+        if self.column_widths:
+            self.column_widths.clear()
+        self.at_start = True
+        self.at_end = False
+        self._load_next(first_page)
+        if self.column_widths:
+            self.column_widths.apply()  # Shrink back even when nothing was loaded
+        self.treeview.yview_moveto(0)
+
+    def insert_row(self, key, values, descending):
+        """Insert one new row at its sorted position, if that position is inside the loaded window.
+
+        Rows that sort outside the window are left to be fetched when scrolled to.
+        """
+        iid = str(values[0])
+        if self.treeview.exists(iid):
+            self.treeview.item(iid, values=values)
+            self._track(iid, values)
+            return
+
+        def sorts_before(a, b):
+            return a > b if descending else a < b
+
+        if not self.pages:
+            if self.at_start and self.at_end:
+                self.treeview.insert("", "end", iid=iid, values=values)
+                self.pages.append([(key, iid)])
+                self._track(iid, values)
+            return
+
+        if sorts_before(key, self.pages[0][0][0]) and not self.at_start:
+            return  # Belongs above the loaded window
+        if sorts_before(self.pages[-1][-1][0], key) and not self.at_end:
+            return  # Belongs below the loaded window
+
+        # Find the first loaded row the new one sorts before
+        index = 0
+        for page in self.pages:
+            for position, (row_key, _) in enumerate(page):
+                if sorts_before(key, row_key):
+                    page.insert(position, (key, iid))
+                    self.treeview.insert("", index, iid=iid, values=values)
+                    self._track(iid, values)
+                    return
+                index += 1
+
+        self.pages[-1].append((key, iid))
+        self.treeview.insert("", "end", iid=iid, values=values)
+        self._track(iid, values)
+
+    def _track(self, iid, values):
+        # Resize the columns for a single inserted or updated row
+        if self.column_widths:
+            self.column_widths.add(iid, values)
+            self.column_widths.apply()
+
+    def _insert_page(self, rows, index):
+        page = []
+        for key, values in rows:
+            iid = str(values[0])
+            self.treeview.insert("", index, iid=iid, values=values)
+            if index != "end":
+                index += 1
+            page.append((key, iid))
+            if self.column_widths:
+                self.column_widths.add(iid, values)
+        return page
+
+    def _drop_page(self, page):
+        iids = [iid for _, iid in page]
+        self.treeview.delete(*iids)
+        if self.column_widths:
+            self.column_widths.remove(iids)
+
+    def _load_next(self, rows=None):
+        if rows is None:
+            after = self.pages[-1][-1][0] if self.pages else None
+            rows = self.fetch_page(after=after, limit=self.page_size)
+        if len(rows) < self.page_size:
+            self.at_end = True
+        if not rows:
+            return
+        self.pages.append(self._insert_page(rows, "end"))
+
+        if len(self.pages) > self.max_pages:
+            # Trim the top page and keep the same rows on screen
+            dropped = self.pages.popleft()
+            self._drop_page(dropped)
+            self.at_start = False
+            self.treeview.yview_scroll(-len(dropped), "units")
+
+        self._loaded()
+
+    def _loaded(self):
+        if self.column_widths:
+            self.column_widths.apply()
+        if self.on_load:
+            self.on_load()
+
+    def _load_previous(self):
+        before = self.pages[0][0][0]
+        rows = self.fetch_page(before=before, limit=self.page_size)
+        if len(rows) < self.page_size:
+            self.at_start = True
+        if not rows:
+            return
+        self.pages.appendleft(self._insert_page(rows, 0))
+        # Keep the same rows on screen now that rows were added above them
+        self.treeview.yview_scroll(len(rows), "units")
+
+        if len(self.pages) > self.max_pages:
+            self._drop_page(self.pages.pop())
+            self.at_end = False
+
+        self._loaded()
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading or not self.pages:
+            return
+        first, last = float(first), float(last)
+        if last >= 1 - self.PREFETCH_THRESHOLD and not self.at_end:
+            self._schedule(self._load_next)
+        elif first <= self.PREFETCH_THRESHOLD and not self.at_start:
+            self._schedule(self._load_previous)
+
+    def _schedule(self, load):
+        # Load outside the scroll callback so Tk finishes the current redraw first
+        self._loading = True
+
+        def run():
+            try:
+                load()
+            finally:
+                self._loading = False
+
+        self.treeview.after_idle(run)
+
+
+class Debouncer:
+    """Delay a callback until input has been quiet for ``delay_ms``.
+
+    Every call restarts the timer, so a burst of key releases runs the callback
+    once with the arguments of the last call.
+    """
+
+    def __init__(self, widget, delay_ms, callback):
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.callback = callback
+        self._after_id = None
+
+    def __call__(self, *args):
+        self.cancel()
+        self._after_id = self.widget.after(self.delay_ms, self._fire, *args)
+
+    def cancel(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _fire(self, *args):
+        self._after_id = None
+        self.callback(*args)
+
+
+class LatestQuery:
+    """Run database reads on a background thread and hand only the newest result back to Tk.
+
+    Submitting a new query supersedes the previous one: if it is still running
+    on SQLite it is interrupted, and if it already finished its result is dropped.
+    Callbacks always run on the Tk thread.
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, widget, db):
+        self.widget = widget
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fishdex-query")
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending = 0
+        self._running_thread = None
+        self._polling = False
+
+    def submit(self, query, callback):
+        """Run ``query()`` in the background and call ``callback(result)`` on the Tk thread."""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._pending += 1
+            running = self._running_thread
+
+        # Cancel the query that is still running, its result would be discarded anyway
+        if running is not None:
+            self.db.interrupt_reader(running)
+
+        self._executor.submit(self._run, generation, query, callback)
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.POLL_MS, self._poll)
+
+    def _run(self, generation, query, callback):
+        try:
+            if generation != self._generation:
+                return  # Superseded before it started
+            with self._lock:
+                self._running_thread = threading.get_ident()
+            try:
+                result = query()
+            except sqlite3.OperationalError as e:
+                if generation != self._generation:
+                    return  # Interrupted on purpose
+                if "interrupted" not in str(e):
+                    raise
+                # The interrupt meant for the previous query landed on this one
+                result = query()
+            self._results.put((generation, callback, result))
+        except Exception as e:
+            self._results.put((generation, callback, e))
+        finally:
+            with self._lock:
+                self._running_thread = None
+                self._pending -= 1
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    generation, callback, result = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if generation != self._generation:
+                    continue  # A newer query has been submitted since
+                try:
+                    if isinstance(result, Exception):
+                        raise result
+                    callback(result)
+                except Exception as e:
+                    report_error(self.widget, e)  # Later results still get delivered
+        finally:
+            if self._pending or not self._results.empty():
+                self.widget.after(self.POLL_MS, self._poll)
+            else:
+                self._polling = False
+
+    def shutdown(self):
+        """Drop pending work and stop the background thread."""
+        self._generation += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def job_callbacks(window, state, on_done, on_error, on_cancelled=None):
+    """Return the (on_done, on_error) pair of a cancellable job shown in ``window``.
+
+    Each closes the window, then passes the result to ``on_done`` or the
+    exception to ``on_error``, or calls ``on_cancelled()`` instead if
+    ``state["cancelled"]`` was set. The flag is read before the window is
+    destroyed, so nothing run by its destruction can discard a finished job.
+    """
+    def finished(result):
+        cancelled = state["cancelled"]
+        window.destroy()
+        if not cancelled:
+            on_done(result)
+        elif on_cancelled:
+            on_cancelled()
+
+    def failed(error):
+        cancelled = state["cancelled"]
+        window.destroy()
+        if not cancelled:
+            on_error(error)
+        elif on_cancelled:
+            on_cancelled()
+
+    return finished, failed
+
+
+class TaskHandle:
+    """A submitted background task that can be cancelled from the Tk thread."""
+
+    def __init__(self, future):
+        self.future = future
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the task if it hasn't started, and drop its result if it has."""
+        self.cancelled = True
+        self.future.cancel()
+
+    def done(self):
+        return self.cancelled or self.future.done()
+
+
+class BackgroundTasks:
+    """Run blocking work, like Pillow decoding and encoding, on a thread pool.
+
+    Results are handed back to the Tk thread through ``after()`` polling, so
+    ``on_done`` and ``on_error`` may touch widgets. Pillow releases the GIL while
+    it decodes, resizes and encodes, so the pool also spreads work across cores.
+    """
+
+    POLL_MS = 20
+
+    def __init__(self, widget, max_workers=4):
+        self.widget = widget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fishdex-task")
+        self._results = queue.Queue()
+        self._handles = set()  # Tasks that haven't reported back yet
+        self._polling = False
+
+    def submit(self, fn, *args, on_done, on_error=None):
+        """Run ``fn(*args)`` in the background; returns a TaskHandle."""
+        handle = TaskHandle(None)
+
+        def run():
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self._results.put((handle, on_error, e))
+            else:
+                self._results.put((handle, on_done, result))
+
+        self._handles.add(handle)
+        handle.future = self._executor.submit(run)
+        self._start_polling()
+        return handle
+
+    def watch(self, future, on_done, on_error=None):
+        """Call ``on_done(result)`` on the Tk thread once a concurrent.futures.Future completes.
+
+        Nothing waits on the future, so no worker is tied up. Returns a TaskHandle.
+        """
+        handle = TaskHandle(future)
+
+        def finished(future):
+            if future.cancelled():
+                return  # Dropped by the next poll
+            error = future.exception()
+            if error is not None:
+                self._results.put((handle, on_error, error))
+            else:
+                self._results.put((handle, on_done, future.result()))
+
+        self._handles.add(handle)
+        future.add_done_callback(finished)
+        self._start_polling()
+        return handle
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    handle, callback, result = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                self._handles.discard(handle)
+                if handle.cancelled:
+                    continue
+                try:
+                    if callback is not None:
+                        callback(result)
+                    elif isinstance(result, Exception):
+                        raise result
+                except Exception as e:
+                    report_error(self.widget, e)  # One failed task doesn't stop the others reporting back
+        finally:
+            # Tasks cancelled before they started never report back
+            self._handles = {handle for handle in self._handles if not handle.future.cancelled()}
+            if self._handles or not self._results.empty():
+                self.widget.after(self.POLL_MS, self._poll)
+            else:
+                self._polling = False
+
+    def shutdown(self):
+        """Drop queued work and stop the worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,40 +1,288 @@
-import sqlite3
+import sys
 import json
+import time
+import argparse
 
-# Load JSON data
-with open("fishBase.json", "r") as file:
-    fish_data = json.load(file)
-
-# Connect to the database
-conn = sqlite3.connect("fishdex.db")
-cursor = conn.cursor()
-
-# Create the ReferenceSpecies table
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS ReferenceSpecies (
-        ID INTEGER PRIMARY KEY,
-        scientificName TEXT NOT NULL,
-        commonName TEXT,
-        imageLink TEXT,
-        fishLink TEXT
-    )
-""")
-
-# Insert data into the table
-for fish in fish_data:
-    # Check if the ID already exists
-    cursor.execute("SELECT ID FROM ReferenceSpecies WHERE ID = ?", (fish["ID"],))
-    if cursor.fetchone() is None:
-        # Insert only if the ID does not already exist
-        cursor.execute("""
-            INSERT INTO ReferenceSpecies (ID, scientificName, commonName, imageLink, fishLink)
-            VALUES (?, ?, ?, ?, ?)
-        """, (fish["ID"], fish["scientificName"], fish["commonName"], fish["imageLink"], fish["fishLink"]))
-    else:
-        print(f"Skipping duplicate ID: {fish['ID']}")
-
-# Commit and close
-conn.commit()
-conn.close()
-
-print("Data successfully imported into ReferenceSpecies table!")
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+    import tracemalloc
+
+from fishdex_db import (
+    connect,
+    migrate,
+    reference_hash,
+    create_reference_search_index,
+    drop_reference_search_triggers,
+    rebuild_reference_search_index,
+)
+
+
+DEFAULT_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 1 << 16
+
+INSERT_REFERENCE_SPECIES = """
+    INSERT OR IGNORE INTO ReferenceSpecies (ID, scientificName, commonName, imageLink, fishLink, contentHash)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# Delta sync statements; updates fire the search index trigger only for changed names
+SELECT_REFERENCE_HASHES = "SELECT ID, contentHash FROM ReferenceSpecies"
+UPDATE_REFERENCE_SPECIES = """
+    UPDATE ReferenceSpecies
+    SET scientificName = ?, commonName = ?, imageLink = ?, fishLink = ?, contentHash = ?
+    WHERE ID = ?
+"""
+# Species that were caught stay, the Catch Log and Species tab still show them
+DELETE_REFERENCE_SPECIES = """
+    DELETE FROM ReferenceSpecies
+    WHERE ID = ?1
+      AND NOT EXISTS (SELECT 1 FROM CatchLog WHERE speciesID = ?1)
+      AND NOT EXISTS (SELECT 1 FROM Species WHERE speciesID = ?1)
+"""
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array one at a time without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between elements
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos >= len(buffer) - 1 and not eof:
+            # Need more data before we can make progress
+            chunk = file.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        if pos >= len(buffer):
+            if started:
+                raise ValueError("Unexpected end of file: JSON array is not closed")
+            return
+
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array at the top level")
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            if end == len(buffer) and not eof:
+                # A bare number could continue in the next chunk
+                raise json.JSONDecodeError("Element may be truncated", buffer, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The element is split across chunks, read more and retry
+            chunk = file.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield item
+        pos = end
+
+
+def species_row(fish):
+    """ReferenceSpecies column values of a fish record, ending with its content hash."""
+    values = (fish["scientificName"], fish.get("commonName"), fish.get("imageLink"), fish.get("fishLink"))
+    return (fish["ID"], *values, reference_hash(*values))
+
+
+def iter_batches(fish_iter, batch_size):
+    """Group fish records into lists of insert parameters."""
+    batch = []
+    for fish in fish_iter:
+        batch.append(species_row(fish))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def peak_memory_bytes():
+    """Return the peak memory used by this process (or by Python allocations when rusage is unavailable)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS reports bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    return tracemalloc.get_traced_memory()[1]
+
+
+def import_reference_species(json_path="fishBase.json", db_path="fishdex.db", batch_size=DEFAULT_BATCH_SIZE):
+    """Stream a FishBase JSON dump into ReferenceSpecies in batched transactions.
+
+    Returns a dict with the number of rows read, inserted and skipped, the elapsed
+    time, rows per second and peak memory in bytes.
+    """
+    if resource is None:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    read = inserted = 0
+
+    conn = connect(db_path)  # Autocommit mode, transactions are managed explicitly below
+    try:
+        migrate(conn)
+        drop_reference_search_triggers(conn)
+
+        try:
+            with open(json_path, "r", encoding="utf-8") as file:
+                for batch in iter_batches(iter_json_array(file), batch_size):
+                    conn.execute("BEGIN")
+                    try:
+                        before = conn.total_changes
+                        conn.executemany(INSERT_REFERENCE_SPECIES, batch)
+                        inserted += conn.total_changes - before
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                    read += len(batch)
+        finally:
+            # Rebuild the name index once instead of maintaining it per row during the load.
+            # This runs after a failed batch too, so the batches already committed are
+            # indexed and the triggers are back for later edits.
+            conn.execute("BEGIN")
+            try:
+                if not create_reference_search_index(conn):
+                    rebuild_reference_search_index(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "read": read,
+        "inserted": inserted,
+        "skipped": read - inserted,  # Duplicate IDs are ignored by the database
+        "seconds": elapsed,
+        "rows_per_second": read / elapsed if elapsed > 0 else 0.0,
+        "peak_memory": peak_memory_bytes(),
+    }
+
+    if resource is None:
+        tracemalloc.stop()
+    return stats
+
+
+def sync_reference_species(json_path="fishBase.json", db_path="fishdex.db", batch_size=DEFAULT_BATCH_SIZE):
+    """Bring ReferenceSpecies in line with a newer FishBase dump in one transaction.
+
+    Each row's contentHash is compared with the hash of the dump's record, so
+    only new and changed species are written and the name index is updated by
+    its triggers for just those rows. Species missing from the dump are removed
+    unless they have been caught. Returns a dict with the number of rows read,
+    inserted, updated, unchanged, removed and kept, the elapsed time, rows per
+    second and peak memory in bytes.
+    """
+    if resource is None:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    stats = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0, "removed": 0, "kept": 0}
+
+    conn = connect(db_path)
+    try:
+        migrate(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Make sure the triggers are back if a bulk import was interrupted
+            create_reference_search_index(conn)
+            known = dict(conn.execute(SELECT_REFERENCE_HASHES).fetchall())
+            seen = set()
+
+            with open(json_path, "r", encoding="utf-8") as file:
+                for batch in iter_batches(iter_json_array(file), batch_size):
+                    inserts = []
+                    updates = []
+                    for row in batch:
+                        species_id, content_hash = row[0], row[-1]
+                        if species_id in seen:
+                            continue  # Duplicate ID in the dump, the first record wins as in a full import
+                        seen.add(species_id)
+                        if species_id not in known:
+                            inserts.append(row)
+                        elif known[species_id] != content_hash:
+                            updates.append((*row[1:], species_id))
+                        else:
+                            stats["unchanged"] += 1
+                    conn.executemany(INSERT_REFERENCE_SPECIES, inserts)
+                    conn.executemany(UPDATE_REFERENCE_SPECIES, updates)
+                    stats["inserted"] += len(inserts)
+                    stats["updated"] += len(updates)
+                    stats["read"] += len(batch)
+
+            missing = [(species_id,) for species_id in known if species_id not in seen]
+            # rowcount leaves out the search index rows the delete trigger changes
+            stats["removed"] = conn.executemany(DELETE_REFERENCE_SPECIES, missing).rowcount if missing else 0
+            stats["kept"] = len(missing) - stats["removed"]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = elapsed
+    stats["rows_per_second"] = stats["read"] / elapsed if elapsed > 0 else 0.0
+    stats["peak_memory"] = peak_memory_bytes()
+
+    if resource is None:
+        tracemalloc.stop()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a FishBase JSON dump into the ReferenceSpecies table.")
+    parser.add_argument("json_path", nargs="?", default="fishBase.json", help="FishBase JSON file (default: fishBase.json)")
+    parser.add_argument("--db", default="fishdex.db", help="SQLite database file (default: fishdex.db)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Rows per transaction (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--sync", action="store_true",
+                        help="Update an existing table to match the dump: write only new and changed species and "
+                             "remove species the dump no longer has, all in one transaction")
+    args = parser.parse_args(argv)
+
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    if args.sync:
+        stats = sync_reference_species(args.json_path, args.db, args.batch_size)
+        print(f"Read {stats['read']} species: {stats['inserted']} new, {stats['updated']} changed, "
+              f"{stats['unchanged']} unchanged, {stats['removed']} removed, "
+              f"{stats['kept']} no longer in the dump but kept because they were caught.")
+        print(f"Took {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/sec), peak memory {stats['peak_memory'] / (1024 * 1024):.1f} MiB.")
+        print("ReferenceSpecies table is up to date!")
+        return
+
+    stats = import_reference_species(args.json_path, args.db, args.batch_size)
+
+    print(f"Read {stats['read']} species, inserted {stats['inserted']}, skipped {stats['skipped']} duplicate IDs.")
+    print(f"Took {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/sec), peak memory {stats['peak_memory'] / (1024 * 1024):.1f} MiB.")
+    print("Data successfully imported into ReferenceSpecies table!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import datetime
+import tempfile
+import subprocess
+from urllib.parse import quote, urlsplit
+
+from benchmark import PLACE_WORDS, SYLLABLES, populate, summarize, write_reference_json
+from jsonToTable import import_reference_species
+
+
+# Generated data set, small enough to build in a few seconds
+DEFAULT_SPECIES = 5000
+DEFAULT_CATCHES = 20000
+DEFAULT_LOCATIONS = 200
+DEFAULT_CAUGHT_SPECIES = 300
+
+DEFAULT_CLIENTS = 50
+DEFAULT_DURATION = 10.0
+
+# Share of requests per operation; the rest of the crew is scrolling and searching
+DEFAULT_MIX = {
+    "add catch": 0.3,
+    "catch log page": 0.3,
+    "species": 0.1,
+    "suggest species": 0.2,
+    "suggest locations": 0.1,
+}
+
+# Seconds to wait for a started server to answer /health
+SERVER_START_TIMEOUT = 30
+
+
+class Client:
+    """One device: a keep-alive HTTP/1.1 connection sending one request at a time."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, payload=None):
+        """Send a request and return (status, parsed JSON body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length)
+        return status, json.loads(data) if data else None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+
+def random_catch(rng, species_ids, locations):
+    caught = datetime.datetime.now() - datetime.timedelta(minutes=rng.randrange(1, 365 * 24 * 60))
+    return {
+        "species_id": rng.choice(species_ids),
+        "location": rng.choice(locations),
+        "datetime": caught.strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+def next_request(rng, operation, species_ids, locations):
+    """(method, path, payload) of one request of the given operation."""
+    if operation == "add catch":
+        return "POST", "/catches", random_catch(rng, species_ids, locations)
+    if operation == "catch log page":
+        sort = rng.choice(("Catch ID", "Datetime Caught", "Location"))
+        return "GET", f"/catches?limit=50&sort={quote(sort)}&desc={rng.choice(('true', 'false'))}", None
+    if operation == "species":
+        return "GET", "/species", None
+    word = rng.choice(SYLLABLES) + rng.choice(SYLLABLES)[0]
+    if operation == "suggest species":
+        return "GET", f"/suggest/species?field={rng.choice(('commonName', 'scientificName'))}&q={word}", None
+    return "GET", f"/suggest/locations?q={word[:2]}", None
+
+
+async def run_client(host, port, rng, deadline, mix, species_ids, locations, samples, errors):
+    client = Client(host, port)
+    operations, weights = zip(*mix.items())
+    try:
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            method, path, payload = next_request(rng, operation, species_ids, locations)
+            start = time.perf_counter()
+            status, body = await client.request(method, path, payload)
+            samples[operation].append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(f"{operation}: {status} {body.get('error') if body else ''}")
+    finally:
+        await client.close()
+
+
+async def run_load(host, port, clients, duration, mix, seed):
+    """Run ``clients`` simultaneous devices for ``duration`` seconds and return the results."""
+    rng = random.Random(seed)
+    client = Client(host, port)
+    _, body = await client.request("GET", "/species")
+    species_ids = [row["speciesID"] for row in body["species"]]
+    if not species_ids:
+        raise SystemExit("The database has no caught species to log more catches of.")
+    locations = [f"Load Test {rng.choice(PLACE_WORDS)} {index}" for index in range(1, 21)]
+
+    samples = {operation: [] for operation in mix}
+    errors = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        run_client(host, port, random.Random(rng.random()), deadline, mix, species_ids, locations, samples, errors)
+        for _ in range(clients)
+    ))
+    elapsed = time.perf_counter() - start
+
+    _, server_stats = await client.request("GET", "/stats")
+    await client.close()
+    return {
+        "seconds": elapsed,
+        "requests": sum(len(values) for values in samples.values()),
+        "operations": {operation: summarize(values) for operation, values in samples.items() if values},
+        "errors": errors,
+        "server": server_stats,
+    }
+
+
+def generate_database(workdir, rng, args):
+    db_path = os.path.join(workdir, "fishdex.db")
+    json_path = os.path.join(workdir, "fishBase.json")
+    write_reference_json(json_path, rng, args.species)
+    import_reference_species(json_path, db_path)
+
+    from fishdex_db import Database
+
+    db = Database(db_path)
+    try:
+        populate(db, rng, args.species, args.catches, args.locations, args.caught_species, 0)
+    finally:
+        db.close()
+    return db_path
+
+
+def start_server(db_path, args):
+    """Start fishdex_server on a free port and return (process, port) once it answers."""
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fishdex_server.py")
+    process = subprocess.Popen(
+        [sys.executable, server, "--db", db_path, "--port", "0",
+         "--readers", str(args.readers), "--max-batch", str(args.max_batch),
+         "--batch-window-ms", str(args.batch_window_ms)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    if not line:
+        process.wait()
+        raise SystemExit(f"The server exited with code {process.returncode}.")
+    port = int(line.rsplit(":", 1)[1])
+
+    async def wait_until_healthy():
+        deadline = time.perf_counter() + SERVER_START_TIMEOUT
+        while True:
+            try:
+                client = Client("127.0.0.1", port)
+                await client.request("GET", "/health")
+                await client.close()
+                return
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+    asyncio.run(wait_until_healthy())
+    return process, port
+
+
+def print_results(results, clients):
+    print(f"\n{clients} clients, {results['requests']} requests in {results['seconds']:.1f}s: "
+          f"{results['requests'] / results['seconds']:.0f} requests/s")
+    print(f"\n{'operation':<20}{'n':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for operation, summary in results["operations"].items():
+        print(f"{operation:<20}{summary['n']:>8}{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}"
+              f"{summary['p99_ms']:>10.2f}{summary['max_ms']:>10.2f}")
+
+    server = results["server"]
+    if server["batches"]:
+        print(f"\nWriter: {server['catches']} catches in {server['batches']} transactions "
+              f"({server['catches'] / server['batches']:.1f} per transaction, largest {server['largest_batch']}), "
+              f"{server['commit_seconds']:.2f}s committing")
+    if results["errors"]:
+        print(f"\n{len(results['errors'])} failed requests, first: {results['errors'][0]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the FishDex API with many simultaneous clients, fully offline.")
+    parser.add_argument("--url", help="Test a running server, e.g. http://127.0.0.1:8765 (default: start one)")
+    parser.add_argument("--db", help="Serve this database, catches are added to it (default: generate one)")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help=f"Simultaneous clients (default: {DEFAULT_CLIENTS})")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help=f"Seconds to run (default: {DEFAULT_DURATION})")
+    parser.add_argument("--write-share", type=float, default=DEFAULT_MIX["add catch"],
+                        help=f"Share of requests that add a catch (default: {DEFAULT_MIX['add catch']})")
+    parser.add_argument("--species", type=int, default=DEFAULT_SPECIES, help=f"Generated ReferenceSpecies rows (default: {DEFAULT_SPECIES})")
+    parser.add_argument("--catches", type=int, default=DEFAULT_CATCHES, help=f"Generated CatchLog rows (default: {DEFAULT_CATCHES})")
+    parser.add_argument("--locations", type=int, default=DEFAULT_LOCATIONS, help=f"Generated Locations rows (default: {DEFAULT_LOCATIONS})")
+    parser.add_argument("--caught-species", type=int, default=DEFAULT_CAUGHT_SPECIES, help=f"Generated distinct caught species (default: {DEFAULT_CAUGHT_SPECIES})")
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads of a started server (default: 4)")
+    parser.add_argument("--max-batch", type=int, default=200, help="Most catches per transaction of a started server; 1 turns batching off (default: 200)")
+    parser.add_argument("--batch-window-ms", type=float, default=0, help="Batch window of a started server (default: 0)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    # Scale the read operations so they share what the writes leave
+    reads = {operation: share for operation, share in DEFAULT_MIX.items() if operation != "add catch"}
+    mix = {"add catch": args.write_share}
+    mix.update({operation: share / sum(reads.values()) * (1 - args.write_share) for operation, share in reads.items()})
+
+    rng = random.Random(args.seed)
+    workdir = None
+    process = None
+    try:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port
+        else:
+            db_path = args.db
+            if db_path is None:
+                workdir = tempfile.mkdtemp(prefix="fishdex-load-")
+                start = time.perf_counter()
+                db_path = generate_database(workdir, rng, args)
+                print(f"Generated {args.catches} catches in {time.perf_counter() - start:.1f}s")
+            process, port = start_server(db_path, args)
+            host = "127.0.0.1"
+
+        results = asyncio.run(run_load(host, port, args.clients, args.duration, mix, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results, args.clients)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"arguments": vars(args), "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import time
+
+from fishdex_db import connect, migrate, migrate_inline_photos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move photos stored inline in CatchLog into the content-addressed Photos store.")
+    parser.add_argument("--db", default="fishdex.db", help="SQLite database file (default: fishdex.db)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Photos moved per transaction (default: 100)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return the freed space to the filesystem")
+    args = parser.parse_args(argv)
+
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    start = time.perf_counter()
+    conn = connect(args.db)
+    try:
+        # Make sure the Photos table and CatchLog.photoID exist
+        migrate(conn)
+
+        stats = migrate_inline_photos(
+            conn, args.batch_size, progress=lambda moved: print(f"\rMoved {moved} photos...", end="", flush=True)
+        )
+        print()
+
+        if args.vacuum:
+            print("Vacuuming...")
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    print(f"Moved {stats['moved']} photos ({stats['duplicates']} duplicates stored once) in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
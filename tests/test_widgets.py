@@ -0,0 +1,120 @@
+import threading
+
+from fishdex_widgets import BackgroundTasks, job_callbacks
+
+
+class StubWindow:
+    """Stands in for a Tk window: runs its destroy handlers synchronously, as Tk does."""
+
+    def __init__(self):
+        self.destroyed = False
+        self.on_destroy = []
+
+    def destroy(self):
+        self.destroyed = True
+        for handler in self.on_destroy:
+            handler()
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+    def _root(self):
+        return self
+
+    def report_callback_exception(self, exc_type, error, traceback):
+        self.reported.append(error)
+
+
+class StubRoot(StubWindow):
+    def __init__(self):
+        super().__init__()
+        self.scheduled = []
+        self.reported = []
+
+    def run_pending(self):
+        """Run after() callbacks until nothing is scheduled, like the Tk event loop."""
+        while self.scheduled:
+            self.scheduled.pop(0)()
+
+
+def run_job(work, state, window, on_cancelled=None):
+    """Run ``work`` on BackgroundTasks the way run_with_progress does and return what was delivered."""
+    root = StubRoot()
+    tasks = BackgroundTasks(root, max_workers=1)
+    delivered = []
+    finished, failed = job_callbacks(
+        window, state, lambda result: delivered.append(("done", result)),
+        lambda error: delivered.append(("error", error)), on_cancelled,
+    )
+    handle = tasks.submit(work, on_done=finished, on_error=failed)
+    handle.future.result(timeout=5)
+    root.run_pending()
+    tasks.shutdown()
+    return delivered, root
+
+
+def test_finished_job_reaches_on_done_even_if_destroy_marks_it_cancelled():
+    state = {"cancelled": False}
+    window = StubWindow()
+    # What the progress windows used to bind to <Destroy>
+    window.on_destroy.append(lambda: state.update(cancelled=True))
+
+    delivered, root = run_job(lambda: ["prepared photo"], state, window)
+
+    assert window.destroyed
+    assert delivered == [("done", ["prepared photo"])]
+    assert root.reported == []
+
+
+def test_failed_job_reaches_on_error():
+    state = {"cancelled": False}
+    window = StubWindow()
+    window.on_destroy.append(lambda: state.update(cancelled=True))
+
+    def work():
+        raise OSError("disk full")
+
+    delivered, _ = run_job(work, state, window)
+
+    assert window.destroyed
+    assert [kind for kind, _ in delivered] == ["error"]
+    assert str(delivered[0][1]) == "disk full"
+
+
+def test_cancelled_job_calls_on_cancelled_instead():
+    state = {"cancelled": False}
+    window = StubWindow()
+    cancelled = []
+    started = threading.Event()
+
+    def work():
+        started.set()
+        state["cancelled"] = True  # Cancel pressed while the job runs
+        return "partial"
+
+    delivered, _ = run_job(work, state, window, on_cancelled=lambda: cancelled.append(True))
+
+    assert started.is_set()
+    assert window.destroyed
+    assert delivered == []
+    assert cancelled == [True]
+
+
+def test_a_failing_callback_does_not_stop_later_results():
+    root = StubRoot()
+    tasks = BackgroundTasks(root, max_workers=1)
+    delivered = []
+
+    def broken(result):
+        raise RuntimeError("view update failed")
+
+    first = tasks.submit(lambda: 1, on_done=broken)
+    first.future.result(timeout=5)
+    root.run_pending()
+    second = tasks.submit(lambda: 2, on_done=delivered.append)
+    second.future.result(timeout=5)
+    root.run_pending()
+    tasks.shutdown()
+
+    assert [str(error) for error in root.reported] == ["view update failed"]
+    assert delivered == [2]